@@ -0,0 +1,40 @@
+"""create_invite_codes
+
+Revision ID: 0b6d2e8f4a13
+Revises: f3a9c6d8b270
+Create Date: 2026-10-18 21:37:05.284416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b6d2e8f4a13'
+down_revision: Union[str, None] = 'f3a9c6d8b270'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建随机邀请码索引表"""
+    op.create_table('invite_codes',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('code', sa.String(length=16), nullable=False),
+    sa.Column('wallet_address', sa.String(length=42), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_invite_codes_id'), 'invite_codes', ['id'], unique=False)
+    op.create_index(op.f('ix_invite_codes_code'), 'invite_codes', ['code'], unique=True)
+    op.create_index(op.f('ix_invite_codes_wallet_address'), 'invite_codes', ['wallet_address'], unique=True)
+
+
+def downgrade() -> None:
+    """删除随机邀请码索引表"""
+    op.drop_index(op.f('ix_invite_codes_wallet_address'), table_name='invite_codes')
+    op.drop_index(op.f('ix_invite_codes_code'), table_name='invite_codes')
+    op.drop_index(op.f('ix_invite_codes_id'), table_name='invite_codes')
+    op.drop_table('invite_codes')
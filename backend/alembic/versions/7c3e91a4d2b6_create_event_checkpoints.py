@@ -0,0 +1,39 @@
+"""create_event_checkpoints
+
+Revision ID: 7c3e91a4d2b6
+Revises: 2ea80b4db404
+Create Date: 2026-10-18 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e91a4d2b6'
+down_revision: Union[str, None] = '2ea80b4db404'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建事件监听检查点表"""
+    op.create_table('event_checkpoints',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('chain_id', sa.Integer(), nullable=False),
+    sa.Column('contract_address', sa.String(length=42), nullable=False),
+    sa.Column('last_processed_block', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('chain_id', 'contract_address', name='uq_event_checkpoint_target')
+    )
+    op.create_index(op.f('ix_event_checkpoints_id'), 'event_checkpoints', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """删除事件监听检查点表"""
+    op.drop_index(op.f('ix_event_checkpoints_id'), table_name='event_checkpoints')
+    op.drop_table('event_checkpoints')
@@ -0,0 +1,41 @@
+"""create_processed_events
+
+Revision ID: a94d07e2c5f1
+Revises: 7c3e91a4d2b6
+Create Date: 2026-10-18 11:03:27.118604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a94d07e2c5f1'
+down_revision: Union[str, None] = '7c3e91a4d2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建已处理事件台账表"""
+    op.create_table('processed_events',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('transaction_hash', sa.String(length=66), nullable=False),
+    sa.Column('log_index', sa.Integer(), nullable=False),
+    sa.Column('event_name', sa.String(length=50), nullable=False),
+    sa.Column('block_number', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_hash', 'log_index', name='uq_processed_event_log')
+    )
+    op.create_index(op.f('ix_processed_events_id'), 'processed_events', ['id'], unique=False)
+    op.create_index(op.f('ix_processed_events_block_number'), 'processed_events', ['block_number'], unique=False)
+
+
+def downgrade() -> None:
+    """删除已处理事件台账表"""
+    op.drop_index(op.f('ix_processed_events_block_number'), table_name='processed_events')
+    op.drop_index(op.f('ix_processed_events_id'), table_name='processed_events')
+    op.drop_table('processed_events')
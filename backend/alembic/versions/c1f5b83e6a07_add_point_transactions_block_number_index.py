@@ -0,0 +1,32 @@
+"""add_point_transactions_block_number_index
+
+Revision ID: c1f5b83e6a07
+Revises: a94d07e2c5f1
+Create Date: 2026-10-18 13:41:09.672150
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f5b83e6a07'
+down_revision: Union[str, None] = 'a94d07e2c5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """为链上事件流水的区块号创建表达式索引（区块重组回滚使用）"""
+    op.execute("""
+        CREATE INDEX ix_point_transactions_block_number
+        ON point_transactions (((extra_metadata->>'block_number')::bigint))
+        WHERE extra_metadata ? 'tx_hash';
+    """)
+
+
+def downgrade() -> None:
+    """删除区块号表达式索引"""
+    op.execute("DROP INDEX IF EXISTS ix_point_transactions_block_number;")
@@ -0,0 +1,47 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: d4a7e9c2b318
+Revises: c1f5b83e6a07
+Create Date: 2026-10-18 16:02:44.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7e9c2b318'
+down_revision: Union[str, None] = 'c1f5b83e6a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """为用户流水/任务/答题记录创建 (user_id, 时间, id) 复合索引，用于游标分页"""
+    op.create_index(
+        'ix_point_transactions_user_created_id',
+        'point_transactions',
+        ['user_id', 'created_at', 'id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_user_tasks_user_created_id',
+        'user_tasks',
+        ['user_id', 'created_at', 'id'],
+        unique=False
+    )
+    op.create_index(
+        'ix_user_answers_user_answered_id',
+        'user_answers',
+        ['user_id', 'answered_at', 'id'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """删除游标分页复合索引"""
+    op.drop_index('ix_user_answers_user_answered_id', table_name='user_answers')
+    op.drop_index('ix_user_tasks_user_created_id', table_name='user_tasks')
+    op.drop_index('ix_point_transactions_user_created_id', table_name='point_transactions')
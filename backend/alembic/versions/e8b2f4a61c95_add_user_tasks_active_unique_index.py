@@ -0,0 +1,54 @@
+"""add_user_tasks_active_unique_index
+
+Revision ID: e8b2f4a61c95
+Revises: d4a7e9c2b318
+Create Date: 2026-10-18 18:27:13.540921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b2f4a61c95'
+down_revision: Union[str, None] = 'd4a7e9c2b318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    同一用户同一任务最多一条进行中/已完成记录（批量分配 ON CONFLICT DO NOTHING 的冲突目标）
+
+    创建索引前清理历史并发写入产生的重复记录：每组保留最能保住进度的一条
+    （待领奖的已完成记录优先，其次进度最高、最新的进行中记录），
+    其余进行中的重复记录标记为过期；同一任务有多条待领奖记录时
+    只能保留一条，多出的同样标记为过期
+    """
+    op.execute("""
+        UPDATE user_tasks SET status = 'EXPIRED'
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY user_id, task_id
+                    ORDER BY (status = 'COMPLETED') DESC, current_value DESC,
+                             created_at DESC, id DESC
+                ) AS rn
+                FROM user_tasks
+                WHERE status IN ('IN_PROGRESS', 'COMPLETED')
+            ) ranked
+            WHERE ranked.rn > 1
+        );
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX uq_user_tasks_user_task_active
+        ON user_tasks (user_id, task_id)
+        WHERE status IN ('IN_PROGRESS', 'COMPLETED');
+    """)
+
+
+def downgrade() -> None:
+    """删除进行中任务唯一索引"""
+    op.execute("DROP INDEX IF EXISTS uq_user_tasks_user_task_active;")
@@ -0,0 +1,57 @@
+"""create_referral_closure
+
+Revision ID: f3a9c6d8b270
+Revises: e8b2f4a61c95
+Create Date: 2026-10-18 20:41:52.603117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c6d8b270'
+down_revision: Union[str, None] = 'e8b2f4a61c95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建推荐关系闭包表，并由现有推荐关系回填"""
+    op.create_table('referral_closure',
+    sa.Column('ancestor_id', sa.BigInteger(), nullable=False),
+    sa.Column('descendant_id', sa.BigInteger(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.CheckConstraint('depth >= 1', name='check_closure_depth_positive'),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('ix_referral_closure_ancestor_depth', 'referral_closure', ['ancestor_id', 'depth', 'descendant_id'], unique=False)
+    op.create_index('ix_referral_closure_descendant_depth', 'referral_closure', ['descendant_id', 'depth'], unique=False)
+
+    op.execute("""
+        INSERT INTO referral_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE closure(ancestor_id, descendant_id, depth) AS (
+            SELECT referrer_id, referee_id, 1
+            FROM referral_relations
+            WHERE is_active = TRUE
+            UNION ALL
+            SELECT r.referrer_id, c.descendant_id, c.depth + 1
+            FROM closure c
+            JOIN referral_relations r ON r.referee_id = c.ancestor_id AND r.is_active = TRUE
+            WHERE c.depth < 64
+        )
+        SELECT ancestor_id, descendant_id, MIN(depth)
+        FROM closure
+        GROUP BY ancestor_id, descendant_id;
+    """)
+
+
+def downgrade() -> None:
+    """删除推荐关系闭包表"""
+    op.drop_index('ix_referral_closure_descendant_depth', table_name='referral_closure')
+    op.drop_index('ix_referral_closure_ancestor_depth', table_name='referral_closure')
+    op.drop_table('referral_closure')
@@ -10,6 +10,8 @@ from datetime import datetime
 from app.db.session import get_db
 from app.services.leaderboard_service import LeaderboardService
 from app.services.materialized_view_service import MaterializedViewService
+from app.services.mv_refresh_scheduler import get_mv_refresh_scheduler
+from app.utils.pagination import next_cursor
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
@@ -40,9 +42,10 @@ class LeaderboardEntry(BaseModel):
 
 class LeaderboardResponse(BaseModel):
     """排行榜响应"""
-    total: int = Field(..., description="总用户数")
+    total: int = Field(..., description="总用户数（估算值）")
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页大小")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示已到末页")
     entries: List[LeaderboardEntry] = Field(..., description="排行榜条目")
 
 
@@ -57,6 +60,13 @@ class UserRankResponse(BaseModel):
     available_points: int = Field(..., description="可用积分")
 
 
+class LeaderboardAroundResponse(BaseModel):
+    """用户附近排名响应"""
+    user_id: int = Field(..., description="用户ID")
+    rank: int = Field(..., description="用户排名")
+    entries: List[LeaderboardEntry] = Field(..., description="用户前后的排行榜条目（含用户本人）")
+
+
 class LeaderboardStatsResponse(BaseModel):
     """排行榜统计响应"""
     total_users: int = Field(..., description="总用户数")
@@ -78,28 +88,33 @@ class RefreshResponse(BaseModel):
 async def get_points_leaderboard(
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(50, ge=1, le=100, description="每页大小"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor，优先于页码）"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     获取积分排行榜
 
-    基于物化视图提供高性能查询，支持分页
+    基于物化视图提供高性能查询，支持页码和游标分页
     """
     try:
         leaderboard, total = await LeaderboardService.get_points_leaderboard(
             db=db,
             page=page,
             page_size=page_size,
-            use_cache=True
+            use_cache=True,
+            cursor=cursor
         )
 
         return {
             "total": total,
             "page": page,
             "page_size": page_size,
+            "next_cursor": next_cursor(leaderboard, page_size, "rank"),
             "entries": leaderboard
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查询排行榜失败: {str(e)}")
 
@@ -128,6 +143,31 @@ async def get_user_rank(
         raise HTTPException(status_code=500, detail=f"查询用户排名失败: {str(e)}")
 
 
+@router.get("/points/user/{user_id}/around", response_model=LeaderboardAroundResponse)
+async def get_user_neighborhood(
+    user_id: int,
+    k: int = Query(5, ge=1, le=LeaderboardService.AROUND_MAX_K, description="前后各取的人数"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    查询用户附近的排名
+
+    一次返回用户本人及前后各 k 名，替代"先查排名再翻页"
+    """
+    try:
+        neighborhood = await LeaderboardService.get_user_neighborhood(db=db, user_id=user_id, k=k)
+
+        if not neighborhood:
+            raise HTTPException(status_code=404, detail="用户未找到或未上榜")
+
+        return {"user_id": user_id, **neighborhood}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询用户附近排名失败: {str(e)}")
+
+
 @router.get("/points/top/{limit}")
 async def get_top_users(
     limit: int,
@@ -184,3 +224,21 @@ async def refresh_leaderboard(
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"刷新失败: {str(e)}")
+
+
+@router.get("/refresh/metrics")
+async def get_refresh_metrics():
+    """
+    获取物化视图定时刷新指标
+
+    包括每个视图的刷新次数、失败次数、最近/平均/最大耗时
+    """
+    scheduler = get_mv_refresh_scheduler()
+    if scheduler is None:
+        return {"enabled": False, "views": {}}
+
+    return {
+        "enabled": True,
+        "window_seconds": scheduler.window_seconds,
+        "views": scheduler.get_metrics()
+    }
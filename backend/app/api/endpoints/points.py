@@ -18,6 +18,7 @@ from app.schemas.points import (
     PointsStatistics
 )
 from app.models.point_transaction import PointTransactionType
+from app.utils.pagination import next_cursor
 from loguru import logger
 
 router = APIRouter()
@@ -63,12 +64,15 @@ async def get_user_transactions(
     transaction_type: Optional[PointTransactionType] = Query(None, description="交易类型筛选"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(50, ge=1, le=100, description="每页大小"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor，优先于页码）"),
+    include_total: bool = Query(False, description="是否统计总数（需要总数时传 true）"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     查询用户积分交易历史（分页）
 
-    支持按交易类型筛选，返回交易记录列表和总数
+    支持按交易类型筛选，返回交易记录列表；
+    翻页使用 next_cursor，需要总数时传 include_total=true
     """
     try:
         transactions, total = await PointsService.get_point_transactions(
@@ -76,16 +80,21 @@ async def get_user_transactions(
             user_id=user_id,
             transaction_type=transaction_type,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total
         )
 
         return {
             "total": total,
             "page": page,
             "page_size": page_size,
+            "next_cursor": next_cursor(transactions, page_size, "created_at", "id"),
             "data": transactions
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"查询交易历史失败: user_id={user_id}, error={e}")
         raise HTTPException(
@@ -357,10 +366,11 @@ async def get_points_statistics(
     - **task_points**: 任务奖励积分总和
     - **quiz_points**: 答题奖励积分总和
     - **team_points**: 战队奖励积分总和
+    - **generated_at**: 统计快照生成时间
 
     **权限**: 公开访问（可添加管理员权限限制）
 
-    **缓存策略**: 建议在高流量场景下添加Redis缓存，TTL 5分钟
+    **缓存策略**: 单次聚合扫描生成快照，Redis缓存1分钟
     """
     try:
         statistics = await PointsService.get_points_statistics(db)
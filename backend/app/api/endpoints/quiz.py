@@ -27,6 +27,7 @@ from app.schemas.quiz import (
     QuizRankingResponse,
 )
 from app.models.quiz import QuestionDifficulty, QuestionStatus
+from app.utils.pagination import next_cursor
 from loguru import logger
 
 router = APIRouter()
@@ -355,6 +356,8 @@ async def get_user_answers(
     answer_date: Optional[date] = Query(None, description="答题日期"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页大小"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor，优先于页码）"),
+    include_total: bool = Query(False, description="是否统计总数（需要总数时传 true）"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -362,6 +365,7 @@ async def get_user_answers(
 
     **权限**: 用户本人或管理员
     **排序**: 按答题时间降序
+    **翻页**: 使用 next_cursor，需要总数时传 include_total=true
     """
     try:
         answers, total = await QuizService.get_user_answers(
@@ -370,7 +374,9 @@ async def get_user_answers(
             is_correct=is_correct,
             answer_date=answer_date,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total
         )
 
         # 构建详细记录（包含题目信息）
@@ -396,9 +402,12 @@ async def get_user_answers(
             "total": total,
             "page": page,
             "page_size": page_size,
+            "next_cursor": next_cursor(answers, page_size, "answered_at", "id"),
             "data": detailed_answers
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"获取答题记录失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取答题记录失败: {str(e)}")
@@ -1,17 +1,21 @@
 """
 推荐系统API端点
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from web3 import Web3
 from datetime import datetime, timedelta
-import secrets
-import string
+import asyncio
 
 from app.db.session import get_db
 from app.models import User, UserPoints, ReferralRelation
 from app.core.config import settings
+from app.core.web3_client import web3_client
+from app.services.referral_service import ReferralService
+from app.services.invite_code_service import InviteCodeService
 
 router = APIRouter()
 
@@ -53,10 +57,10 @@ async def generate_referral_link(request: ReferralLinkRequest, db: AsyncSession
 
     if user:
         # 使用用户ID生成邀请码
-        code = f"USER{user.id:06d}"
+        code = InviteCodeService.user_code(user.id)
     else:
-        # 生成6位随机邀请码
-        code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+        # 未注册钱包：获取或生成6位随机邀请码（写入邀请码索引，可被解析）
+        code = await InviteCodeService.get_or_create_code(db, request.address)
 
     # 生成推荐链接
     app_url = settings.CORS_ORIGINS[0] if settings.CORS_ORIGINS else "http://localhost:5173"
@@ -144,6 +148,100 @@ async def get_user_info(address: str, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"获取用户信息失败: {str(e)}")
 
 
+@router.get("/user/{address}/onchain", response_model=UserInfoResponse)
+async def get_user_info_onchain(address: str):
+    """
+    获取用户推荐信息（基于链上合约）
+
+    并发查询合约的 getUserInfo / hasReferrer / isUserActive，
+    RPC调用全部异步执行，不阻塞其他请求
+    """
+    if not Web3.is_address(address):
+        raise HTTPException(status_code=400, detail="无效的钱包地址")
+
+    try:
+        info, has_referrer, is_active = await asyncio.gather(
+            web3_client.get_user_info(address),
+            web3_client.has_referrer(address),
+            web3_client.is_user_active(address)
+        )
+
+        return {
+            "address": address.lower(),
+            "referrer": info["referrer"],
+            "reward": info["reward"],
+            "referred_count": info["referred_count"],
+            "last_active_timestamp": info["last_active_timestamp"],
+            "has_referrer": has_referrer,
+            "is_active": is_active
+        }
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="区块链节点响应超时")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"查询链上信息失败: {str(e)}")
+
+
+class DownlineMember(BaseModel):
+    """下级用户"""
+    depth: int
+    user_id: int
+    wallet_address: str
+    username: Optional[str] = None
+    total_points: int
+    total_invited: int
+    joined_at: Optional[datetime] = None
+
+
+class DownlineResponse(BaseModel):
+    """下级列表响应"""
+    address: str
+    total: int
+    level_counts: Dict[int, int]
+    data: List[DownlineMember]
+    next_cursor: Optional[str] = None
+
+
+@router.get("/user/{address}/downline", response_model=DownlineResponse)
+async def get_user_downline(
+    address: str,
+    max_depth: Optional[int] = Query(None, ge=1, le=64, description="最大层级（默认全部）"),
+    page_size: int = Query(20, ge=1, le=100, description="每页大小"),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    获取用户的下级用户（基于推荐闭包表）
+
+    返回各层级人数统计和按层级排序的下级列表（游标分页）
+    """
+    try:
+        user_query = select(User.id).where(User.wallet_address == address.lower())
+        user_result = await db.execute(user_query)
+        user_id = user_result.scalar_one_or_none()
+
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="用户不存在")
+
+        level_counts = await ReferralService.get_downline_level_counts(db, user_id, max_depth)
+        members, cursor_next = await ReferralService.get_downline(
+            db, user_id, max_depth=max_depth, page_size=page_size, cursor=cursor
+        )
+
+        return {
+            "address": address.lower(),
+            "total": sum(level_counts.values()),
+            "level_counts": level_counts,
+            "data": members,
+            "next_cursor": cursor_next
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取下级用户失败: {str(e)}")
+
+
 @router.get("/config")
 async def get_referral_config():
     """
@@ -191,31 +289,20 @@ async def resolve_invite_code(invite_code: str, db: AsyncSession = Depends(get_d
     """
     通过邀请码查找推荐人地址
 
-    将邀请码（如USER000001）解析为推荐人的钱包地址
+    将邀请码（USER000001 或 6位随机码）解析为推荐人的钱包地址
     """
     try:
-        # 尝试从邀请码提取用户ID（格式：USER000001）
-        if invite_code.startswith("USER") and len(invite_code) == 10:
-            try:
-                user_id = int(invite_code[4:])
-
-                # 查询用户
-                user_query = select(User).where(User.id == user_id)
-                user_result = await db.execute(user_query)
-                user = user_result.scalar_one_or_none()
-
-                if user:
-                    return {
-                        "success": True,
-                        "invite_code": invite_code,
-                        "referrer_address": user.wallet_address,
-                        "referrer_username": user.username
-                    }
-            except ValueError:
-                pass
-
-        # 如果不是标准格式，返回未找到
-        raise HTTPException(status_code=404, detail="邀请码无效或推荐人不存在")
+        # 进程内LRU → Redis → 数据库，无效邀请码负缓存
+        resolved = await InviteCodeService.resolve(db, invite_code)
+        if not resolved:
+            raise HTTPException(status_code=404, detail="邀请码无效或推荐人不存在")
+
+        return {
+            "success": True,
+            "invite_code": invite_code,
+            "referrer_address": resolved["wallet_address"],
+            "referrer_username": resolved["username"]
+        }
 
     except HTTPException:
         raise
@@ -238,24 +325,23 @@ async def bind_referrer_by_code(request: BindReferrerByCodeRequest, db: AsyncSes
     """
     try:
         # 1. 解析邀请码获取推荐人地址
-        if request.invite_code.startswith("USER") and len(request.invite_code) == 10:
-            try:
-                referrer_user_id = int(request.invite_code[4:])
-
-                # 查询推荐人
-                referrer_query = select(User).where(User.id == referrer_user_id)
-                referrer_result = await db.execute(referrer_query)
-                referrer = referrer_result.scalar_one_or_none()
-
-                if not referrer:
-                    raise HTTPException(status_code=404, detail="邀请码无效：推荐人不存在")
-
-                referrer_address = referrer.wallet_address
-            except ValueError:
-                raise HTTPException(status_code=400, detail="邀请码格式无效")
-        else:
+        if not InviteCodeService.is_valid_format(request.invite_code):
             raise HTTPException(status_code=400, detail="邀请码格式无效")
 
+        resolved = await InviteCodeService.resolve(db, request.invite_code)
+        if not resolved:
+            raise HTTPException(status_code=404, detail="邀请码无效：推荐人不存在")
+
+        # 按钱包地址查询推荐人（随机码对应的钱包可能在生成邀请码之后才注册）
+        referrer_query = select(User).where(User.wallet_address == resolved["wallet_address"])
+        referrer_result = await db.execute(referrer_query)
+        referrer = referrer_result.scalar_one_or_none()
+
+        if not referrer:
+            raise HTTPException(status_code=404, detail="邀请码无效：推荐人不存在")
+
+        referrer_address = referrer.wallet_address
+
         # 2. 调用原有的绑定逻辑
         referee_address = request.referee_address.lower()
 
@@ -286,27 +372,8 @@ async def bind_referrer_by_code(request: BindReferrerByCodeRequest, db: AsyncSes
         if existing_relation:
             raise HTTPException(status_code=400, detail="已经绑定过推荐人，每个用户只能绑定一次")
 
-        # 检查循环推荐
-        async def check_circular_referral(current_user_id: int, target_user_id: int, depth: int = 0) -> bool:
-            if depth > 10:
-                return False
-
-            query = select(ReferralRelation).where(
-                ReferralRelation.referee_id == current_user_id,
-                ReferralRelation.is_active == True
-            )
-            result = await db.execute(query)
-            relations = result.scalars().all()
-
-            for relation in relations:
-                if relation.referrer_id == target_user_id:
-                    return True
-                if await check_circular_referral(relation.referrer_id, target_user_id, depth + 1):
-                    return True
-
-            return False
-
-        if await check_circular_referral(referrer.id, referee.id):
+        # 检查循环推荐（一次递归查询推荐人的上级链）
+        if await ReferralService.would_create_cycle(db, referrer.id, referee.id):
             raise HTTPException(status_code=400, detail="无法绑定：会形成循环推荐")
 
         # 创建推荐关系
@@ -317,6 +384,7 @@ async def bind_referrer_by_code(request: BindReferrerByCodeRequest, db: AsyncSes
             created_at=datetime.utcnow()
         )
         db.add(new_relation)
+        await ReferralService.link_closure(db, referrer.id, referee.id)
 
         # 更新用户的推荐人数
         referrer.total_invited += 1
@@ -470,30 +538,8 @@ async def bind_referrer(request: BindReferrerRequest, db: AsyncSession = Depends
         if not referrer:
             raise HTTPException(status_code=404, detail="推荐人不存在")
 
-        # 7. 检查循环推荐：推荐人不能是被推荐人的下级
-        async def check_circular_referral(current_user_id: int, target_user_id: int, depth: int = 0) -> bool:
-            """递归检查是否形成循环推荐"""
-            if depth > 10:  # 防止无限递归
-                return False
-
-            # 查询当前用户的所有推荐人
-            query = select(ReferralRelation).where(
-                ReferralRelation.referee_id == current_user_id,
-                ReferralRelation.is_active == True
-            )
-            result = await db.execute(query)
-            relations = result.scalars().all()
-
-            for relation in relations:
-                if relation.referrer_id == target_user_id:
-                    return True  # 发现循环
-                # 递归检查推荐人的推荐人
-                if await check_circular_referral(relation.referrer_id, target_user_id, depth + 1):
-                    return True
-
-            return False
-
-        if await check_circular_referral(referrer.id, referee.id):
+        # 7. 检查循环推荐：推荐人不能是被推荐人的下级（一次递归查询推荐人的上级链）
+        if await ReferralService.would_create_cycle(db, referrer.id, referee.id):
             raise HTTPException(status_code=400, detail="无法绑定：会形成循环推荐")
 
         # 8. 创建推荐关系
@@ -504,6 +550,7 @@ async def bind_referrer(request: BindReferrerRequest, db: AsyncSession = Depends
             created_at=datetime.utcnow()
         )
         db.add(new_relation)
+        await ReferralService.link_closure(db, referrer.id, referee.id)
 
         # 9. 更新用户的推荐人数
         referrer.total_invited += 1
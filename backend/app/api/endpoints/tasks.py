@@ -22,6 +22,7 @@ from app.schemas.task import (
     UserTaskSummary,
 )
 from app.models.task import TaskType, UserTaskStatus
+from app.utils.pagination import next_cursor
 from loguru import logger
 
 router = APIRouter()
@@ -266,6 +267,8 @@ async def get_user_tasks(
     task_type: Optional[TaskType] = Query(None, description="任务类型筛选"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页大小"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的next_cursor，优先于页码）"),
+    include_total: bool = Query(False, description="是否统计总数（需要总数时传 true）"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -274,6 +277,7 @@ async def get_user_tasks(
     **权限**: 用户本人或管理员
     **排序**: 按创建时间降序
     **筛选**: 可按任务状态和类型筛选
+    **翻页**: 使用 next_cursor，需要总数时传 include_total=true
     """
     try:
         user_tasks, total = await TaskService.get_user_tasks(
@@ -282,18 +286,15 @@ async def get_user_tasks(
             status=status,
             task_type=task_type,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total
         )
 
-        # 构建详细任务信息（包含任务配置）
-        from sqlalchemy import select
-        from app.models import Task
-
+        # 构建详细任务信息（任务配置已随用户任务加载）
         detailed_tasks = []
         for user_task in user_tasks:
-            # 查询任务配置
-            result = await db.execute(select(Task).where(Task.id == user_task.task_id))
-            task = result.scalar_one_or_none()
+            task = user_task.task
 
             # 计算进度百分比
             progress_percentage = round((user_task.current_value / user_task.target_value) * 100, 2) if user_task.target_value > 0 else 0
@@ -315,9 +316,12 @@ async def get_user_tasks(
             "total": total,
             "page": page,
             "page_size": page_size,
+            "next_cursor": next_cursor(user_tasks, page_size, "created_at", "id"),
             "data": detailed_tasks
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"获取用户任务列表失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取用户任务列表失败: {str(e)}")
@@ -31,6 +31,15 @@ from loguru import logger
 router = APIRouter()
 
 
+def _team_with_captain(team) -> dict:
+    """战队详情附带已预加载的队长信息"""
+    return {
+        **TeamResponse.model_validate(team).model_dump(),
+        "captain_name": team.captain.username if team.captain else None,
+        "captain_wallet": team.captain.wallet_address if team.captain else None,
+    }
+
+
 # ============= 战队CRUD API =============
 
 @router.post("/", response_model=TeamResponse, status_code=201)
@@ -102,7 +111,7 @@ async def get_team_leaderboard(
 
 # ============= 用户战队查询 API =============
 
-@router.get("/user/{user_id}/team", response_model=Optional[TeamResponse])
+@router.get("/user/{user_id}/team", response_model=Optional[TeamDetailResponse])
 async def get_user_team(
     user_id: int,
     db: AsyncSession = Depends(get_db)
@@ -111,27 +120,14 @@ async def get_user_team(
     获取用户所在的战队
 
     **权限**: 公开访问
-    **返回**: 用户当前活跃的战队信息，如果用户未加入任何战队则返回None
+    **返回**: 用户当前活跃的战队信息（含队长），如果用户未加入任何战队则返回None
     """
     try:
-        from sqlalchemy import select
-        from app.models.team_member import TeamMember
-        from app.models.team import Team
-
-        # 查找用户的活跃战队成员记录
-        query = select(TeamMember).where(
-            TeamMember.user_id == user_id,
-            TeamMember.status == TeamMemberStatus.ACTIVE
-        )
-        result = await db.execute(query)
-        member = result.scalar_one_or_none()
-
-        if not member:
+        team = await TeamService.get_user_team(db, user_id)
+        if not team:
             return None
 
-        # 获取战队详情
-        team = await TeamService.get_team(db, member.team_id)
-        return team
+        return _team_with_captain(team)
 
     except Exception as e:
         logger.error(f"获取用户战队失败: {e}")
@@ -188,7 +184,7 @@ async def get_teams(
             "total": total,
             "page": page,
             "page_size": page_size,
-            "data": teams
+            "data": [_team_with_captain(team) for team in teams]
         }
 
     except Exception as e:
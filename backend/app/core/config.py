@@ -1,7 +1,7 @@
 """
 应用配置管理
 """
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 
@@ -31,6 +31,11 @@ class Settings(BaseSettings):
     BSC_TESTNET_CHAIN_ID: int = 97
     BSC_MAINNET_CHAIN_ID: int = 56
     REFERRAL_CONTRACT_ADDRESS: str = "0x0000000000000000000000000000000000000000"
+    BSC_RPC_FALLBACK_URLS: str = ""       # 备用RPC节点（逗号分隔），与主节点一起按健康度路由
+    WEB3_POOL_SIZE: int = 20              # RPC连接池最大连接数
+    WEB3_REQUEST_TIMEOUT: float = 10.0    # 单次RPC调用超时（秒）
+    WEB3_HEDGE_AFTER_MS: int = 0          # 幂等读请求的对冲延迟阈值（毫秒），0表示不对冲
+    WEB3_BATCH_CHUNK_SIZE: int = 100      # batchGetUserInfo 每块地址数（各块打包为一个JSON-RPC批量请求）
 
     # CORS配置
     CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000"]
@@ -45,6 +50,17 @@ class Settings(BaseSettings):
     LEVEL_2_BONUS_RATE: int = 5   # 二级推荐奖励 5%
     INACTIVE_DAYS: int = 30       # 不活跃天数
 
+    # 邀请码解析缓存
+    INVITE_CODE_CACHE_SIZE: int = 10000  # 进程内LRU容量
+    INVITE_CODE_WARM_SIZE: int = 1000    # 启动时预热的头部推荐人数量
+
+    # 钱包地址 → 用户ID 进程内LRU容量
+    USER_ID_CACHE_SIZE: int = 50000
+
+    # 物化视图刷新调度
+    MV_REFRESH_ENABLED: bool = True
+    MV_REFRESH_WINDOW_SECONDS: float = 30.0  # 单个视图两次刷新的最小间隔
+
     # 日志配置
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "logs/app.log"
@@ -64,6 +80,17 @@ class Settings(BaseSettings):
             return self.BSC_MAINNET_RPC_URL
         return self.BSC_TESTNET_RPC_URL
 
+    @property
+    def bsc_rpc_urls(self) -> List[str]:
+        """获取当前网络的全部RPC URL（主节点在前）"""
+        fallbacks = [url.strip() for url in self.BSC_RPC_FALLBACK_URLS.split(",") if url.strip()]
+        return [self.bsc_rpc_url] + fallbacks
+
+    @property
+    def web3_hedge_after(self) -> Optional[float]:
+        """对冲延迟阈值（秒），未启用返回None"""
+        return self.WEB3_HEDGE_AFTER_MS / 1000 if self.WEB3_HEDGE_AFTER_MS > 0 else None
+
     @property
     def bsc_chain_id(self) -> int:
         """获取当前网络的Chain ID"""
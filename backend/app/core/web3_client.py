@@ -1,17 +1,18 @@
 """
 Web3客户端 - 与智能合约交互
 """
-from web3 import Web3
-from typing import Optional, Dict, Any
+from web3 import AsyncWeb3, Web3
+from web3.contract import AsyncContract
+from eth_abi import decode as abi_decode
+from hexbytes import HexBytes
+from aiohttp import ClientSession
+from typing import Optional, Dict, Any, List
+import asyncio
 import logging
 
 from app.core.config import settings
-
-# Web3.py v6兼容性：POA中间件导入
-try:
-    from web3.middleware import geth_poa_middleware
-except ImportError:
-    from web3.middleware import ExtraDataToPOAMiddleware as geth_poa_middleware
+from app.services.cache_service import CacheService
+from app.utils.web3_client import create_async_web3
 
 logger = logging.getLogger(__name__)
 
@@ -101,31 +102,156 @@ REFERRAL_ABI = [
     }
 ]
 
+def _output_types(function_name: str) -> List[str]:
+    """获取REFERRAL_ABI中函数的返回值类型列表"""
+    for item in REFERRAL_ABI:
+        if item.get("type") == "function" and item.get("name") == function_name:
+            return [output["type"] for output in item["outputs"]]
+    raise ValueError(f"ABI中不存在函数: {function_name}")
+
 
 class Web3Client:
-    """Web3客户端类"""
+    """Web3客户端类（AsyncWeb3 + keep-alive连接池，应用启动时 connect）"""
 
     def __init__(self):
-        """初始化Web3连接"""
-        self.w3 = Web3(Web3.HTTPProvider(settings.bsc_rpc_url))
+        """初始化客户端配置（不发起网络请求）"""
+        self.w3: Optional[AsyncWeb3] = None
+        self.contract: Optional[AsyncContract] = None
+        self.request_timeout = settings.WEB3_REQUEST_TIMEOUT
+        self._session: Optional[ClientSession] = None
+        self._lock = asyncio.Lock()
+
+        # 链上读取缓存：进行中的调用（single-flight）和命中统计
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.cache_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    async def connect(self):
+        """建立连接池并初始化合约"""
+        async with self._lock:
+            if self.w3 is not None:
+                return
+
+            w3, session = await create_async_web3(
+                settings.bsc_rpc_urls,
+                pool_size=settings.WEB3_POOL_SIZE,
+                request_timeout=self.request_timeout,
+                hedge_after=settings.web3_hedge_after
+            )
+
+            # 验证连接
+            if not await w3.is_connected():
+                await session.close()
+                logger.error("❌ 无法连接到BSC网络")
+                raise ConnectionError("Failed to connect to BSC network")
 
-        # 为BSC网络添加POA middleware
-        self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+            self.w3, self._session = w3, session
+            logger.info(f"✅ 已连接到BSC {settings.BSC_NETWORK}")
+            logger.info(f"📍 当前区块: {await self.w3.eth.block_number}")
 
-        # 验证连接
-        if not self.w3.is_connected():
-            logger.error("❌ 无法连接到BSC网络")
-            raise ConnectionError("Failed to connect to BSC network")
+            # 初始化合约
+            self.contract = self.w3.eth.contract(
+                address=Web3.to_checksum_address(settings.REFERRAL_CONTRACT_ADDRESS),
+                abi=REFERRAL_ABI
+            )
+
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self.w3 = None
+        self.contract = None
+
+    def get_rpc_stats(self) -> list:
+        """各RPC节点的滚动延迟(p50/p99)和错误率"""
+        if self.w3 is None:
+            return []
+        return self.w3.provider.endpoint_stats()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """链上读取缓存的命中/未命中/合并计数"""
+        lookups = self.cache_stats["hits"] + self.cache_stats["misses"]
+        return {
+            **self.cache_stats,
+            "hit_rate": round(self.cache_stats["hits"] / lookups, 4) if lookups else 0.0
+        }
+
+    async def _call(self, function_name: str, *args, block_identifier: Any = "latest"):
+        """
+        带超时执行合约只读调用（首次调用时自动建立连接）
 
-        logger.info(f"✅ 已连接到BSC {settings.BSC_NETWORK}")
-        logger.info(f"📍 当前区块: {self.w3.eth.block_number}")
+        Args:
+            function_name: 合约函数名
+            *args: 函数参数
+            block_identifier: 区块标签或区块号
 
-        # 初始化合约
-        self.contract = self.w3.eth.contract(
-            address=Web3.to_checksum_address(settings.REFERRAL_CONTRACT_ADDRESS),
-            abi=REFERRAL_ABI
+        Returns:
+            调用结果
+        """
+        if self.contract is None:
+            await self.connect()
+        function = getattr(self.contract.functions, function_name)(*args)
+        return await asyncio.wait_for(
+            function.call(block_identifier=block_identifier),
+            self.request_timeout
         )
 
+    async def _cached_call(
+        self,
+        function_name: str,
+        *args,
+        ttl: int,
+        block_identifier: Any = "latest"
+    ):
+        """
+        读穿缓存的合约只读调用
+
+        缓存键为 (函数, 参数, 区块标签)；同一键的并发调用只发起一次RPC，
+        其余调用等待同一结果。调用失败不写缓存
+
+        Args:
+            function_name: 合约函数名
+            *args: 函数参数
+            ttl: 缓存过期时间（秒）
+            block_identifier: 区块标签或区块号
+
+        Returns:
+            调用结果（JSON形式，元组返回为列表）
+        """
+        key = CacheService.chain_read_key(function_name, args, block_identifier)
+
+        cached = await CacheService.get_chain_read_cache(key)
+        if cached is not None:
+            self.cache_stats["hits"] += 1
+            return cached
+
+        self.cache_stats["misses"] += 1
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.cache_stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._call(function_name, *args, block_identifier=block_identifier)
+            if isinstance(result, tuple):
+                result = list(result)
+            await CacheService.set_chain_read_cache(key, result, ttl)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
     async def get_user_info(self, address: str) -> Dict[str, Any]:
         """
         查询用户信息
@@ -138,7 +264,7 @@ class Web3Client:
         """
         try:
             checksum_address = Web3.to_checksum_address(address)
-            result = self.contract.functions.getUserInfo(checksum_address).call()
+            result = await self._call("getUserInfo", checksum_address)
 
             return {
                 "referrer": result[0],
@@ -154,30 +280,87 @@ class Web3Client:
         """
         批量查询用户信息
 
+        使用合约原生的 batchGetUserInfo，地址按 WEB3_BATCH_CHUNK_SIZE 分块
+        （限制单次 eth_call 的数据量和执行gas）；所有块的 eth_call 打包为
+        一个JSON-RPC批量请求，返回数据按ABI批量解码
+
         Args:
             addresses: 用户钱包地址列表
 
         Returns:
-            批量用户信息
+            批量用户信息（各字段为与addresses顺序一致的列表）
         """
         try:
+            if self.contract is None:
+                await self.connect()
+
             checksum_addresses = [Web3.to_checksum_address(addr) for addr in addresses]
-            result = self.contract.functions.batchGetUserInfo(checksum_addresses).call()
+            chunk_size = settings.WEB3_BATCH_CHUNK_SIZE
+            chunks = [
+                checksum_addresses[i:i + chunk_size]
+                for i in range(0, len(checksum_addresses), chunk_size)
+            ]
+
+            return_data = await self._json_rpc_batch([
+                self.contract.encodeABI(fn_name="batchGetUserInfo", args=[chunk])
+                for chunk in chunks
+            ])
+
+            output_types = _output_types("batchGetUserInfo")
+            referrers, rewards, referred_counts = [], [], []
+            for data in return_data:
+                chunk_referrers, chunk_rewards, chunk_counts = abi_decode(output_types, data)
+                referrers.extend(Web3.to_checksum_address(referrer) for referrer in chunk_referrers)
+                rewards.extend(chunk_rewards)
+                referred_counts.extend(chunk_counts)
 
             return {
-                "referrers": result[0],
-                "rewards": result[1],
-                "referred_counts": result[2]
+                "referrers": referrers,
+                "rewards": rewards,
+                "referred_counts": referred_counts
             }
         except Exception as e:
             logger.error(f"批量获取用户信息失败: {e}")
             raise
 
+    async def _json_rpc_batch(self, call_data: List[str]) -> List[bytes]:
+        """
+        将多个合约 eth_call 打包为一个JSON-RPC批量请求
+
+        Args:
+            call_data: 已编码的调用数据列表
+
+        Returns:
+            与call_data顺序一致的返回数据
+        """
+        if not call_data:
+            return []
+
+        requests = [
+            ("eth_call", [{"to": self.contract.address, "data": data}, "latest"])
+            for data in call_data
+        ]
+        responses = await asyncio.wait_for(
+            self.w3.provider.make_batch_request(requests),
+            self.request_timeout
+        )
+
+        return_data = []
+        for response in responses:
+            if "error" in response:
+                raise ValueError(f"eth_call失败: {response['error']}")
+            return_data.append(bytes(HexBytes(response["result"])))
+        return return_data
+
     async def has_referrer(self, address: str) -> bool:
         """检查用户是否有推荐人"""
         try:
             checksum_address = Web3.to_checksum_address(address)
-            return self.contract.functions.hasReferrer(checksum_address).call()
+            return await self._cached_call(
+                "hasReferrer",
+                checksum_address,
+                ttl=CacheService.TTL_CHAIN_HAS_REFERRER
+            )
         except Exception as e:
             logger.error(f"检查推荐人失败: {e}")
             return False
@@ -186,7 +369,11 @@ class Web3Client:
         """检查用户是否活跃"""
         try:
             checksum_address = Web3.to_checksum_address(address)
-            return self.contract.functions.isUserActive(checksum_address).call()
+            return await self._cached_call(
+                "isUserActive",
+                checksum_address,
+                ttl=CacheService.TTL_CHAIN_USER_ACTIVE
+            )
         except Exception as e:
             logger.error(f"检查用户活跃状态失败: {e}")
             return False
@@ -194,7 +381,10 @@ class Web3Client:
     async def get_referral_config(self) -> Dict[str, int]:
         """获取推荐配置"""
         try:
-            result = self.contract.functions.getReferralConfig().call()
+            result = await self._cached_call(
+                "getReferralConfig",
+                ttl=CacheService.TTL_CHAIN_REFERRAL_CONFIG
+            )
             return {
                 "decimals": result[0],
                 "referral_bonus": result[1],
@@ -206,10 +396,15 @@ class Web3Client:
             logger.error(f"获取推荐配置失败: {e}")
             raise
 
-    def get_transaction_receipt(self, tx_hash: str) -> Optional[Dict]:
+    async def get_transaction_receipt(self, tx_hash: str) -> Optional[Dict]:
         """获取交易回执"""
         try:
-            return self.w3.eth.get_transaction_receipt(tx_hash)
+            if self.w3 is None:
+                await self.connect()
+            return await asyncio.wait_for(
+                self.w3.eth.get_transaction_receipt(tx_hash),
+                self.request_timeout
+            )
         except Exception as e:
             logger.error(f"获取交易回执失败: {e}")
             return None
@@ -9,6 +9,11 @@ import logging
 from app.core.config import settings
 from app.api.api import api_router
 from app.utils import redis_client
+from app.core.web3_client import web3_client
+from app.db.session import AsyncSessionLocal
+from app.services.mv_refresh_scheduler import initialize_mv_refresh_scheduler, get_mv_refresh_scheduler
+from app.services.invite_code_service import InviteCodeService
+from app.services.points_service import PointsService
 
 # 配置日志
 logging.basicConfig(
@@ -57,7 +62,11 @@ async def health_check():
     return {
         "status": "healthy",
         "database": "connected",  # TODO: 实际检查数据库连接
-        "blockchain": "connected"  # TODO: 实际检查区块链连接
+        "blockchain": "connected",  # TODO: 实际检查区块链连接
+        "rpc_endpoints": web3_client.get_rpc_stats(),
+        "chain_read_cache": web3_client.get_cache_stats(),
+        "invite_code_cache": InviteCodeService.cache_stats(),
+        "user_id_cache": PointsService.user_id_cache_stats()
     }
 
 
@@ -76,18 +85,50 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"⚠️  Redis连接初始化失败（将在无缓存模式下运行）: {e}")
 
+    # 预热头部推荐人的邀请码解析缓存
+    try:
+        async with AsyncSessionLocal() as db:
+            await InviteCodeService.warm(db, settings.INVITE_CODE_WARM_SIZE)
+    except Exception as e:
+        logger.warning(f"⚠️  邀请码缓存预热失败（将按需加载）: {e}")
+
+    # 初始化区块链RPC连接池
+    try:
+        await web3_client.connect()
+        logger.info("✅ 区块链RPC连接池初始化成功")
+    except Exception as e:
+        logger.warning(f"⚠️  区块链RPC连接初始化失败（链上查询将在首次调用时重试）: {e}")
+
+    # 启动物化视图刷新调度器
+    if settings.MV_REFRESH_ENABLED:
+        scheduler = initialize_mv_refresh_scheduler(
+            window_seconds=settings.MV_REFRESH_WINDOW_SECONDS
+        )
+        await scheduler.start()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭事件"""
     logger.info(f"👋 {settings.APP_NAME} shutting down...")
 
+    # 停止物化视图刷新调度器
+    scheduler = get_mv_refresh_scheduler()
+    if scheduler:
+        await scheduler.stop()
+
     # 关闭Redis连接
     try:
         await redis_client.disconnect()
     except Exception as e:
         logger.warning(f"⚠️  Redis断开连接时出错: {e}")
 
+    # 关闭区块链RPC连接池
+    try:
+        await web3_client.close()
+    except Exception as e:
+        logger.warning(f"⚠️  关闭区块链RPC连接池时出错: {e}")
+
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -7,10 +7,14 @@ from .user import User
 from .user_points import UserPoints
 from .point_transaction import PointTransaction, PointTransactionType
 from .referral_relation import ReferralRelation
+from .referral_closure import ReferralClosure
+from .invite_code import InviteCode
 from .team import Team
 from .team_member import TeamMember, TeamMemberRole, TeamMemberStatus
 from .team_task import TeamTask, TeamTaskStatus
 from .task import Task, UserTask, TaskType, TaskTrigger, UserTaskStatus
+from .event_checkpoint import EventCheckpoint
+from .processed_event import ProcessedEvent
 from .quiz import Question, UserAnswer, DailyQuizSession, QuestionDifficulty, QuestionSource, QuestionStatus
 
 __all__ = [
@@ -20,6 +24,8 @@ __all__ = [
     "PointTransaction",
     "PointTransactionType",
     "ReferralRelation",
+    "ReferralClosure",
+    "InviteCode",
     "Team",
     "TeamMember",
     "TeamMemberRole",
@@ -37,4 +43,6 @@ __all__ = [
     "QuestionDifficulty",
     "QuestionSource",
     "QuestionStatus",
+    "EventCheckpoint",
+    "ProcessedEvent",
 ]
@@ -0,0 +1,35 @@
+"""
+事件监听检查点模型
+"""
+
+from sqlalchemy import Column, BigInteger, Integer, String, TIMESTAMP, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class EventCheckpoint(Base):
+    """事件监听检查点表（每条链+合约一行）"""
+
+    __tablename__ = "event_checkpoints"
+
+    # 主键
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+
+    # 监听目标
+    chain_id = Column(Integer, nullable=False)
+    contract_address = Column(String(42), nullable=False)
+
+    # 进度
+    last_processed_block = Column(BigInteger, nullable=False)
+
+    # 时间戳
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    # 约束
+    __table_args__ = (
+        UniqueConstraint("chain_id", "contract_address", name="uq_event_checkpoint_target"),
+    )
+
+    def __repr__(self):
+        return f"<EventCheckpoint(chain_id={self.chain_id}, contract={self.contract_address[:10]}..., block={self.last_processed_block})>"
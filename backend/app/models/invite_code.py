@@ -0,0 +1,26 @@
+"""
+邀请码索引模型
+"""
+
+from sqlalchemy import Column, BigInteger, String, TIMESTAMP
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class InviteCode(Base):
+    """随机邀请码索引（未注册钱包生成的6位邀请码 → 钱包地址；USER格式邀请码由用户ID直接推导，不入表）"""
+
+    __tablename__ = "invite_codes"
+
+    # 主键
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+
+    # 邀请码与所属钱包（每个钱包一个邀请码）
+    code = Column(String(16), unique=True, nullable=False, index=True)
+    wallet_address = Column(String(42), unique=True, nullable=False, index=True)
+
+    # 时间戳
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+    def __repr__(self):
+        return f"<InviteCode(code={self.code}, wallet={self.wallet_address[:10]}...)>"
@@ -2,7 +2,7 @@
 积分交易流水模型
 """
 
-from sqlalchemy import Column, BigInteger, String, ForeignKey, TIMESTAMP, CheckConstraint, Enum as SQLEnum
+from sqlalchemy import Column, BigInteger, String, ForeignKey, TIMESTAMP, CheckConstraint, Index, Enum as SQLEnum
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import JSONB
 from app.db.session import Base
@@ -64,6 +64,8 @@ class PointTransaction(Base):
     # 约束
     __table_args__ = (
         CheckConstraint("amount != 0", name="amount_not_zero"),
+        # 用户流水游标分页
+        Index("ix_point_transactions_user_created_id", "user_id", "created_at", "id"),
     )
 
     def __repr__(self):
@@ -0,0 +1,35 @@
+"""
+已处理链上事件模型
+"""
+
+from sqlalchemy import Column, BigInteger, Integer, String, TIMESTAMP, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class ProcessedEvent(Base):
+    """已处理事件台账（按 (transaction_hash, log_index) 唯一，保证每条日志只应用一次）"""
+
+    __tablename__ = "processed_events"
+
+    # 主键
+    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+
+    # 日志标识
+    transaction_hash = Column(String(66), nullable=False)
+    log_index = Column(Integer, nullable=False)
+
+    # 事件信息
+    event_name = Column(String(50), nullable=False)
+    block_number = Column(BigInteger, nullable=False, index=True)
+
+    # 时间戳
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+    # 约束
+    __table_args__ = (
+        UniqueConstraint("transaction_hash", "log_index", name="uq_processed_event_log"),
+    )
+
+    def __repr__(self):
+        return f"<ProcessedEvent(tx={self.transaction_hash[:10]}..., log_index={self.log_index}, event={self.event_name})>"
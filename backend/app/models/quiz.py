@@ -2,7 +2,7 @@
 问答系统模型
 """
 import enum
-from sqlalchemy import Column, BigInteger, String, Integer, Boolean, TIMESTAMP, Text, ForeignKey, CheckConstraint, ARRAY, Enum as SQLEnum, DECIMAL, Date, CHAR
+from sqlalchemy import Column, BigInteger, String, Integer, Boolean, TIMESTAMP, Text, ForeignKey, CheckConstraint, Index, ARRAY, Enum as SQLEnum, DECIMAL, Date, CHAR
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -142,6 +142,8 @@ class UserAnswer(Base):
         CheckConstraint("user_answer IN ('A', 'B', 'C', 'D')", name="check_user_answer_valid"),
         CheckConstraint("points_earned >= 0", name="check_points_earned_non_negative"),
         CheckConstraint("answer_time >= 0", name="check_answer_time_non_negative"),
+        # 答题记录游标分页
+        Index("ix_user_answers_user_answered_id", "user_id", "answered_at", "id"),
     )
 
     def __repr__(self):
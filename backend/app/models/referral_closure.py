@@ -0,0 +1,31 @@
+"""
+推荐关系闭包表模型
+"""
+
+from sqlalchemy import Column, BigInteger, Integer, ForeignKey, CheckConstraint, Index
+from app.db.session import Base
+
+
+class ReferralClosure(Base):
+    """推荐关系闭包表（每对 祖先-后代 一行，depth=1 为直接推荐，不含自身行）"""
+
+    __tablename__ = "referral_closure"
+
+    # 祖先（上级）与后代（下级）
+    ancestor_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    # 层级距离
+    depth = Column(Integer, nullable=False)
+
+    # 约束
+    __table_args__ = (
+        CheckConstraint("depth >= 1", name="check_closure_depth_positive"),
+        # 按层级统计/分页下级
+        Index("ix_referral_closure_ancestor_depth", "ancestor_id", "depth", "descendant_id"),
+        # 查询上级链
+        Index("ix_referral_closure_descendant_depth", "descendant_id", "depth"),
+    )
+
+    def __repr__(self):
+        return f"<ReferralClosure(ancestor_id={self.ancestor_id}, descendant_id={self.descendant_id}, depth={self.depth})>"
@@ -2,8 +2,8 @@
 任务系统模型
 """
 import enum
-from sqlalchemy import Column, BigInteger, String, Integer, Boolean, TIMESTAMP, Text, ForeignKey, CheckConstraint, ARRAY, Enum as SQLEnum, DECIMAL
-from sqlalchemy.sql import func
+from sqlalchemy import Column, BigInteger, String, Integer, Boolean, TIMESTAMP, Text, ForeignKey, CheckConstraint, Index, ARRAY, Enum as SQLEnum, DECIMAL
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 
 from app.db.session import Base
@@ -162,6 +162,16 @@ class UserTask(Base):
         CheckConstraint("target_value >= 1", name="check_ut_target_value_positive"),
         CheckConstraint("reward_points > 0", name="check_ut_reward_points_positive"),
         CheckConstraint("bonus_points >= 0", name="check_bonus_points_non_negative"),
+        # 用户任务游标分页
+        Index("ix_user_tasks_user_created_id", "user_id", "created_at", "id"),
+        # 同一用户同一任务最多一条进行中/已完成记录
+        Index(
+            "uq_user_tasks_user_task_active",
+            "user_id",
+            "task_id",
+            unique=True,
+            postgresql_where=text("status IN ('IN_PROGRESS', 'COMPLETED')")
+        ),
     )
 
     @property
@@ -67,9 +67,10 @@ class PointTransactionCreate(BaseModel):
 class PointsHistoryResponse(BaseModel):
     """积分历史响应模型(分页)"""
 
-    total: int = Field(..., description="总记录数")
+    total: Optional[int] = Field(None, description="总记录数（include_total=false 时不返回）")
     page: int = Field(..., description="当前页码")
     page_size: int = Field(..., description="每页大小")
+    next_cursor: Optional[str] = Field(None, description="下一页游标，为空表示已到末页")
     data: List[PointTransactionResponse] = Field(..., description="交易记录列表")
 
 
@@ -83,6 +84,7 @@ class PointsStatistics(BaseModel):
     task_points: int = Field(..., description="任务奖励积分")
     quiz_points: int = Field(..., description="答题奖励积分")
     team_points: int = Field(..., description="战队奖励积分")
+    generated_at: Optional[str] = Field(None, description="统计快照生成时间(UTC)")
 
 
 class PointsExchangeRequest(BaseModel):
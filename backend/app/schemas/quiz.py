@@ -174,9 +174,10 @@ class UserAnswerDetailResponse(UserAnswerResponse):
 
 class UserAnswerListResponse(BaseModel):
     """答题记录列表响应"""
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
     data: List[UserAnswerDetailResponse]
 
 
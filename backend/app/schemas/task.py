@@ -147,9 +147,10 @@ class UserTaskDetailResponse(UserTaskResponse):
 
 class UserTaskListResponse(BaseModel):
     """用户任务列表响应"""
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
     data: List[UserTaskDetailResponse]
 
 
@@ -65,7 +65,7 @@ class TeamListResponse(BaseModel):
     total: int
     page: int
     page_size: int
-    data: List[TeamResponse]
+    data: List[TeamDetailResponse]
 
 
 # ============= 战队成员 Schemas =============
@@ -19,12 +19,25 @@ class CacheService:
     KEY_PREFIX_USER_BALANCE = "balance:user:"
     KEY_PREFIX_LEADERBOARD = "leaderboard:"
     KEY_PREFIX_TEAM_STATS = "team:stats:"
+    KEY_PREFIX_CHAIN_READ = "chain:read:"
+    KEY_POINTS_STATISTICS = "points:statistics"
+    KEY_PREFIX_INVITE_CODE = "invite_code:"
 
     # 缓存过期时间（秒）
     TTL_USER_POINTS = 300  # 5分钟
     TTL_USER_BALANCE = 60  # 1分钟
     TTL_LEADERBOARD = 600  # 10分钟
+    TTL_LEADERBOARD_AROUND = 600  # 10分钟（视图刷新后主动失效）
+    TTL_POINTS_STATISTICS = 60  # 1分钟（全局统计快照）
     TTL_TEAM_STATS = 300  # 5分钟
+    TTL_CHAIN_REFERRAL_CONFIG = 3600  # 1小时（pure函数，几乎不变）
+    TTL_CHAIN_HAS_REFERRER = 300  # 5分钟（另由事件监听主动失效）
+    TTL_CHAIN_USER_ACTIVE = 60  # 1分钟（随时间推移变化）
+    TTL_INVITE_CODE = 3600  # 1小时（邀请码与钱包的对应关系不变）
+    TTL_INVITE_CODE_MISS = 60  # 1分钟（无效邀请码负缓存，挡住扫描请求）
+
+    # 链上读取中按地址缓存、需要被事件失效的合约函数
+    CHAIN_READ_USER_FUNCTIONS = ("hasReferrer", "isUserActive")
 
     @staticmethod
     async def get_user_points_cache(user_id: int) -> Optional[dict]:
@@ -241,17 +254,113 @@ class CacheService:
             logger.warning(f"⚠️  设置排行榜缓存失败: {e}")
             return False
 
+    @staticmethod
+    async def get_points_statistics_cache() -> Optional[dict]:
+        """
+        获取积分全局统计快照
+
+        Returns:
+            统计数据字典，未缓存返回None
+        """
+        try:
+            cached_data = await redis_client.get(CacheService.KEY_POINTS_STATISTICS)
+            if cached_data:
+                return json.loads(cached_data)
+            return None
+
+        except Exception as e:
+            logger.warning(f"⚠️  获取积分统计快照失败: {e}")
+            return None
+
+    @staticmethod
+    async def set_points_statistics_cache(statistics: dict) -> bool:
+        """
+        设置积分全局统计快照
+
+        Args:
+            statistics: 统计数据字典
+
+        Returns:
+            是否成功
+        """
+        try:
+            return await redis_client.set(
+                CacheService.KEY_POINTS_STATISTICS,
+                json.dumps(statistics, default=str),
+                ex=CacheService.TTL_POINTS_STATISTICS
+            )
+
+        except Exception as e:
+            logger.warning(f"⚠️  设置积分统计快照失败: {e}")
+            return False
+
+    @staticmethod
+    async def get_leaderboard_around_cache(leaderboard_type: str, bucket: int) -> Optional[list]:
+        """
+        获取排名区间缓存（"我附近的排名"）
+
+        Args:
+            leaderboard_type: 排行榜类型
+            bucket: 排名分桶编号
+
+        Returns:
+            缓存的排行榜条目
+        """
+        try:
+            key = f"{CacheService.KEY_PREFIX_LEADERBOARD}{leaderboard_type}:around:{bucket}"
+            cached_data = await redis_client.get(key)
+
+            if cached_data:
+                logger.debug(f"🎯 排名区间缓存命中: {leaderboard_type}:bucket={bucket}")
+                return json.loads(cached_data)
+
+            return None
+
+        except Exception as e:
+            logger.warning(f"⚠️  获取排名区间缓存失败: {e}")
+            return None
+
+    @staticmethod
+    async def set_leaderboard_around_cache(
+        leaderboard_type: str,
+        bucket: int,
+        entries: list
+    ) -> bool:
+        """
+        设置排名区间缓存
+
+        Args:
+            leaderboard_type: 排行榜类型
+            bucket: 排名分桶编号
+            entries: 分桶覆盖范围内的排行榜条目
+
+        Returns:
+            是否成功
+        """
+        try:
+            key = f"{CacheService.KEY_PREFIX_LEADERBOARD}{leaderboard_type}:around:{bucket}"
+            value = json.dumps(entries, ensure_ascii=False, default=str)
+            return await redis_client.set(
+                key,
+                value,
+                ex=CacheService.TTL_LEADERBOARD_AROUND
+            )
+
+        except Exception as e:
+            logger.warning(f"⚠️  设置排名区间缓存失败: {e}")
+            return False
+
     @staticmethod
     async def invalidate_leaderboard_cache(leaderboard_type: str):
         """
-        使排行榜缓存失效（所有页）
+        使排行榜缓存失效（所有页和排名区间）
 
         Args:
             leaderboard_type: 排行榜类型
         """
         try:
-            # 删除所有相关页的缓存
-            pattern = f"{CacheService.KEY_PREFIX_LEADERBOARD}{leaderboard_type}:page:*"
+            # 删除所有相关页和排名区间的缓存
+            pattern = f"{CacheService.KEY_PREFIX_LEADERBOARD}{leaderboard_type}:*"
             # Redis SCAN命令遍历删除
             keys = []
             cursor = 0
@@ -272,6 +381,150 @@ class CacheService:
         except Exception as e:
             logger.warning(f"⚠️  排行榜缓存失效失败: {e}")
 
+    @staticmethod
+    async def get_invite_code_cache(code: str) -> Optional[dict]:
+        """
+        获取邀请码解析缓存
+
+        Args:
+            code: 邀请码
+
+        Returns:
+            解析结果；空字典表示已缓存的无效邀请码；不存在返回None
+        """
+        try:
+            cached_data = await redis_client.get(f"{CacheService.KEY_PREFIX_INVITE_CODE}{code}")
+            return json.loads(cached_data) if cached_data is not None else None
+
+        except Exception as e:
+            logger.warning(f"⚠️  获取邀请码缓存失败: {e}")
+            return None
+
+    @staticmethod
+    async def set_invite_code_cache(code: str, resolved: Optional[dict]) -> bool:
+        """
+        设置邀请码解析缓存
+
+        Args:
+            code: 邀请码
+            resolved: 解析结果，None 表示无效邀请码（以较短TTL负缓存）；
+                钱包尚未注册（user_id为空）的结果注册后会变化，同样使用较短TTL
+
+        Returns:
+            是否成功
+        """
+        try:
+            return await redis_client.set(
+                f"{CacheService.KEY_PREFIX_INVITE_CODE}{code}",
+                json.dumps(resolved or {}, ensure_ascii=False),
+                ex=(
+                    CacheService.TTL_INVITE_CODE if resolved and resolved.get("user_id")
+                    else CacheService.TTL_INVITE_CODE_MISS
+                )
+            )
+
+        except Exception as e:
+            logger.warning(f"⚠️  设置邀请码缓存失败: {e}")
+            return False
+
+    @staticmethod
+    async def invalidate_invite_code_cache(*codes: str):
+        """
+        使邀请码解析缓存失效（邀请码创建或所属用户注册后调用，清除此前的负缓存）
+
+        Args:
+            codes: 邀请码
+        """
+        if not codes:
+            return
+
+        try:
+            await redis_client.delete(*(f"{CacheService.KEY_PREFIX_INVITE_CODE}{code}" for code in codes))
+            logger.debug(f"🗑️  邀请码缓存失效: {', '.join(codes)}")
+
+        except Exception as e:
+            logger.warning(f"⚠️  邀请码缓存失效失败: {e}")
+
+    @staticmethod
+    def chain_read_key(function_name: str, args: tuple = (), block_tag: str = "latest") -> str:
+        """
+        生成链上读取缓存键 chain:read:{函数}:{参数}:{区块标签}
+
+        Args:
+            function_name: 合约函数名
+            args: 调用参数（地址统一小写）
+            block_tag: 区块标签或区块号
+
+        Returns:
+            缓存键
+        """
+        arg_part = ",".join(str(arg).lower() for arg in args)
+        return f"{CacheService.KEY_PREFIX_CHAIN_READ}{function_name}:{arg_part}:{block_tag}"
+
+    @staticmethod
+    async def get_chain_read_cache(key: str) -> Optional[Any]:
+        """
+        获取链上读取缓存
+
+        Args:
+            key: 缓存键（见 chain_read_key）
+
+        Returns:
+            缓存的调用结果，不存在返回None
+        """
+        try:
+            cached_data = await redis_client.get(key)
+            return json.loads(cached_data) if cached_data is not None else None
+
+        except Exception as e:
+            logger.warning(f"⚠️  获取链上读取缓存失败: {e}")
+            return None
+
+    @staticmethod
+    async def set_chain_read_cache(key: str, value: Any, ttl: int) -> bool:
+        """
+        设置链上读取缓存
+
+        Args:
+            key: 缓存键
+            value: 调用结果（可JSON序列化）
+            ttl: 过期时间（秒）
+
+        Returns:
+            是否成功
+        """
+        try:
+            return await redis_client.set(key, json.dumps(value), ex=ttl)
+
+        except Exception as e:
+            logger.warning(f"⚠️  设置链上读取缓存失败: {e}")
+            return False
+
+    @staticmethod
+    async def invalidate_chain_reads(*addresses: str):
+        """
+        使地址相关的链上读取缓存失效（链上状态变化的事件到达时调用）
+
+        只有 latest 标签的结果会过时，指定区块号的历史读取不受影响
+
+        Args:
+            addresses: 钱包地址
+        """
+        keys = [
+            CacheService.chain_read_key(function_name, (address,))
+            for address in set(a.lower() for a in addresses)
+            for function_name in CacheService.CHAIN_READ_USER_FUNCTIONS
+        ]
+        if not keys:
+            return
+
+        try:
+            await redis_client.delete(*keys)
+            logger.debug(f"🗑️  链上读取缓存失效: {len(addresses)}个地址")
+
+        except Exception as e:
+            logger.warning(f"⚠️  链上读取缓存失效失败: {e}")
+
 
 def with_cache(
     cache_getter: Callable,
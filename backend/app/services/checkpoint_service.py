@@ -0,0 +1,82 @@
+"""
+事件检查点服务
+持久化事件监听进度，与积分写入处于同一事务
+"""
+
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from loguru import logger
+
+from app.models import EventCheckpoint
+
+
+class CheckpointService:
+    """检查点服务类"""
+
+    @staticmethod
+    async def get_checkpoint(
+        db: AsyncSession,
+        chain_id: int,
+        contract_address: str
+    ) -> Optional[int]:
+        """
+        读取最后处理的区块号
+
+        Args:
+            db: 数据库会话
+            chain_id: 链ID
+            contract_address: 合约地址
+
+        Returns:
+            最后处理的区块号，不存在返回None
+        """
+        result = await db.execute(
+            select(EventCheckpoint.last_processed_block).where(
+                EventCheckpoint.chain_id == chain_id,
+                EventCheckpoint.contract_address == contract_address.lower()
+            )
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def save_checkpoint(
+        db: AsyncSession,
+        chain_id: int,
+        contract_address: str,
+        block_number: int,
+        allow_rewind: bool = False
+    ):
+        """
+        写入检查点（不提交事务，由调用方与积分写入一并提交）
+
+        使用 INSERT ... ON CONFLICT DO UPDATE，单次往返完成upsert。
+        默认只前进不后退，历史回填不会把实时监听的进度拉回去
+
+        Args:
+            db: 数据库会话
+            chain_id: 链ID
+            contract_address: 合约地址
+            block_number: 最后处理的区块号
+            allow_rewind: 是否允许检查点后退
+        """
+        stmt = pg_insert(EventCheckpoint).values(
+            chain_id=chain_id,
+            contract_address=contract_address.lower(),
+            last_processed_block=block_number
+        )
+        new_block = stmt.excluded.last_processed_block
+        if not allow_rewind:
+            new_block = func.greatest(EventCheckpoint.last_processed_block, new_block)
+
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_event_checkpoint_target",
+            set_={
+                "last_processed_block": new_block,
+                "updated_at": func.now()
+            }
+        )
+        await db.execute(stmt)
+
+        logger.debug(f"📍 检查点更新: chain_id={chain_id}, block={block_number}")
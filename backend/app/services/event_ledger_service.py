@@ -0,0 +1,110 @@
+"""
+事件台账服务
+以 (transaction_hash, log_index) 为键保证链上事件只被应用一次
+"""
+
+from typing import List, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from loguru import logger
+
+from app.models import ProcessedEvent
+
+
+class EventLedgerService:
+    """事件台账服务类"""
+
+    @staticmethod
+    async def claim_events(
+        db: AsyncSession,
+        events: List[dict]
+    ) -> Set[Tuple[str, int]]:
+        """
+        批量登记事件，返回本次新登记（尚未处理过）的事件键
+
+        INSERT ... ON CONFLICT DO NOTHING RETURNING，一次往返完成去重；
+        与积分写入处于同一事务，回滚时登记一并撤销
+
+        Args:
+            db: 数据库会话
+            events: 已解码的事件列表（含 event_name, transaction_hash, log_index, block_number）
+
+        Returns:
+            新登记事件的 (transaction_hash, log_index) 集合
+        """
+        if not events:
+            return set()
+
+        rows = [
+            {
+                "transaction_hash": event['transaction_hash'],
+                "log_index": event['log_index'],
+                "event_name": event['event_name'],
+                "block_number": event['block_number']
+            }
+            for event in events
+        ]
+
+        stmt = pg_insert(ProcessedEvent).values(rows)
+        stmt = stmt.on_conflict_do_nothing(
+            constraint="uq_processed_event_log"
+        ).returning(ProcessedEvent.transaction_hash, ProcessedEvent.log_index)
+
+        result = await db.execute(stmt)
+        claimed = {(row.transaction_hash, row.log_index) for row in result}
+
+        skipped = len(rows) - len(claimed)
+        if skipped:
+            logger.info(f"⏭️  跳过 {skipped} 个已处理事件")
+
+        return claimed
+
+    @staticmethod
+    async def claim_event(
+        db: AsyncSession,
+        event_name: str,
+        tx_hash: str,
+        log_index: int,
+        block_number: int
+    ) -> bool:
+        """
+        登记单个事件
+
+        Args:
+            db: 数据库会话
+            event_name: 事件名称
+            tx_hash: 交易哈希
+            log_index: 日志索引
+            block_number: 区块号
+
+        Returns:
+            是否为首次登记（False表示已处理过，应跳过）
+        """
+        claimed = await EventLedgerService.claim_events(db, [{
+            "event_name": event_name,
+            "transaction_hash": tx_hash,
+            "log_index": log_index,
+            "block_number": block_number
+        }])
+        return (tx_hash, log_index) in claimed
+
+    @staticmethod
+    async def release_events(
+        db: AsyncSession,
+        after_block: int
+    ) -> int:
+        """
+        移除指定区块之后的事件登记（区块重组回滚时使用，不提交事务）
+
+        Args:
+            db: 数据库会话
+            after_block: 最后一个仍有效的区块
+
+        Returns:
+            移除的登记条数
+        """
+        result = await db.execute(
+            delete(ProcessedEvent).where(ProcessedEvent.block_number > after_block)
+        )
+        return result.rowcount
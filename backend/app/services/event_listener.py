@@ -4,7 +4,9 @@
 """
 
 import asyncio
-from typing import Optional, Dict, Any
+import time
+from collections import deque, OrderedDict
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 from loguru import logger
@@ -14,32 +16,67 @@ from web3.exceptions import Web3Exception
 from app.utils.web3_client import Web3Client
 from app.db.session import AsyncSessionLocal
 from app.utils.retry import async_retry, CircuitBreaker
+from app.utils.block_range import AdaptiveBlockRange
+from app.services.cache_service import CacheService
+from app.services.checkpoint_service import CheckpointService
+from app.services.event_ledger_service import EventLedgerService
+from app.services.materialized_view_service import MaterializedViewService
+from app.services.realtime_leaderboard_service import RealtimeLeaderboardService
 
 
 class EventListenerService:
     """事件监听服务类"""
 
+    # 批量模式下单次 eth_getLogs 拉取的事件
+    BATCH_EVENT_NAMES = ['RewardCalculated', 'UserPurchased', 'RegisteredReferrer']
+
     def __init__(
         self,
         web3_client: Web3Client,
         start_block: Optional[int] = None,
         poll_interval: int = 5,
-        max_retries: int = 3
+        max_retries: int = 3,
+        batch_mode: bool = False,
+        commit_batch_size: int = 500,
+        max_block_range: int = 5000,
+        confirmations: int = 0,
+        reorg_window: int = 64
     ):
         """
         初始化事件监听服务
 
         Args:
             web3_client: Web3客户端实例
-            start_block: 起始区块号（None则从最新区块开始）
+            start_block: 起始区块号（仅在没有持久化检查点时使用，None则从最新区块开始）
             poll_interval: 轮询间隔（秒）
             max_retries: 最大重试次数
+            batch_mode: 是否启用批量摄取（单次getLogs + 单事务批量写入）
+            commit_batch_size: 批量模式下每个事务最多包含的事件数
+            max_block_range: 单次getLogs的最大区块跨度
+            confirmations: 确认深度（只处理 最新区块-confirmations 之前的区块）
+            reorg_window: 内存中保留的最近已处理区块哈希数量（用于检测重组）
         """
         self.web3_client = web3_client
         self.poll_interval = poll_interval
         self.max_retries = max_retries
+        self.batch_mode = batch_mode
+        self.commit_batch_size = max(1, commit_batch_size)
+        self.max_block_range = max(1, max_block_range)
+        self.confirmations = max(0, confirmations)
+        self.reorg_window = max(1, reorg_window)
         self.is_running = False
-        self.last_processed_block = start_block or web3_client.get_latest_block()
+        self.start_block = start_block
+        # 冷启动起点在 start() 中确定（需要异步查询链上区块）
+        self.last_processed_block = start_block
+
+        # 最近已处理区块的哈希环（区块号 -> 哈希，按区块号升序）
+        self.block_hashes: OrderedDict[int, str] = OrderedDict()
+
+        # 自适应区块跨度（节点拒绝时减半，成功后放大）
+        self.block_range = AdaptiveBlockRange(
+            initial_size=self.max_block_range,
+            max_size=self.max_block_range
+        )
 
         # 熔断器（防止持续失败）
         self.circuit_breaker = CircuitBreaker(
@@ -56,6 +93,9 @@ class EventListenerService:
         logger.info(f"📍 起始区块: {self.last_processed_block}")
         logger.info(f"⏱️  轮询间隔: {poll_interval}秒")
         logger.info(f"🔄 最大重试次数: {max_retries}")
+        logger.info(f"🧱 确认深度: {self.confirmations} 个区块")
+        if batch_mode:
+            logger.info(f"📦 批量摄取模式: 每事务最多 {self.commit_batch_size} 个事件")
 
     async def start(self):
         """启动事件监听"""
@@ -67,6 +107,8 @@ class EventListenerService:
         logger.info("🚀 启动事件监听服务...")
 
         try:
+            await self._restore_checkpoint()
+
             while self.is_running:
                 await self._poll_events()
                 await asyncio.sleep(self.poll_interval)
@@ -83,6 +125,131 @@ class EventListenerService:
         logger.info("🛑 正在停止事件监听服务...")
         self.is_running = False
 
+    async def _get_confirmed_block(self) -> int:
+        """获取已达到确认深度的最新区块号"""
+        return max(0, await self.web3_client.get_latest_block() - self.confirmations)
+
+    def _remember_block_hash(self, block_number: int, block_hash: str):
+        """
+        记录已处理区块的哈希，超出窗口时淘汰最旧的记录
+
+        Args:
+            block_number: 区块号
+            block_hash: 区块哈希
+        """
+        self.block_hashes[block_number] = block_hash
+        self.block_hashes.move_to_end(block_number)
+        while len(self.block_hashes) > self.reorg_window:
+            self.block_hashes.popitem(last=False)
+
+    async def _detect_reorg(self) -> Optional[int]:
+        """
+        检测已处理区块是否发生重组
+
+        先比对最近记录的区块哈希（区块哈希链式依赖，任何更早的
+        重组都会改变它）；不一致时从新到旧查找仍匹配的分叉点
+
+        Returns:
+            分叉点（最后一个仍有效的区块），未发生重组返回None
+        """
+        if not self.block_hashes:
+            return None
+
+        latest_recorded = next(reversed(self.block_hashes))
+        if await self.web3_client.get_block_hash(latest_recorded) == self.block_hashes[latest_recorded]:
+            return None
+
+        # 超出窗口的深度重组：回退到窗口最旧区块之前
+        fork_block = next(iter(self.block_hashes)) - 1
+        for block_number in reversed(list(self.block_hashes)):
+            if await self.web3_client.get_block_hash(block_number) == self.block_hashes[block_number]:
+                fork_block = block_number
+                break
+        else:
+            logger.error(
+                f"❌ 区块重组深度超出窗口 ({self.reorg_window})，回退到区块 {fork_block}"
+            )
+
+        return fork_block
+
+    async def _rollback_to(self, fork_block: int):
+        """
+        回滚分叉点之后的所有链上事件写入
+
+        冲正积分流水、删除事件登记并回退检查点，在同一事务中完成；
+        之后的轮询会从分叉点重新摄取规范链上的事件
+
+        Args:
+            fork_block: 最后一个仍有效的区块
+        """
+        from app.services.points_service import PointsService
+
+        logger.warning(
+            f"🔀 检测到区块重组: 回滚区块 {fork_block + 1} 到 {self.last_processed_block}"
+        )
+
+        async with AsyncSessionLocal() as db:
+            try:
+                await PointsService.reverse_chain_events(db, after_block=fork_block)
+                await EventLedgerService.release_events(db, after_block=fork_block)
+                await CheckpointService.save_checkpoint(
+                    db,
+                    chain_id=self.web3_client.chain_id,
+                    contract_address=self.web3_client.contract_address,
+                    block_number=fork_block,
+                    allow_rewind=True
+                )
+                await db.commit()
+                await RealtimeLeaderboardService.apply_staged(db)
+                await MaterializedViewService.mark_dirty(MaterializedViewService.MV_POINTS_LEADERBOARD)
+            except Exception as e:
+                RealtimeLeaderboardService.discard_staged(db)
+                await db.rollback()
+                logger.error(f"❌ 区块重组回滚失败: {e}")
+                raise
+
+        for block_number in [b for b in self.block_hashes if b > fork_block]:
+            del self.block_hashes[block_number]
+        self.last_processed_block = fork_block
+
+    async def _restore_checkpoint(self):
+        """
+        从数据库恢复最后处理的区块
+
+        存在检查点时从检查点继续（忽略start_block），
+        否则沿用start_block或最新区块作为冷启动起点
+        """
+        async with AsyncSessionLocal() as db:
+            checkpoint = await CheckpointService.get_checkpoint(
+                db,
+                chain_id=self.web3_client.chain_id,
+                contract_address=self.web3_client.contract_address
+            )
+
+        if checkpoint is not None:
+            self.last_processed_block = checkpoint
+            logger.info(f"📍 从检查点恢复: 最后处理区块 {checkpoint}")
+        else:
+            if self.last_processed_block is None:
+                self.last_processed_block = await self._get_confirmed_block()
+            logger.info(f"📍 未找到检查点，从区块 {self.last_processed_block} 开始")
+
+    async def _save_checkpoint(self, block_number: int):
+        """
+        单独提交检查点（用于没有事件写入的区块范围）
+
+        Args:
+            block_number: 最后处理的区块号
+        """
+        async with AsyncSessionLocal() as db:
+            await CheckpointService.save_checkpoint(
+                db,
+                chain_id=self.web3_client.chain_id,
+                contract_address=self.web3_client.contract_address,
+                block_number=block_number
+            )
+            await db.commit()
+
     async def _check_connection(self) -> bool:
         """
         检查Web3连接状态
@@ -91,7 +258,7 @@ class EventListenerService:
             连接是否正常
         """
         try:
-            is_connected = self.web3_client.is_connected()
+            is_connected = await self.web3_client.is_connected()
             if not is_connected:
                 logger.warning("⚠️  Web3连接断开，尝试重连...")
                 # TODO: 实现重连逻辑
@@ -127,50 +294,275 @@ class EventListenerService:
     )
     async def _do_poll_events(self):
         """执行实际的事件轮询（带重试机制）"""
-        current_block = self.web3_client.get_latest_block()
+        # 先检查已处理区块是否被重组
+        fork_block = await self._detect_reorg()
+        if fork_block is not None:
+            await self._rollback_to(fork_block)
+
+        # 只处理达到确认深度的区块
+        current_block = await self._get_confirmed_block()
 
         # 如果没有新区块，跳过
         if current_block <= self.last_processed_block:
             return
 
-        # 获取事件日志
+        # 按自适应跨度分段扫描，节点拒绝时缩小跨度重试
         from_block = self.last_processed_block + 1
-        to_block = current_block
 
-        logger.debug(f"📊 扫描区块 {from_block} 到 {to_block}")
+        while from_block <= current_block:
+            to_block = self.block_range.chunk_end(from_block, current_block)
+
+            logger.debug(f"📊 扫描区块 {from_block} 到 {to_block}")
+
+            try:
+                # 在拉取日志之前记录哈希：期间若发生重组，下一轮会检测到并回滚重放
+                to_block_hash = await self.web3_client.get_block_hash(to_block)
+
+                failed = 0
+                if self.batch_mode:
+                    # 批量模式：单次getLogs，按链上顺序分事务写入（检查点在事务内推进）
+                    await self._process_events_batch(from_block, to_block)
+                else:
+                    # 监听多个事件（逐事件提交，已处理的事件由账本去重）
+                    failed += await self._process_reward_calculated_events(from_block, to_block)
+                    failed += await self._process_user_purchased_events(from_block, to_block)
+                    failed += await self._process_referrer_registered_events(from_block, to_block)
+
+            except Exception as e:
+                if AdaptiveBlockRange.is_range_error(e) and self.block_range.shrink():
+                    logger.warning(
+                        f"⚠️  区块范围 {from_block}-{to_block} 被节点拒绝，"
+                        f"跨度缩小为 {self.block_range.size}: {e}"
+                    )
+                    continue
+                raise
+
+            self.block_range.grow()
+
+            if failed:
+                # 有事件失败时检查点不前进：下一轮从同一区块重试，成功过的事件按账本跳过
+                logger.error(
+                    f"❌ 区块 {from_block} 到 {to_block} 中有 {failed} 个事件处理失败，"
+                    f"检查点停在区块 {self.last_processed_block}，下一轮重试"
+                )
+                return
+
+            # 持久化并更新最后处理的区块（批量模式已在写入事务中推进检查点）
+            if not self.batch_mode:
+                await self._save_checkpoint(to_block)
+            self.last_processed_block = to_block
+            self._remember_block_hash(to_block, to_block_hash)
+            from_block = to_block + 1
+
+    async def _process_events_batch(
+        self,
+        from_block: int,
+        to_block: int
+    ):
+        """
+        批量处理区块范围内的所有事件
+
+        单次 eth_getLogs 拉取全部关注事件，按 (block, logIndex) 排序后写入
+
+        Args:
+            from_block: 起始区块
+            to_block: 结束区块
+        """
+        logs = await self.web3_client.get_logs_batch(
+            event_names=self.BATCH_EVENT_NAMES,
+            from_block=from_block,
+            to_block=to_block
+        )
+
+        if logs:
+            logger.info(f"📦 发现 {len(logs)} 个事件 (区块 {from_block} 到 {to_block})")
+
+        # 检查点（推进到 to_block）与最后一批积分在同一事务中提交
+        await self._apply_logs_batch(logs, to_block=to_block)
 
-        # 监听多个事件
-        await self._process_reward_calculated_events(from_block, to_block)
-        await self._process_user_purchased_events(from_block, to_block)
-        await self._process_referrer_registered_events(from_block, to_block)
+    async def _apply_logs_batch(self, logs: list, to_block: Optional[int] = None):
+        """
+        在同一会话中分批写入已排序的事件日志
+
+        事务只在区块边界提交，检查点与积分在同一事务中写入，
+        进程崩溃或失败重试时不会重放已提交的区块
+
+        Args:
+            logs: 按 (blockNumber, logIndex) 排序的事件日志
+            to_block: 日志所在扫描范围的结束区块（可选）；
+                最后一个批次的检查点直接推进到该区块，无事件时单独提交检查点
+        """
+        if not logs:
+            if to_block is not None:
+                await self._save_checkpoint(to_block)
+                self.last_processed_block = to_block
+            return
+
+        events = [self.web3_client.decode_event(log) for log in logs]
+
+        async with AsyncSessionLocal() as db:
+            start = 0
+            while start < len(events):
+                # 批次至少包含 commit_batch_size 个事件，并延伸到区块末尾
+                end = min(start + self.commit_batch_size, len(events))
+                while end < len(events) and \
+                        events[end]['block_number'] == events[end - 1]['block_number']:
+                    end += 1
+
+                chunk = events[start:end]
+                # 最后一个批次之后直到 to_block 都没有事件，检查点一并推进
+                checkpoint_block = chunk[-1]['block_number']
+                if end == len(events) and to_block is not None:
+                    checkpoint_block = max(checkpoint_block, to_block)
+                try:
+                    await self._apply_events_batch(db, chunk)
+                    await CheckpointService.save_checkpoint(
+                        db,
+                        chain_id=self.web3_client.chain_id,
+                        contract_address=self.web3_client.contract_address,
+                        block_number=checkpoint_block
+                    )
+                    await db.commit()
+                    await RealtimeLeaderboardService.apply_staged(db)
+                    await MaterializedViewService.mark_dirty(MaterializedViewService.MV_POINTS_LEADERBOARD)
+                except Exception as e:
+                    RealtimeLeaderboardService.discard_staged(db)
+                    await db.rollback()
+                    logger.error(
+                        f"❌ 批量写入失败 (区块 {chunk[0]['block_number']} "
+                        f"到 {chunk[-1]['block_number']}): {e}"
+                    )
+                    raise
+
+                self.last_processed_block = checkpoint_block
+                logger.debug(
+                    f"💾 批次已提交: {len(chunk)} 个事件, "
+                    f"截至区块 {self.last_processed_block}"
+                )
+                start = end
+
+    async def _apply_events_batch(
+        self,
+        db: AsyncSession,
+        events: List[Dict[str, Any]]
+    ):
+        """
+        在当前事务中按顺序应用一批事件（不提交）
+
+        先在事件台账中一次性登记整批事件，只应用首次登记的部分，
+        重放和重叠的回填区间因此成为空操作。连续的RewardCalculated
+        事件合并为一次批量写入；遇到RegisteredReferrer时先落盘已累积
+        的奖励，保持链上顺序语义。新建立推荐关系的推荐人在批次末尾
+        一次性更新"邀请好友"任务进度
+
+        Args:
+            db: 数据库会话
+            events: 已解码并排序的事件列表
+        """
+        from app.services.points_service import PointsService
 
-        # 更新最后处理的区块
-        self.last_processed_block = current_block
+        claimed = await EventLedgerService.claim_events(db, events)
+
+        pending_rewards = []
+        new_referrers = []
+
+        for event_data in events:
+            if (event_data['transaction_hash'], event_data['log_index']) not in claimed:
+                continue
+
+            event_name = event_data['event_name']
+            args = event_data['args']
+
+            if event_name == 'RewardCalculated':
+                pending_rewards.append({
+                    'referrer_address': args['referrer'],
+                    'purchaser_address': args['purchaser'],
+                    'points_amount': int(args['pointsAmount']),
+                    'level': int(args['level']),
+                    'purchase_amount': int(args['purchaseAmount']),
+                    'tx_hash': event_data['transaction_hash'],
+                    'log_index': event_data['log_index'],
+                    'block_number': event_data['block_number']
+                })
+
+            elif event_name == 'RegisteredReferrer':
+                await PointsService.award_referral_points_batch(db, pending_rewards)
+                pending_rewards = []
+
+                synced = await PointsService.sync_referral_relation(
+                    db=db,
+                    referee_address=args['referee'],
+                    referrer_address=args['referrer'],
+                    tx_hash=event_data['transaction_hash'],
+                    block_number=event_data['block_number'],
+                    commit=False
+                )
+                if synced:
+                    new_referrers.append(args['referrer'].lower())
+                await CacheService.invalidate_chain_reads(args['referee'])
+
+            elif event_name == 'UserPurchased':
+                await self._handle_user_purchased(db, event_data)
+
+        await PointsService.award_referral_points_batch(db, pending_rewards)
+
+        # 新建立的推荐关系：推荐人的"邀请好友"任务进度一次批量更新
+        await self._bump_invite_progress(db, new_referrers)
+
+    @staticmethod
+    async def _bump_invite_progress(db: AsyncSession, referrer_addresses: List[str]):
+        """
+        新建立推荐关系的推荐人"邀请好友"任务进度+1（不提交，一次批量更新）
+
+        批量模式和逐条模式共用；区块重组回滚时由
+        PointsService.reverse_chain_events 按删除的推荐关系扣回
+
+        Args:
+            db: 数据库会话
+            referrer_addresses: 推荐人地址列表（每建立一条推荐关系出现一次）
+        """
+        from app.services.points_service import PointsService
+        from app.services.task_service import TaskService
+
+        if not referrer_addresses:
+            return
+
+        user_ids = await PointsService.get_or_create_user_ids(db, referrer_addresses)
+        await TaskService.apply_progress_batch(
+            db,
+            [(user_ids[address.lower()], "invite_friends", 1) for address in referrer_addresses],
+            assign_missing=True,
+            commit=False
+        )
 
     async def _process_reward_calculated_events(
         self,
         from_block: int,
         to_block: int
-    ):
+    ) -> int:
         """
         处理RewardCalculated事件
 
         Args:
             from_block: 起始区块
             to_block: 结束区块
+
+        Returns:
+            处理失败的事件数
         """
         try:
-            logs = self.web3_client.get_logs(
+            logs = await self.web3_client.get_logs(
                 event_name='RewardCalculated',
                 from_block=from_block,
                 to_block=to_block
             )
 
             if not logs:
-                return
+                return 0
 
             logger.info(f"🎁 发现 {len(logs)} 个RewardCalculated事件")
 
+            failed = 0
             async with AsyncSessionLocal() as db:
                 for log in logs:
                     try:
@@ -181,35 +573,42 @@ class EventListenerService:
                             f"❌ 处理单个RewardCalculated事件失败 "
                             f"(tx={log.transactionHash.hex()[:10]}...): {e}"
                         )
-                        # 继续处理下一个事件，不中断整个批次
+                        failed += 1
+
+            return failed
 
         except Exception as e:
             logger.error(f"❌ 处理RewardCalculated事件失败: {e}")
+            raise
 
     async def _process_user_purchased_events(
         self,
         from_block: int,
         to_block: int
-    ):
+    ) -> int:
         """
         处理UserPurchased事件
 
         Args:
             from_block: 起始区块
             to_block: 结束区块
+
+        Returns:
+            处理失败的事件数
         """
         try:
-            logs = self.web3_client.get_logs(
+            logs = await self.web3_client.get_logs(
                 event_name='UserPurchased',
                 from_block=from_block,
                 to_block=to_block
             )
 
             if not logs:
-                return
+                return 0
 
             logger.info(f"🛒 发现 {len(logs)} 个UserPurchased事件")
 
+            failed = 0
             async with AsyncSessionLocal() as db:
                 for log in logs:
                     try:
@@ -220,34 +619,42 @@ class EventListenerService:
                             f"❌ 处理单个UserPurchased事件失败 "
                             f"(tx={log.transactionHash.hex()[:10]}...): {e}"
                         )
+                        failed += 1
+
+            return failed
 
         except Exception as e:
             logger.error(f"❌ 处理UserPurchased事件失败: {e}")
+            raise
 
     async def _process_referrer_registered_events(
         self,
         from_block: int,
         to_block: int
-    ):
+    ) -> int:
         """
         处理RegisteredReferrer事件
 
         Args:
             from_block: 起始区块
             to_block: 结束区块
+
+        Returns:
+            处理失败的事件数
         """
         try:
-            logs = self.web3_client.get_logs(
+            logs = await self.web3_client.get_logs(
                 event_name='RegisteredReferrer',
                 from_block=from_block,
                 to_block=to_block
             )
 
             if not logs:
-                return
+                return 0
 
             logger.info(f"🤝 发现 {len(logs)} 个RegisteredReferrer事件")
 
+            failed = 0
             async with AsyncSessionLocal() as db:
                 for log in logs:
                     try:
@@ -258,9 +665,13 @@ class EventListenerService:
                             f"❌ 处理单个RegisteredReferrer事件失败 "
                             f"(tx={log.transactionHash.hex()[:10]}...): {e}"
                         )
+                        failed += 1
+
+            return failed
 
         except Exception as e:
             logger.error(f"❌ 处理RegisteredReferrer事件失败: {e}")
+            raise
 
     async def _handle_reward_calculated(
         self,
@@ -306,7 +717,8 @@ class EventListenerService:
                 level=int(args['level']),
                 purchase_amount=int(args['purchaseAmount']),
                 tx_hash=tx_hash,
-                block_number=block_number
+                block_number=block_number,
+                log_index=event_data['log_index']
             )
 
             if success:
@@ -346,6 +758,9 @@ class EventListenerService:
             f"金额={args['amount']} wei"
         )
 
+        # 购买会刷新链上活跃时间
+        await CacheService.invalidate_chain_reads(args['user'])
+
         # TODO: 记录购买历史
         logger.debug(f"📝 事件详情: {event_data}")
 
@@ -378,14 +793,23 @@ class EventListenerService:
         )
 
         try:
-            # 同步推荐关系到数据库
+            # 同步推荐关系到数据库，新关系同时更新推荐人的"邀请好友"任务进度（同一事务）
             success = await PointsService.sync_referral_relation(
                 db=db,
                 referee_address=args['referee'],
                 referrer_address=args['referrer'],
                 tx_hash=tx_hash,
-                block_number=block_number
+                block_number=block_number,
+                commit=False,
+                log_index=event_data['log_index']
             )
+            if success:
+                await self._bump_invite_progress(db, [args['referrer']])
+            await db.commit()
+            await RealtimeLeaderboardService.apply_staged(db)
+
+            # 链上已绑定推荐人（无论数据库是否已存在该关系）
+            await CacheService.invalidate_chain_reads(args['referee'])
 
             if success:
                 logger.success(
@@ -396,10 +820,151 @@ class EventListenerService:
                 logger.warning(f"⚠️  推荐关系同步未成功（可能已存在）")
 
         except Exception as e:
+            RealtimeLeaderboardService.discard_staged(db)
+            await db.rollback()
             logger.error(f"❌ 推荐关系同步异常: {e}")
             raise
 
-    def get_status(self) -> Dict[str, Any]:
+    async def backfill(
+        self,
+        from_block: int,
+        to_block: int,
+        workers: int = 4,
+        segment_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        并行回填历史区块
+
+        将 [from_block, to_block] 切分为互不重叠的区段，由N个worker并发
+        拉取日志（各自使用自适应跨度），结果严格按区块顺序写入数据库
+
+        Args:
+            from_block: 起始区块
+            to_block: 结束区块
+            workers: 并发拉取的worker数量
+            segment_size: 每个区段的区块数（默认等于最大区块跨度）
+
+        Returns:
+            回填统计信息
+        """
+        workers = max(1, workers)
+        segment_size = segment_size or self.max_block_range
+        segments = [
+            (start, min(start + segment_size - 1, to_block))
+            for start in range(from_block, to_block + 1, segment_size)
+        ]
+
+        logger.info(
+            f"⏪ 开始回填: 区块 {from_block} 到 {to_block}, "
+            f"{len(segments)} 个区段, {workers} 个worker"
+        )
+
+        semaphore = asyncio.Semaphore(workers)
+        started_at = time.monotonic()
+        total_events = 0
+
+        async def fetch(segment_from: int, segment_to: int) -> list:
+            async with semaphore:
+                return await self._fetch_range_logs(segment_from, segment_to)
+
+        # 滑动窗口：最多 2*workers 个区段在途，按顺序等待并写入
+        pending = deque()
+        segment_iter = iter(segments)
+
+        def schedule():
+            while len(pending) < workers * 2:
+                segment = next(segment_iter, None)
+                if segment is None:
+                    return
+                pending.append((segment, asyncio.create_task(fetch(*segment))))
+
+        try:
+            schedule()
+            while pending:
+                (segment_from, segment_to), task = pending.popleft()
+                logs = await task
+                schedule()
+
+                await self._apply_logs_batch(logs, to_block=segment_to)
+                total_events += len(logs)
+
+                elapsed = time.monotonic() - started_at
+                scanned = segment_to - from_block + 1
+                logger.info(
+                    f"⏪ 回填进度: 区块 {segment_to}/{to_block}, "
+                    f"事件 {total_events}, {scanned / elapsed if elapsed > 0 else 0:.1f} 区块/秒"
+                )
+
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+        elapsed = time.monotonic() - started_at
+        total_blocks = to_block - from_block + 1
+        stats = {
+            "from_block": from_block,
+            "to_block": to_block,
+            "blocks": total_blocks,
+            "events": total_events,
+            "elapsed_seconds": round(elapsed, 3),
+            "blocks_per_second": round(total_blocks / elapsed, 1) if elapsed > 0 else None
+        }
+
+        logger.success(
+            f"✅ 回填完成: {total_blocks} 个区块, {total_events} 个事件, "
+            f"耗时 {elapsed:.1f}秒, {stats['blocks_per_second']} 区块/秒"
+        )
+
+        return stats
+
+    async def _fetch_range_logs(
+        self,
+        from_block: int,
+        to_block: int
+    ) -> list:
+        """
+        按自适应跨度拉取区块范围内的全部关注事件
+
+        RPC调用走异步连接池，多个区段可并发拉取
+
+        Args:
+            from_block: 起始区块
+            to_block: 结束区块
+
+        Returns:
+            按 (blockNumber, logIndex) 排序的事件日志
+        """
+        block_range = AdaptiveBlockRange(
+            initial_size=self.block_range.size,
+            max_size=self.max_block_range
+        )
+        logs = []
+
+        start = from_block
+        while start <= to_block:
+            end = block_range.chunk_end(start, to_block)
+            try:
+                chunk_logs = await self.web3_client.get_logs_batch(
+                    self.BATCH_EVENT_NAMES,
+                    start,
+                    end
+                )
+            except Exception as e:
+                if AdaptiveBlockRange.is_range_error(e) and block_range.shrink():
+                    logger.warning(
+                        f"⚠️  区块范围 {start}-{end} 被节点拒绝，"
+                        f"跨度缩小为 {block_range.size}: {e}"
+                    )
+                    continue
+                raise
+
+            block_range.grow()
+            logs.extend(chunk_logs)
+            start = end + 1
+
+        return logs
+
+    async def get_status(self) -> Dict[str, Any]:
         """
         获取监听服务状态
 
@@ -409,10 +974,14 @@ class EventListenerService:
         return {
             "is_running": self.is_running,
             "last_processed_block": self.last_processed_block,
-            "current_block": self.web3_client.get_latest_block(),
+            "current_block": await self.web3_client.get_latest_block(),
             "poll_interval": self.poll_interval,
+            "batch_mode": self.batch_mode,
+            "block_range": self.block_range.size,
+            "confirmations": self.confirmations,
             "chain_id": self.web3_client.chain_id,
-            "contract_address": self.web3_client.contract_address
+            "contract_address": self.web3_client.contract_address,
+            "rpc_endpoints": self.web3_client.get_rpc_stats()
         }
 
 
@@ -433,7 +1002,11 @@ def get_event_listener_service() -> EventListenerService:
 def initialize_event_listener(
     web3_client: Web3Client,
     start_block: Optional[int] = None,
-    poll_interval: int = 5
+    poll_interval: int = 5,
+    batch_mode: bool = False,
+    commit_batch_size: int = 500,
+    max_block_range: int = 5000,
+    confirmations: int = 0
 ) -> EventListenerService:
     """
     初始化事件监听服务
@@ -442,6 +1015,10 @@ def initialize_event_listener(
         web3_client: Web3客户端实例
         start_block: 起始区块号
         poll_interval: 轮询间隔（秒）
+        batch_mode: 是否启用批量摄取
+        commit_batch_size: 批量模式下每个事务最多包含的事件数
+        max_block_range: 单次getLogs的最大区块跨度
+        confirmations: 确认深度
 
     Returns:
         EventListenerService实例
@@ -451,7 +1028,11 @@ def initialize_event_listener(
     _event_listener_service = EventListenerService(
         web3_client=web3_client,
         start_block=start_block,
-        poll_interval=poll_interval
+        poll_interval=poll_interval,
+        batch_mode=batch_mode,
+        commit_batch_size=commit_batch_size,
+        max_block_range=max_block_range,
+        confirmations=confirmations
     )
 
     return _event_listener_service
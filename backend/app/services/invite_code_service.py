@@ -0,0 +1,260 @@
+"""
+邀请码服务
+统一解析两种邀请码格式，进程内LRU → Redis → 数据库三级查找，无效邀请码负缓存
+"""
+import re
+import secrets
+import string
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.core.config import settings
+from app.models import User, InviteCode
+from app.services.cache_service import CacheService
+from app.utils.lru_cache import LRUCache
+
+
+class InviteCodeService:
+    """
+    邀请码服务类
+
+    - USER格式（USER000001）：由用户ID推导，按 users 主键查找
+    - 随机格式（6位大写字母数字）：未注册钱包生成，按 invite_codes.code 唯一索引查找
+    - 解析结果 {"user_id", "wallet_address", "username"}，user_id 为空表示钱包尚未注册
+    """
+
+    USER_CODE_PATTERN = re.compile(r"^USER(\d{6,})$")
+    RANDOM_CODE_PATTERN = re.compile(r"^[A-Z0-9]{6}$")
+    RANDOM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+    RANDOM_CODE_MAX_ATTEMPTS = 5
+
+    # 进程内缓存TTL（秒）：短于Redis，跨进程的变化在该时间内生效
+    # 无效邀请码、钱包尚未注册的随机码使用较短的TTL（注册后结果会变化）
+    LOCAL_TTL = 300
+    LOCAL_MISS_TTL = 30
+
+    _local = LRUCache(maxsize=settings.INVITE_CODE_CACHE_SIZE, ttl=LOCAL_TTL)
+
+    @staticmethod
+    def user_code(user_id: int) -> str:
+        """
+        生成用户的USER格式邀请码
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            邀请码
+        """
+        return f"USER{user_id:06d}"
+
+    @staticmethod
+    def is_valid_format(invite_code: str) -> bool:
+        """
+        邀请码格式是否有效（USER格式或6位随机码，不区分大小写）
+
+        Args:
+            invite_code: 邀请码
+
+        Returns:
+            格式是否有效
+        """
+        code = invite_code.strip().upper()
+        return bool(
+            InviteCodeService.USER_CODE_PATTERN.match(code)
+            or InviteCodeService.RANDOM_CODE_PATTERN.match(code)
+        )
+
+    @staticmethod
+    async def resolve(db: AsyncSession, invite_code: str) -> Optional[dict]:
+        """
+        解析邀请码
+
+        Args:
+            db: 数据库会话
+            invite_code: 邀请码（不区分大小写）
+
+        Returns:
+            解析结果，格式无效或邀请码不存在时返回None
+        """
+        if not InviteCodeService.is_valid_format(invite_code):
+            return None
+        code = invite_code.strip().upper()
+
+        # 1. 进程内LRU（含负缓存）
+        resolved = InviteCodeService._local.get(code, LRUCache.MISSING)
+        if resolved is not LRUCache.MISSING:
+            return resolved
+
+        # 2. Redis（空字典为负缓存）
+        cached = await CacheService.get_invite_code_cache(code)
+        if cached is not None:
+            resolved = cached or None
+            InviteCodeService._remember(code, resolved)
+            return resolved
+
+        # 3. 数据库
+        resolved = await InviteCodeService._load(db, code)
+        InviteCodeService._remember(code, resolved)
+        await CacheService.set_invite_code_cache(code, resolved)
+        if resolved is None:
+            logger.debug(f"🚫 无效邀请码（已负缓存）: {code}")
+        return resolved
+
+    @staticmethod
+    async def _load(db: AsyncSession, code: str) -> Optional[dict]:
+        """按邀请码格式从数据库查找（各一次索引查询）"""
+        match = InviteCodeService.USER_CODE_PATTERN.match(code)
+        if match:
+            result = await db.execute(
+                select(User.id, User.wallet_address, User.username)
+                .where(User.id == int(match.group(1)))
+            )
+        else:
+            result = await db.execute(
+                select(User.id, InviteCode.wallet_address, User.username)
+                .select_from(InviteCode)
+                .outerjoin(User, User.wallet_address == InviteCode.wallet_address)
+                .where(InviteCode.code == code)
+            )
+
+        row = result.first()
+        if row is None:
+            return None
+        return {
+            "user_id": row[0],
+            "wallet_address": row[1],
+            "username": row[2]
+        }
+
+    @staticmethod
+    def _remember(code: str, resolved: Optional[dict]):
+        """写入进程内缓存（负缓存、钱包未注册的结果使用更短的TTL）"""
+        InviteCodeService._local.set(
+            code,
+            resolved,
+            ttl=(
+                InviteCodeService.LOCAL_TTL if resolved and resolved["user_id"]
+                else InviteCodeService.LOCAL_MISS_TTL
+            )
+        )
+
+    @staticmethod
+    async def forget(*codes: str):
+        """
+        清除邀请码的解析缓存（邀请码新建、所属钱包注册后调用）
+
+        Args:
+            codes: 邀请码
+        """
+        for code in codes:
+            InviteCodeService._local.pop(code)
+        await CacheService.invalidate_invite_code_cache(*codes)
+
+    @staticmethod
+    async def forget_user(db: AsyncSession, user_id: int, wallet_address: str):
+        """
+        清除用户两种格式邀请码的解析缓存（用户注册后调用）
+
+        注册前生成的随机码解析结果中 user_id 为空，注册后需要重新解析
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            wallet_address: 钱包地址
+        """
+        result = await db.execute(
+            select(InviteCode.code).where(InviteCode.wallet_address == wallet_address.lower())
+        )
+        await InviteCodeService.forget(InviteCodeService.user_code(user_id), *result.scalars().all())
+
+    @staticmethod
+    async def get_or_create_code(db: AsyncSession, wallet_address: str) -> str:
+        """
+        获取或生成未注册钱包的随机邀请码（每个钱包固定一个）
+
+        Args:
+            db: 数据库会话
+            wallet_address: 钱包地址
+
+        Returns:
+            邀请码
+
+        Raises:
+            RuntimeError: 多次生成均与已有邀请码冲突
+        """
+        normalized_address = wallet_address.lower()
+        existing_query = select(InviteCode.code).where(InviteCode.wallet_address == normalized_address)
+
+        result = await db.execute(existing_query)
+        existing = result.scalar_one_or_none()
+        if existing is not None:
+            return existing
+
+        for _ in range(InviteCodeService.RANDOM_CODE_MAX_ATTEMPTS):
+            code = ''.join(
+                secrets.choice(InviteCodeService.RANDOM_CODE_ALPHABET) for _ in range(6)
+            )
+            result = await db.execute(
+                pg_insert(InviteCode)
+                .values(code=code, wallet_address=normalized_address)
+                .on_conflict_do_nothing()
+                .returning(InviteCode.code)
+            )
+            created = result.scalar_one_or_none()
+            if created is not None:
+                await db.commit()
+                # 清除扫描请求可能留下的负缓存
+                await InviteCodeService.forget(created)
+                logger.info(f"🎟️  生成邀请码: {created} → {normalized_address[:10]}...")
+                return created
+
+            # 冲突：并发请求已为该钱包生成邀请码，或随机码撞上已有邀请码（重新生成）
+            result = await db.execute(existing_query)
+            existing = result.scalar_one_or_none()
+            if existing is not None:
+                return existing
+
+        raise RuntimeError("邀请码生成失败：多次冲突")
+
+    @staticmethod
+    async def warm(db: AsyncSession, limit: int) -> int:
+        """
+        预热头部推荐人的邀请码（启动时调用）
+
+        Args:
+            db: 数据库会话
+            limit: 预热数量
+
+        Returns:
+            预热条数
+        """
+        result = await db.execute(
+            select(User.id, User.wallet_address, User.username)
+            .where(User.is_active == True, User.total_invited > 0)
+            .order_by(User.total_invited.desc())
+            .limit(limit)
+        )
+        rows = result.all()
+        for user_id, wallet_address, username in rows:
+            InviteCodeService._remember(
+                InviteCodeService.user_code(user_id),
+                {"user_id": user_id, "wallet_address": wallet_address, "username": username}
+            )
+
+        logger.info(f"🔥 邀请码缓存预热: {len(rows)}个推荐人")
+        return len(rows)
+
+    @staticmethod
+    def cache_stats() -> dict:
+        """进程内缓存统计"""
+        return InviteCodeService._local.stats()
+
+    @staticmethod
+    def clear():
+        """清空进程内缓存"""
+        InviteCodeService._local.clear()
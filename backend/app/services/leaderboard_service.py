@@ -9,31 +9,145 @@ from loguru import logger
 
 from app.services.cache_service import CacheService
 from app.services.materialized_view_service import MaterializedViewService
+from app.services.realtime_leaderboard_service import RealtimeLeaderboardService
+from app.utils.pagination import decode_cursor, estimate_row_count
+
+
+# 排行榜条目的用户明细字段（与 mv_points_leaderboard 列一致）
+_USER_DETAIL_SQL = text("""
+    SELECT
+        u.id AS user_id,
+        u.wallet_address,
+        u.username,
+        u.avatar_url,
+        u.level,
+        u.total_invited,
+        u.total_tasks_completed,
+        u.total_questions_answered,
+        u.correct_answers,
+        COALESCE(up.available_points, 0) AS available_points,
+        COALESCE(up.total_earned, 0) AS total_earned,
+        COALESCE(up.total_spent, 0) AS total_spent,
+        COALESCE(up.points_from_referral, 0) AS points_from_referral,
+        COALESCE(up.points_from_tasks, 0) AS points_from_tasks,
+        COALESCE(up.points_from_quiz, 0) AS points_from_quiz,
+        COALESCE(up.points_from_team, 0) AS points_from_team,
+        COALESCE(up.points_from_purchase, 0) AS points_from_purchase,
+        u.created_at,
+        u.last_active_at
+    FROM users u
+    LEFT JOIN user_points up ON u.id = up.user_id
+    WHERE u.id = ANY(:user_ids);
+""")
+
+
+def _format_entry(row, rank: int, total_points: int) -> dict:
+    """将用户明细行转换为排行榜条目"""
+    return {
+        "rank": rank,
+        "user_id": row.user_id,
+        "wallet_address": row.wallet_address,
+        "username": row.username,
+        "avatar_url": row.avatar_url,
+        "total_points": total_points,
+        "level": row.level,
+        "total_invited": row.total_invited,
+        "total_tasks_completed": row.total_tasks_completed,
+        "total_questions_answered": row.total_questions_answered,
+        "correct_answers": row.correct_answers,
+        "available_points": row.available_points,
+        "total_earned": row.total_earned,
+        "total_spent": row.total_spent,
+        "points_from_referral": row.points_from_referral,
+        "points_from_tasks": row.points_from_tasks,
+        "points_from_quiz": row.points_from_quiz,
+        "points_from_team": row.points_from_team,
+        "points_from_purchase": row.points_from_purchase,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "last_active_at": row.last_active_at.isoformat() if row.last_active_at else None
+    }
 
 
 class LeaderboardService:
     """排行榜服务类"""
 
+    # "我附近的排名"分桶大小与最大前后人数
+    AROUND_BUCKET_SIZE = 100
+    AROUND_MAX_K = 25
+
+    @staticmethod
+    async def _get_realtime_entries(
+        db: AsyncSession,
+        offset: int,
+        limit: int
+    ) -> List[dict]:
+        """
+        从实时排行榜（Redis ZSET）取一段排名，并按主键批量补全用户明细
+
+        Args:
+            db: 数据库会话
+            offset: 起始偏移（从0开始）
+            limit: 数量
+
+        Returns:
+            排行榜条目列表
+        """
+        ranked = await RealtimeLeaderboardService.get_page(offset, limit)
+        if not ranked:
+            return []
+
+        result = await db.execute(
+            _USER_DETAIL_SQL,
+            {"user_ids": [user_id for _, user_id, _ in ranked]}
+        )
+        rows = {row.user_id: row for row in result.fetchall()}
+
+        return [
+            _format_entry(rows[user_id], rank, total_points)
+            for rank, user_id, total_points in ranked
+            if user_id in rows
+        ]
+
     @staticmethod
     async def get_points_leaderboard(
         db: AsyncSession,
         page: int = 1,
         page_size: int = 50,
-        use_cache: bool = True
+        use_cache: bool = True,
+        cursor: Optional[str] = None
     ) -> Tuple[List[dict], int]:
         """
         获取积分排行榜（基于物化视图）
 
+        rank 是连续的 ROW_NUMBER，页码和游标都换算为 rank > N 的索引范围扫描，
+        深分页不需要 OFFSET 跳过前面的行；总数取自 pg_class 的估算行数
+
         Args:
             db: 数据库会话
             page: 页码（从1开始）
             page_size: 每页大小
-            use_cache: 是否使用缓存
+            use_cache: 是否使用缓存（游标分页不使用页缓存）
+            cursor: 上一页返回的游标（可选，优先于页码）
 
         Returns:
             (排行榜数据, 总数)
+
+        Raises:
+            ValueError: 游标无效
         """
         try:
+            after_rank = decode_cursor(cursor, int)[0] if cursor else (page - 1) * page_size
+            if cursor:
+                use_cache = False
+
+            # 0. 实时排行榜可用时直接读取ZSET（实时排名，无需页缓存）
+            if await RealtimeLeaderboardService.is_ready():
+                leaderboard = await LeaderboardService._get_realtime_entries(
+                    db, after_rank, page_size
+                )
+                total = await RealtimeLeaderboardService.count()
+                return leaderboard, total
+
             # 1. 尝试从缓存获取
             if use_cache:
                 cached_data = await CacheService.get_leaderboard_cache("points", page)
@@ -42,12 +156,12 @@ class LeaderboardService:
                     return cached_data["data"], cached_data["total"]
 
             # 2. 缓存未命中，从物化视图查询
-            offset = (page - 1) * page_size
-
-            # 查询总数
-            count_sql = text("SELECT COUNT(*) FROM mv_points_leaderboard;")
-            total_result = await db.execute(count_sql)
-            total = total_result.scalar_one()
+            # 查询总数（估算值；视图从未统计过时回退到精确计数）
+            total = await estimate_row_count(db, MaterializedViewService.MV_POINTS_LEADERBOARD)
+            if total is None:
+                count_sql = text("SELECT COUNT(*) FROM mv_points_leaderboard;")
+                total_result = await db.execute(count_sql)
+                total = total_result.scalar_one()
 
             # 分页查询
             query_sql = text("""
@@ -74,43 +188,20 @@ class LeaderboardService:
                     created_at,
                     last_active_at
                 FROM mv_points_leaderboard
+                WHERE rank > :after_rank
                 ORDER BY rank ASC
-                LIMIT :limit OFFSET :offset;
+                LIMIT :limit;
             """)
 
             result = await db.execute(
                 query_sql,
-                {"limit": page_size, "offset": offset}
+                {"limit": page_size, "after_rank": after_rank}
             )
 
             rows = result.fetchall()
 
             # 转换为字典列表
-            leaderboard = []
-            for row in rows:
-                leaderboard.append({
-                    "rank": row.rank,
-                    "user_id": row.user_id,
-                    "wallet_address": row.wallet_address,
-                    "username": row.username,
-                    "avatar_url": row.avatar_url,
-                    "total_points": row.total_points,
-                    "level": row.level,
-                    "total_invited": row.total_invited,
-                    "total_tasks_completed": row.total_tasks_completed,
-                    "total_questions_answered": row.total_questions_answered,
-                    "correct_answers": row.correct_answers,
-                    "available_points": row.available_points,
-                    "total_earned": row.total_earned,
-                    "total_spent": row.total_spent,
-                    "points_from_referral": row.points_from_referral,
-                    "points_from_tasks": row.points_from_tasks,
-                    "points_from_quiz": row.points_from_quiz,
-                    "points_from_team": row.points_from_team,
-                    "points_from_purchase": row.points_from_purchase,
-                    "created_at": row.created_at.isoformat() if row.created_at else None,
-                    "last_active_at": row.last_active_at.isoformat() if row.last_active_at else None
-                })
+            leaderboard = [_format_entry(row, row.rank, row.total_points) for row in rows]
 
             # 3. 写入缓存
             if use_cache:
@@ -119,7 +210,7 @@ class LeaderboardService:
                 logger.debug(f"💾 积分排行榜已缓存: page={page}, count={len(leaderboard)}")
 
             logger.info(
-                f"📊 积分排行榜查询成功: page={page}, "
+                f"📊 积分排行榜查询成功: after_rank={after_rank}, "
                 f"page_size={page_size}, total={total}, count={len(leaderboard)}"
             )
 
@@ -145,6 +236,28 @@ class LeaderboardService:
             用户排名数据，不存在返回None
         """
         try:
+            # 实时排行榜: ZRANK O(log N) + 主键查询明细（ZSET中没有该用户时回退到物化视图）
+            ranked = None
+            if await RealtimeLeaderboardService.is_ready():
+                ranked = await RealtimeLeaderboardService.get_rank(user_id)
+
+            if ranked is not None:
+                rank, total_points = ranked
+                result = await db.execute(_USER_DETAIL_SQL, {"user_ids": [user_id]})
+                row = result.fetchone()
+                if not row:
+                    return None
+
+                return {
+                    "rank": rank,
+                    "user_id": row.user_id,
+                    "wallet_address": row.wallet_address,
+                    "username": row.username,
+                    "total_points": total_points,
+                    "level": row.level,
+                    "available_points": row.available_points
+                }
+
             query_sql = text("""
                 SELECT
                     rank,
@@ -178,6 +291,85 @@ class LeaderboardService:
             logger.error(f"❌ 查询用户排名失败: user_id={user_id}, error={e}")
             return None
 
+    @staticmethod
+    async def get_user_neighborhood(
+        db: AsyncSession,
+        user_id: int,
+        k: int = 5
+    ) -> Optional[dict]:
+        """
+        查询用户前后各 k 名的排行榜条目（"我附近的排名"）
+
+        物化视图路径按排名分桶缓存：每个桶覆盖 AROUND_BUCKET_SIZE 个排名并向两侧
+        多取 AROUND_MAX_K 名，桶内任意用户、任意 k <= AROUND_MAX_K 都可直接切片；
+        未命中时用一次 rank 索引范围查询填充整个桶
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            k: 前后各取的人数（不超过 AROUND_MAX_K）
+
+        Returns:
+            {"rank": 用户排名, "entries": 排行榜条目}，用户未上榜返回None
+        """
+        k = min(k, LeaderboardService.AROUND_MAX_K)
+
+        try:
+            # 实时排行榜: ZRANK + 一次 ZRANGE（ZSET中没有该用户时回退到物化视图）
+            ranked = None
+            if await RealtimeLeaderboardService.is_ready():
+                ranked = await RealtimeLeaderboardService.get_rank(user_id)
+
+            if ranked is not None:
+                rank = ranked[0]
+                start = max(rank - k, 1)
+                entries = await LeaderboardService._get_realtime_entries(
+                    db, start - 1, rank + k - start + 1
+                )
+                return {"rank": rank, "entries": entries}
+
+            rank_result = await db.execute(
+                text("SELECT rank FROM mv_points_leaderboard WHERE user_id = :user_id;"),
+                {"user_id": user_id}
+            )
+            rank = rank_result.scalar_one_or_none()
+            if rank is None:
+                return None
+
+            bucket = (rank - 1) // LeaderboardService.AROUND_BUCKET_SIZE
+            bucket_entries = await CacheService.get_leaderboard_around_cache("points", bucket)
+
+            if bucket_entries is None:
+                low = bucket * LeaderboardService.AROUND_BUCKET_SIZE + 1 - LeaderboardService.AROUND_MAX_K
+                high = (bucket + 1) * LeaderboardService.AROUND_BUCKET_SIZE + LeaderboardService.AROUND_MAX_K
+
+                result = await db.execute(
+                    text("""
+                        SELECT *
+                        FROM mv_points_leaderboard
+                        WHERE rank BETWEEN :low AND :high
+                        ORDER BY rank ASC;
+                    """),
+                    {"low": low, "high": high}
+                )
+                bucket_entries = [
+                    _format_entry(row, row.rank, row.total_points)
+                    for row in result.fetchall()
+                ]
+                await CacheService.set_leaderboard_around_cache("points", bucket, bucket_entries)
+
+            entries = [
+                entry for entry in bucket_entries
+                if rank - k <= entry["rank"] <= rank + k
+            ]
+
+            logger.debug(f"📊 用户附近排名: user_id={user_id}, rank={rank}, count={len(entries)}")
+            return {"rank": rank, "entries": entries}
+
+        except Exception as e:
+            logger.error(f"❌ 查询用户附近排名失败: user_id={user_id}, error={e}")
+            raise
+
     @staticmethod
     async def get_top_users(
         db: AsyncSession,
@@ -194,6 +386,16 @@ class LeaderboardService:
             Top N用户列表
         """
         try:
+            if await RealtimeLeaderboardService.is_ready():
+                entries = await LeaderboardService._get_realtime_entries(db, 0, limit)
+                return [
+                    {key: entry[key] for key in (
+                        "rank", "user_id", "wallet_address", "username",
+                        "avatar_url", "total_points", "level"
+                    )}
+                    for entry in entries
+                ]
+
             query_sql = text("""
                 SELECT
                     rank,
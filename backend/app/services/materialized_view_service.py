@@ -8,6 +8,9 @@ from loguru import logger
 from datetime import datetime
 from typing import Literal
 
+from app.services.cache_service import CacheService
+from app.utils.redis_client import redis_client
+
 
 class MaterializedViewService:
     """物化视图服务类 - 单一职责：管理物化视图刷新"""
@@ -16,6 +19,50 @@ class MaterializedViewService:
     MV_POINTS_LEADERBOARD = "mv_points_leaderboard"
     MV_TEAMS_LEADERBOARD = "mv_teams_leaderboard"
     MV_QUIZ_LEADERBOARD = "mv_quiz_leaderboard"
+    ALL_VIEWS = (MV_POINTS_LEADERBOARD, MV_TEAMS_LEADERBOARD, MV_QUIZ_LEADERBOARD)
+
+    # 视图对应的排行榜缓存类型（刷新后失效）
+    CACHE_TYPES = {
+        MV_POINTS_LEADERBOARD: "points",
+        MV_TEAMS_LEADERBOARD: "teams",
+        MV_QUIZ_LEADERBOARD: "quiz",
+    }
+
+    # 脏标记：Redis集合跨进程共享（API、事件监听），本地集合只记录Redis不可用期间的标记
+    KEY_DIRTY_VIEWS = "mv:dirty"
+    _local_dirty: set = set()
+
+    @staticmethod
+    async def mark_dirty(*view_names: str):
+        """
+        标记物化视图的源数据已变化，由刷新调度器在下一个窗口刷新
+
+        Args:
+            view_names: 视图名称
+        """
+        try:
+            await redis_client.client.sadd(MaterializedViewService.KEY_DIRTY_VIEWS, *view_names)
+        except Exception as e:
+            MaterializedViewService._local_dirty.update(view_names)
+            logger.debug(f"物化视图脏标记仅记录在本地: {e}")
+
+    @staticmethod
+    async def view_exists(db: AsyncSession, view_name: str) -> bool:
+        """
+        检查物化视图是否已创建（未执行迁移的环境回退到实时查询）
+
+        Args:
+            db: 数据库会话
+            view_name: 视图名称
+
+        Returns:
+            是否存在
+        """
+        result = await db.execute(
+            text("SELECT to_regclass(:view_name) IS NOT NULL;"),
+            {"view_name": view_name}
+        )
+        return bool(result.scalar_one())
 
     @staticmethod
     async def refresh_view(
@@ -46,6 +93,11 @@ class MaterializedViewService:
 
             duration = (datetime.utcnow() - start_time).total_seconds()
 
+            # 视图内容已变化，基于旧数据的页/区间缓存失效
+            cache_type = MaterializedViewService.CACHE_TYPES.get(view_name)
+            if cache_type:
+                await CacheService.invalidate_leaderboard_cache(cache_type)
+
             logger.info(
                 f"✅ 物化视图刷新成功: view={view_name}, "
                 f"concurrent={concurrent}, duration={duration:.3f}s"
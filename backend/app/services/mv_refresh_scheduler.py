@@ -0,0 +1,212 @@
+"""
+物化视图刷新调度器
+按脏标记驱动、按窗口去抖地刷新排行榜物化视图
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from app.db.session import AsyncSessionLocal
+from app.services.materialized_view_service import MaterializedViewService
+from app.utils.redis_client import redis_client
+
+
+class MaterializedViewRefreshScheduler:
+    """
+    物化视图刷新调度器
+
+    - 只刷新被写入方标记为脏的视图
+    - 每个视图每个窗口最多刷新一次（多实例部署时通过Redis节流键协调）
+    - 每个视图使用独立的数据库连接，同一轮到期的视图并行刷新
+    - 记录每个视图的刷新次数、失败次数和耗时
+    """
+
+    KEY_PREFIX_THROTTLE = "mv:refresh:throttle:"
+
+    def __init__(
+        self,
+        views: Iterable[str] = MaterializedViewService.ALL_VIEWS,
+        window_seconds: float = 30.0,
+        tick_seconds: float = 1.0,
+        concurrent: bool = True
+    ):
+        """
+        初始化调度器
+
+        Args:
+            views: 管理的视图名称
+            window_seconds: 单个视图两次刷新的最小间隔（秒）
+            tick_seconds: 检查脏标记的间隔（秒）
+            concurrent: 是否使用 REFRESH ... CONCURRENTLY
+        """
+        self.views = list(views)
+        self.window_seconds = window_seconds
+        self.tick_seconds = tick_seconds
+        self.concurrent = concurrent
+
+        self._last_refresh: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, dict] = {
+            view: {
+                "refresh_count": 0,
+                "failure_count": 0,
+                "last_duration": None,
+                "max_duration": 0.0,
+                "total_duration": 0.0,
+                "last_refreshed_at": None
+            }
+            for view in self.views
+        }
+
+    async def start(self):
+        """启动后台调度任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"🗓️  物化视图刷新调度器已启动: 窗口={self.window_seconds}秒, "
+                f"视图={self.views}"
+            )
+
+    async def stop(self):
+        """停止后台调度任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("⏹️  物化视图刷新调度器已停止")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ 物化视图调度异常: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    async def run_once(self) -> List[str]:
+        """
+        执行一轮调度：认领到期的脏视图并并行刷新
+
+        Returns:
+            本轮刷新的视图名称
+        """
+        due = [view for view in self.views if await self._claim(view)]
+        if due:
+            await asyncio.gather(*(self._refresh(view) for view in due))
+        return due
+
+    async def _claim(self, view: str) -> bool:
+        """
+        认领一个需要刷新的视图：脏且不在窗口期内
+
+        先占用节流键再清除脏标记，刷新期间的新写入会重新标记，
+        在下一个窗口再次刷新。Redis可用时只依据共享脏集合（Redis不可用期间
+        留下的本地标记先并入共享集合），本地标记仅在Redis不可用时使用
+        """
+        now = time.monotonic()
+        last = self._last_refresh.get(view)
+        if last is not None and now - last < self.window_seconds:
+            return False
+
+        local_dirty = MaterializedViewService._local_dirty
+        try:
+            client = redis_client.client
+            if view in local_dirty:
+                # Redis已恢复：本地标记交给共享集合，由任一实例认领
+                await client.sadd(MaterializedViewService.KEY_DIRTY_VIEWS, view)
+                local_dirty.discard(view)
+
+            if not await client.sismember(MaterializedViewService.KEY_DIRTY_VIEWS, view):
+                return False
+
+            # 其他实例在窗口期内已刷新过
+            throttled = await client.set(
+                f"{self.KEY_PREFIX_THROTTLE}{view}",
+                "1",
+                nx=True,
+                px=int(self.window_seconds * 1000)
+            )
+            if not throttled:
+                return False
+
+            await client.srem(MaterializedViewService.KEY_DIRTY_VIEWS, view)
+        except Exception:
+            # Redis不可用：只依据本地脏标记
+            if view not in local_dirty:
+                return False
+            local_dirty.discard(view)
+
+        self._last_refresh[view] = now
+        return True
+
+    async def _refresh(self, view: str):
+        """使用独立连接刷新单个视图并记录耗时"""
+        metrics = self.metrics[view]
+        start = time.perf_counter()
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await MaterializedViewService.refresh_view(db, view, concurrent=self.concurrent)
+        except Exception as e:
+            metrics["failure_count"] += 1
+            logger.error(f"❌ 物化视图定时刷新失败: view={view}, error={e}")
+            # 重新标记，下一个窗口重试
+            await MaterializedViewService.mark_dirty(view)
+            return
+
+        duration = time.perf_counter() - start
+        metrics["refresh_count"] += 1
+        metrics["last_duration"] = round(duration, 3)
+        metrics["max_duration"] = round(max(metrics["max_duration"], duration), 3)
+        metrics["total_duration"] = round(metrics["total_duration"] + duration, 3)
+        metrics["last_refreshed_at"] = datetime.utcnow().isoformat()
+
+    def get_metrics(self) -> Dict[str, dict]:
+        """各视图的刷新指标"""
+        return {
+            view: {
+                **metrics,
+                "avg_duration": (
+                    round(metrics["total_duration"] / metrics["refresh_count"], 3)
+                    if metrics["refresh_count"] else None
+                )
+            }
+            for view, metrics in self.metrics.items()
+        }
+
+
+# 全局调度器实例
+_scheduler: Optional[MaterializedViewRefreshScheduler] = None
+
+
+def get_mv_refresh_scheduler() -> Optional[MaterializedViewRefreshScheduler]:
+    """获取调度器全局实例（未初始化返回None）"""
+    return _scheduler
+
+
+def initialize_mv_refresh_scheduler(
+    window_seconds: float = 30.0,
+    concurrent: bool = True
+) -> MaterializedViewRefreshScheduler:
+    """
+    初始化调度器全局实例
+
+    Args:
+        window_seconds: 单个视图两次刷新的最小间隔（秒）
+        concurrent: 是否使用 REFRESH ... CONCURRENTLY
+
+    Returns:
+        调度器实例
+    """
+    global _scheduler
+    _scheduler = MaterializedViewRefreshScheduler(
+        window_seconds=window_seconds,
+        concurrent=concurrent
+    )
+    return _scheduler
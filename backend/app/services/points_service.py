@@ -3,18 +3,149 @@
 处理所有积分相关的业务逻辑
 """
 
-from typing import Optional, List, Tuple
+import asyncio
+from datetime import datetime
+from typing import Optional, List, Tuple, Dict, Iterable
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, insert, update, delete, cast, literal, values, column, BigInteger, String, func, tuple_, any_, bindparam, event
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session, aliased
 from loguru import logger
 
+from app.core.config import settings
 from app.models import User, UserPoints, PointTransaction, PointTransactionType, ReferralRelation
 from app.services.cache_service import CacheService
+from app.services.event_ledger_service import EventLedgerService
+from app.services.realtime_leaderboard_service import RealtimeLeaderboardService
+from app.services.materialized_view_service import MaterializedViewService
+from app.services.referral_service import ReferralService
+from app.utils.lru_cache import LRUCache
+from app.utils.pagination import decode_cursor
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _clear_pending_user_ids(session: Session):
+    """事务结束后清除本事务新建的用户ID标记（提交后的下一次查询会写入进程内缓存）"""
+    session.info.pop(PointsService.SESSION_INFO_KEY_NEW_USERS, None)
 
 
 class PointsService:
     """积分服务类"""
 
+    # 全局统计快照的重算锁（快照过期时避免并发重复扫描）
+    _statistics_lock = asyncio.Lock()
+
+    # 钱包地址 → 用户ID（用户不删除、地址不变更，映射一经提交即永久有效）
+    USER_ID_CACHE_TTL = 3600
+    _user_ids = LRUCache(maxsize=settings.USER_ID_CACHE_SIZE, ttl=USER_ID_CACHE_TTL)
+
+    # 本事务内新建、尚未提交的用户ID（回滚后失效，不能进入进程内缓存）
+    SESSION_INFO_KEY_NEW_USERS = "points_service:new_user_ids"
+
+    # 交易类型 → 积分账户的来源统计字段
+    SOURCE_COLUMNS = {
+        PointTransactionType.REFERRAL_L1: "points_from_referral",
+        PointTransactionType.REFERRAL_L2: "points_from_referral",
+        PointTransactionType.TASK_DAILY: "points_from_tasks",
+        PointTransactionType.TASK_WEEKLY: "points_from_tasks",
+        PointTransactionType.TASK_ONCE: "points_from_tasks",
+        PointTransactionType.QUIZ_CORRECT: "points_from_quiz",
+        PointTransactionType.TEAM_REWARD: "points_from_team",
+        PointTransactionType.PURCHASE: "points_from_purchase",
+    }
+
+    @staticmethod
+    async def get_or_create_users(
+        db: AsyncSession,
+        wallet_addresses: Iterable[str]
+    ) -> Dict[str, User]:
+        """
+        批量获取或创建用户（不提交事务）
+
+        一次 SELECT ... WHERE wallet_address = ANY(:addrs) 查出已有用户，
+        缺失的用一次 INSERT ... ON CONFLICT DO NOTHING RETURNING 补建
+
+        Args:
+            db: 数据库会话
+            wallet_addresses: 钱包地址列表（不区分大小写，可重复）
+
+        Returns:
+            {小写钱包地址: User对象}
+        """
+        addresses = {address.lower() for address in wallet_addresses}
+        if not addresses:
+            return {}
+
+        lookup = select(User).where(
+            User.wallet_address == any_(bindparam("addresses", type_=ARRAY(String)))
+        )
+
+        # 1. 一次查询已有用户
+        result = await db.execute(lookup, {"addresses": list(addresses)})
+        users = {user.wallet_address: user for user in result.scalars().all()}
+
+        # 2. 缺失的一次批量插入（并发请求已插入的行被跳过）
+        missing = sorted(addresses - users.keys())
+        created_ids = set()
+        if missing:
+            result = await db.scalars(
+                pg_insert(User)
+                .on_conflict_do_nothing(index_elements=[User.wallet_address])
+                .returning(User),
+                [{"wallet_address": address} for address in missing]
+            )
+            for user in result.all():
+                users[user.wallet_address] = user
+                created_ids.add(user.id)
+                logger.info(f"✨ 创建新用户: {user.wallet_address[:10]}...")
+
+            # 3. 与并发插入冲突的地址再查一次
+            conflicted = [address for address in missing if address not in users]
+            if conflicted:
+                result = await db.execute(lookup, {"addresses": conflicted})
+                users.update({user.wallet_address: user for user in result.scalars().all()})
+
+        # 4. 已提交的映射写入进程内缓存，本事务新建的等提交后再由查询写入
+        pending = db.info.setdefault(PointsService.SESSION_INFO_KEY_NEW_USERS, set())
+        pending.update(created_ids)
+        # 新建用户以0分加入实时排行榜（提交后由 apply_staged 写入）
+        RealtimeLeaderboardService.stage_joined(db, created_ids)
+        for address, user in users.items():
+            if user.id not in pending:
+                PointsService._user_ids.set(address, user.id)
+
+        return users
+
+    @staticmethod
+    async def get_or_create_user_ids(
+        db: AsyncSession,
+        wallet_addresses: Iterable[str]
+    ) -> Dict[str, int]:
+        """
+        批量获取或创建用户ID（优先命中进程内缓存，只查询未命中的地址）
+
+        Args:
+            db: 数据库会话
+            wallet_addresses: 钱包地址列表（不区分大小写，可重复）
+
+        Returns:
+            {小写钱包地址: 用户ID}
+        """
+        user_ids: Dict[str, int] = {}
+        missing = set()
+        for address in {address.lower() for address in wallet_addresses}:
+            user_id = PointsService._user_ids.get(address)
+            if user_id is None:
+                missing.add(address)
+            else:
+                user_ids[address] = user_id
+
+        if missing:
+            users = await PointsService.get_or_create_users(db, missing)
+            user_ids.update({address: user.id for address, user in users.items()})
+        return user_ids
+
     @staticmethod
     async def get_or_create_user(
         db: AsyncSession,
@@ -30,20 +161,18 @@ class PointsService:
         Returns:
             User对象
         """
-        # 查询用户
-        result = await db.execute(
-            select(User).where(User.wallet_address == wallet_address.lower())
-        )
-        user = result.scalar_one_or_none()
+        users = await PointsService.get_or_create_users(db, [wallet_address])
+        return users[wallet_address.lower()]
 
-        # 不存在则创建
-        if not user:
-            user = User(wallet_address=wallet_address.lower())
-            db.add(user)
-            await db.flush()
-            logger.info(f"✨ 创建新用户: {wallet_address[:10]}...")
+    @staticmethod
+    def user_id_cache_stats() -> dict:
+        """地址 → 用户ID 进程内缓存统计"""
+        return PointsService._user_ids.stats()
 
-        return user
+    @staticmethod
+    def clear_user_id_cache():
+        """清空地址 → 用户ID 进程内缓存"""
+        PointsService._user_ids.clear()
 
     @staticmethod
     async def get_or_create_user_points(
@@ -84,7 +213,8 @@ class PointsService:
         level: int,
         purchase_amount: int,
         tx_hash: str,
-        block_number: int
+        block_number: int,
+        log_index: Optional[int] = None
     ) -> bool:
         """
         发放推荐积分奖励
@@ -98,61 +228,61 @@ class PointsService:
             purchase_amount: 购买金额 (wei)
             tx_hash: 交易哈希
             block_number: 区块号
+            log_index: 日志索引（提供时按 (tx_hash, log_index) 去重）
 
         Returns:
-            是否成功
+            是否成功（事件已处理过时返回False）
         """
         try:
-            # 1. 获取或创建用户
-            referrer = await PointsService.get_or_create_user(db, referrer_address)
-            purchaser = await PointsService.get_or_create_user(db, purchaser_address)
-
-            # 2. 获取或创建积分账户
-            referrer_points = await PointsService.get_or_create_user_points(db, referrer.id)
-
-            # 3. 增加积分
-            referrer_points.available_points += points_amount
-            referrer_points.total_earned += points_amount
-            referrer_points.points_from_referral += points_amount
+            # 0. 登记事件，已处理过则跳过
+            if log_index is not None:
+                claimed = await EventLedgerService.claim_event(
+                    db, 'RewardCalculated', tx_hash, log_index, block_number
+                )
+                if not claimed:
+                    await db.rollback()
+                    logger.info(f"⏭️  推荐奖励已发放过: tx={tx_hash[:10]}... log_index={log_index}")
+                    return False
 
-            # 4. 更新用户总积分
-            referrer.total_points += points_amount
+            # 1. 获取或创建用户（优先命中地址 → 用户ID缓存）
+            user_ids = await PointsService.get_or_create_user_ids(db, [referrer_address, purchaser_address])
+            referrer_id = user_ids[referrer_address.lower()]
+            purchaser_id = user_ids[purchaser_address.lower()]
 
-            # 5. 记录交易流水
+            # 2. 一条语句完成：积分账户累加 + 用户总积分 + 交易流水
             transaction_type = (
                 PointTransactionType.REFERRAL_L1 if level == 1
                 else PointTransactionType.REFERRAL_L2
             )
-
-            transaction = PointTransaction(
-                user_id=referrer.id,
+            transaction = await PointsService._apply_points_change(
+                db,
+                user_id=referrer_id,
+                points=points_amount,
                 transaction_type=transaction_type,
-                amount=points_amount,
-                balance_after=referrer_points.available_points,
-                related_user_id=purchaser.id,
+                related_user_id=purchaser_id,
                 description=f"L{level} 推荐奖励 - 来自 {purchaser_address[:10]}...",
                 extra_metadata={
                     "purchase_amount_wei": str(purchase_amount),
                     "tx_hash": tx_hash,
+                    "log_index": log_index,
                     "block_number": block_number,
                     "level": level
-                },
-                status="completed"
+                }
             )
-            db.add(transaction)
 
-            # 6. 更新推荐关系统计
-            result = await db.execute(
-                select(ReferralRelation).where(
-                    ReferralRelation.referee_id == purchaser.id,
-                    ReferralRelation.referrer_id == referrer.id
-                )
-            )
-            referral_relation = result.scalar_one_or_none()
+            # 3. 更新推荐关系统计（L2奖励归属到上级链中推荐人对应的那一级关系）
+            upline = await ReferralService.get_upline(db, purchaser_id, max_depth=level)
+            referral_relation = ReferralService.attributed_relation(upline, referrer_id, level)
             if referral_relation:
-                referral_relation.total_rewards_given += points_amount
+                await db.execute(
+                    update(ReferralRelation)
+                    .where(ReferralRelation.id == referral_relation.id)
+                    .values(total_rewards_given=ReferralRelation.total_rewards_given + points_amount)
+                )
 
             await db.commit()
+            await RealtimeLeaderboardService.apply_staged(db)
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_POINTS_LEADERBOARD)
 
             logger.info(
                 f"✅ 积分发放成功: "
@@ -160,23 +290,187 @@ class PointsService:
                 f"购买者={purchaser_address[:10]}... "
                 f"积分={points_amount} "
                 f"层级=L{level} "
-                f"余额={referrer_points.available_points}"
+                f"余额={transaction.balance_after}"
             )
 
             return True
 
         except Exception as e:
+            RealtimeLeaderboardService.discard_staged(db)
             await db.rollback()
             logger.error(f"❌ 积分发放失败: {e}")
             raise
 
+    @staticmethod
+    async def award_referral_points_batch(
+        db: AsyncSession,
+        rewards: List[dict]
+    ) -> int:
+        """
+        批量发放推荐积分奖励（不提交事务，由调用方统一提交）
+
+        一个批次内：按推荐人汇总积分后一条语句原子累加积分账户（缺失的账户创建）
+        并同步用户总积分，推荐关系统计一条 UPDATE ... FROM (VALUES ...) 累加，
+        交易流水按链上顺序计算余额后一次性批量插入
+
+        Args:
+            db: 数据库会话
+            rewards: 奖励列表，每项包含 referrer_address, purchaser_address,
+                points_amount, level, purchase_amount, tx_hash, log_index, block_number
+                （去重由调用方通过 EventLedgerService 完成）
+
+        Returns:
+            写入的交易流水条数
+        """
+        if not rewards:
+            return 0
+
+        # 1. 一次批量获取或创建批次内的所有用户
+        user_ids = await PointsService.get_or_create_user_ids(
+            db,
+            [r['referrer_address'] for r in rewards] + [r['purchaser_address'] for r in rewards]
+        )
+
+        # 2. 一次递归查询加载所有购买者的上级链（用于L1/L2奖励归属）
+        purchaser_ids = {user_ids[r['purchaser_address'].lower()] for r in rewards}
+        uplines = await ReferralService.get_uplines(
+            db, purchaser_ids, max_depth=max(r['level'] for r in rewards)
+        )
+
+        # 3. 汇总每个推荐人、每条推荐关系的增量
+        credits: Dict[int, int] = {}
+        relation_rewards: Dict[int, int] = {}
+        for reward in rewards:
+            referrer_id = user_ids[reward['referrer_address'].lower()]
+            purchaser_id = user_ids[reward['purchaser_address'].lower()]
+            points_amount = reward['points_amount']
+
+            credits[referrer_id] = credits.get(referrer_id, 0) + points_amount
+            relation = ReferralService.attributed_relation(
+                uplines[purchaser_id], referrer_id, reward['level']
+            )
+            if relation:
+                relation_rewards[relation.id] = relation_rewards.get(relation.id, 0) + points_amount
+
+        # 4. 一条语句完成：积分账户累加 + 用户总积分（RETURNING 变动后的值）
+        points_table = UserPoints.__table__
+        users_table = User.__table__
+        increments = ("available_points", "total_earned", "points_from_referral")
+
+        account = pg_insert(points_table).values([
+            {"user_id": user_id, **{name: amount for name in increments}}
+            for user_id, amount in sorted(credits.items())
+        ])
+        account = account.on_conflict_do_update(
+            index_elements=[points_table.c.user_id],
+            set_={
+                **{
+                    name: func.coalesce(points_table.c[name], 0) + account.excluded[name]
+                    for name in increments
+                },
+                "updated_at": func.now()
+            }
+        ).returning(*points_table.c).cte("points_account")
+
+        user_total = (
+            update(users_table)
+            .where(users_table.c.id == account.c.user_id)
+            .values(total_points=account.c.available_points)
+            .returning(*users_table.c)
+            .cte("user_total")
+        )
+
+        points_entity = aliased(UserPoints, account, adapt_on_names=True)
+        user_entity = aliased(User, user_total, adapt_on_names=True)
+        result = await db.execute(
+            select(points_entity, user_entity)
+            .join(user_entity, user_entity.id == points_entity.user_id)
+            .execution_options(populate_existing=True)
+        )
+
+        # 本批次之前的余额（流水的 balance_after 按链上顺序从这里累加）
+        balances: Dict[int, int] = {}
+        for user_points, user in result.all():
+            balances[user.id] = user_points.available_points - credits[user.id]
+            RealtimeLeaderboardService.stage(db, user, credits[user.id])
+
+        # 5. 推荐关系统计
+        await PointsService._add_relation_rewards(db, relation_rewards)
+
+        # 6. 批量插入交易流水
+        rows = []
+        for reward in rewards:
+            referrer_id = user_ids[reward['referrer_address'].lower()]
+            points_amount = reward['points_amount']
+            level = reward['level']
+            balances[referrer_id] += points_amount
+
+            rows.append({
+                "user_id": referrer_id,
+                "transaction_type": (
+                    PointTransactionType.REFERRAL_L1 if level == 1
+                    else PointTransactionType.REFERRAL_L2
+                ),
+                "amount": points_amount,
+                "balance_after": balances[referrer_id],
+                "related_user_id": user_ids[reward['purchaser_address'].lower()],
+                "description": f"L{level} 推荐奖励 - 来自 {reward['purchaser_address'][:10]}...",
+                "extra_metadata": {
+                    "purchase_amount_wei": str(reward['purchase_amount']),
+                    "tx_hash": reward['tx_hash'],
+                    "log_index": reward.get('log_index'),
+                    "block_number": reward['block_number'],
+                    "level": level
+                },
+                "status": "completed"
+            })
+
+        await db.execute(insert(PointTransaction), rows)
+
+        logger.info(
+            f"✅ 批量积分发放: 流水={len(rows)} 推荐人={len(credits)}"
+        )
+
+        return len(rows)
+
+    @staticmethod
+    async def _add_relation_rewards(
+        db: AsyncSession,
+        rewards: Dict[int, int]
+    ):
+        """
+        原子地累加推荐关系的奖励统计（不提交事务）
+
+        一条 UPDATE ... FROM (VALUES ...) 完成，负数为扣回，结果不低于0
+
+        Args:
+            db: 数据库会话
+            rewards: 推荐关系ID → 奖励增量
+        """
+        if not rewards:
+            return
+
+        increments = values(
+            column("id", BigInteger), column("amount", BigInteger), name="relation_rewards"
+        ).data(sorted(rewards.items()))
+        await db.execute(
+            update(ReferralRelation)
+            .where(ReferralRelation.id == increments.c.id)
+            .values(total_rewards_given=func.greatest(
+                ReferralRelation.total_rewards_given + increments.c.amount, 0
+            ))
+            .execution_options(synchronize_session="fetch")
+        )
+
     @staticmethod
     async def sync_referral_relation(
         db: AsyncSession,
         referee_address: str,
         referrer_address: str,
         tx_hash: str,
-        block_number: int
+        block_number: int,
+        commit: bool = True,
+        log_index: Optional[int] = None
     ) -> bool:
         """
         同步推荐关系到数据库
@@ -187,14 +481,28 @@ class PointsService:
             referrer_address: 推荐人地址
             tx_hash: 交易哈希
             block_number: 区块号
+            commit: 是否立即提交（批量模式下为False，由调用方统一提交）
+            log_index: 日志索引（提供时按 (tx_hash, log_index) 去重）
 
         Returns:
             是否成功
         """
         try:
+            # 0. 登记事件，已处理过则跳过
+            if log_index is not None:
+                claimed = await EventLedgerService.claim_event(
+                    db, 'RegisteredReferrer', tx_hash, log_index, block_number
+                )
+                if not claimed:
+                    if commit:
+                        await db.rollback()
+                    logger.info(f"⏭️  推荐关系事件已处理过: tx={tx_hash[:10]}... log_index={log_index}")
+                    return False
+
             # 1. 获取或创建用户
-            referee = await PointsService.get_or_create_user(db, referee_address)
-            referrer = await PointsService.get_or_create_user(db, referrer_address)
+            users = await PointsService.get_or_create_users(db, [referee_address, referrer_address])
+            referee = users[referee_address.lower()]
+            referrer = users[referrer_address.lower()]
 
             # 2. 检查是否已存在推荐关系
             result = await db.execute(
@@ -210,6 +518,9 @@ class PointsService:
                     f"被推荐人={referee_address[:10]}... "
                     f"已有推荐人ID={existing.referrer_id}"
                 )
+                if commit:
+                    await db.commit()
+                    await RealtimeLeaderboardService.apply_staged(db)
                 return False
 
             # 3. 创建推荐关系
@@ -222,11 +533,16 @@ class PointsService:
                 is_active=True
             )
             db.add(referral_relation)
+            await ReferralService.link_closure(db, referrer.id, referee.id)
 
             # 4. 更新推荐人的邀请统计
             referrer.total_invited += 1
 
-            await db.commit()
+            if commit:
+                await db.commit()
+                await RealtimeLeaderboardService.apply_staged(db)
+            else:
+                await db.flush()
 
             logger.info(
                 f"🤝 推荐关系同步成功: "
@@ -237,10 +553,206 @@ class PointsService:
             return True
 
         except Exception as e:
-            await db.rollback()
+            if commit:
+                RealtimeLeaderboardService.discard_staged(db)
+                await db.rollback()
             logger.error(f"❌ 推荐关系同步失败: {e}")
             raise
 
+    @staticmethod
+    async def reverse_chain_events(
+        db: AsyncSession,
+        after_block: int
+    ) -> dict:
+        """
+        回滚指定区块之后由链上事件产生的积分和推荐关系（不提交事务）
+
+        用于区块重组：原流水标记为cancelled并写入一笔负数冲正流水，
+        积分账户、用户总积分和推荐关系统计在数据库中原子扣回（余额封顶在同一语句内判断）；
+        链上同步的推荐关系直接删除，推荐人的邀请数和"邀请好友"任务进度同步扣回，
+        待规范链重新同步
+
+        Args:
+            db: 数据库会话
+            after_block: 最后一个仍有效的区块
+
+        Returns:
+            回滚统计 {"transactions": 冲正流水数, "relations": 删除推荐关系数}
+        """
+        from app.services.task_service import TaskService
+
+        block_number = cast(PointTransaction.extra_metadata['block_number'].astext, BigInteger)
+
+        # 1. 查找受影响的事件流水
+        result = await db.execute(
+            select(PointTransaction).where(
+                PointTransaction.transaction_type.in_([
+                    PointTransactionType.REFERRAL_L1,
+                    PointTransactionType.REFERRAL_L2
+                ]),
+                PointTransaction.status == "completed",
+                PointTransaction.extra_metadata.has_key('tx_hash'),
+                block_number > after_block
+            ).order_by(PointTransaction.id)
+        )
+        transactions = result.scalars().all()
+
+        # 2. 查找链上同步的推荐关系
+        result = await db.execute(
+            select(ReferralRelation).where(
+                ReferralRelation.blockchain_block_number > after_block
+            )
+        )
+        relations = result.scalars().all()
+
+        if not transactions and not relations:
+            return {"transactions": 0, "relations": 0}
+
+        related_ids = {t.related_user_id for t in transactions if t.related_user_id}
+        uplines = await ReferralService.get_uplines(db, related_ids, max_depth=2)
+
+        # 3. 汇总每个用户、每条推荐关系应扣回的积分
+        debits: Dict[int, int] = {}
+        relation_debits: Dict[int, int] = {}
+        for transaction in transactions:
+            debits[transaction.user_id] = debits.get(transaction.user_id, 0) + transaction.amount
+            if transaction.related_user_id:
+                relation = ReferralService.attributed_relation(
+                    uplines[transaction.related_user_id],
+                    transaction.user_id,
+                    transaction.extra_metadata.get('level', 1)
+                )
+                if relation:
+                    relation_debits[relation.id] = relation_debits.get(relation.id, 0) - transaction.amount
+
+        # 4. 一条语句完成：锁定积分账户，按当前余额封顶扣回，同步用户总积分
+        #    （已被消费的积分无法扣回；RETURNING 扣回前后的余额）
+        previous_balances: Dict[int, int] = {}
+        if debits:
+            points_table = UserPoints.__table__
+            users_table = User.__table__
+            amounts = values(
+                column("user_id", BigInteger), column("amount", BigInteger), name="debits"
+            ).data(sorted(debits.items()))
+
+            locked = (
+                select(points_table.c.user_id, points_table.c.available_points)
+                .where(points_table.c.user_id.in_(debits))
+                .with_for_update()
+                .cte("locked_points")
+            )
+            account = (
+                update(points_table)
+                .where(
+                    points_table.c.user_id == amounts.c.user_id,
+                    points_table.c.user_id == locked.c.user_id
+                )
+                .values(
+                    available_points=points_table.c.available_points - func.least(
+                        amounts.c.amount, points_table.c.available_points
+                    ),
+                    total_earned=func.greatest(points_table.c.total_earned - amounts.c.amount, 0),
+                    points_from_referral=func.greatest(
+                        points_table.c.points_from_referral - amounts.c.amount, 0
+                    ),
+                    updated_at=func.now()
+                )
+                .returning(*points_table.c, locked.c.available_points.label("previous_points"))
+                .cte("points_account")
+            )
+            user_total = (
+                update(users_table)
+                .where(users_table.c.id == account.c.user_id)
+                .values(total_points=account.c.available_points)
+                .returning(*users_table.c)
+                .cte("user_total")
+            )
+
+            points_entity = aliased(UserPoints, account, adapt_on_names=True)
+            user_entity = aliased(User, user_total, adapt_on_names=True)
+            result = await db.execute(
+                select(points_entity, account.c.previous_points, user_entity)
+                .join(user_entity, user_entity.id == points_entity.user_id)
+                .execution_options(populate_existing=True)
+            )
+            for user_points, previous_points, user in result.all():
+                previous_balances[user.id] = previous_points
+                RealtimeLeaderboardService.stage(
+                    db, user, user_points.available_points - previous_points
+                )
+
+        await PointsService._add_relation_rewards(db, relation_debits)
+
+        # 5. 逐笔冲正：按原流水顺序分摊实际扣回的积分
+        rows = []
+        for transaction in transactions:
+            amount = transaction.amount
+            balance = previous_balances.get(transaction.user_id, 0)
+            deducted = min(amount, balance)
+            if deducted < amount:
+                logger.warning(
+                    f"⚠️  重组回滚余额不足: user_id={transaction.user_id} "
+                    f"应扣={amount} 实扣={deducted}"
+                )
+            previous_balances[transaction.user_id] = balance - deducted
+
+            transaction.status = "cancelled"
+
+            if deducted > 0:
+                rows.append({
+                    "user_id": transaction.user_id,
+                    "transaction_type": transaction.transaction_type,
+                    "amount": -deducted,
+                    "balance_after": balance - deducted,
+                    "related_user_id": transaction.related_user_id,
+                    "description": f"区块重组回滚 - 流水#{transaction.id}",
+                    "extra_metadata": {
+                        "reason": "reorg",
+                        "reversed_transaction_id": transaction.id,
+                        "original_tx_hash": transaction.extra_metadata.get('tx_hash'),
+                        "original_block_number": transaction.extra_metadata.get('block_number')
+                    },
+                    "status": "completed"
+                })
+
+        if rows:
+            await db.execute(insert(PointTransaction), rows)
+
+        # 6. 删除重组区块中的推荐关系（先从闭包表中移除经过这些关系的路径）
+        invited: Dict[int, int] = {}
+        for relation in relations:
+            await ReferralService.unlink_closure(db, relation.referrer_id, relation.referee_id)
+            invited[relation.referrer_id] = invited.get(relation.referrer_id, 0) + 1
+        if relations:
+            await db.execute(
+                delete(ReferralRelation).where(
+                    ReferralRelation.id.in_([r.id for r in relations])
+                )
+            )
+            decrements = values(
+                column("id", BigInteger), column("count", BigInteger), name="invited"
+            ).data(sorted(invited.items()))
+            await db.execute(
+                update(User)
+                .where(User.id == decrements.c.id)
+                .values(total_invited=func.greatest(User.total_invited - decrements.c.count, 0))
+                .execution_options(synchronize_session="fetch")
+            )
+
+            # 撤销推荐人"邀请好友"任务进度（规范链重新同步推荐关系时再次累加）
+            await TaskService.apply_progress_batch(
+                db,
+                [(referrer_id, "invite_friends", -count) for referrer_id, count in invited.items()],
+                commit=False
+            )
+
+        logger.warning(
+            f"↩️  区块重组回滚: 区块>{after_block}, "
+            f"冲正流水={len(transactions)}, 删除推荐关系={len(relations)}"
+        )
+
+        return {"transactions": len(transactions), "relations": len(relations)}
+
     @staticmethod
     async def get_user_balance(
         db: AsyncSession,
@@ -256,34 +768,163 @@ class PointsService:
         Returns:
             积分余额，不存在返回None
         """
-        # 1. 查询用户
-        result = await db.execute(
-            select(User).where(User.wallet_address == wallet_address.lower())
-        )
-        user = result.scalar_one_or_none()
+        # 1. 查询用户ID（优先进程内缓存）
+        normalized_address = wallet_address.lower()
+        user_id = PointsService._user_ids.get(normalized_address)
+        if user_id is None:
+            result = await db.execute(
+                select(User.id).where(User.wallet_address == normalized_address)
+            )
+            user_id = result.scalar_one_or_none()
 
-        if not user:
-            return None
+            if user_id is None:
+                return None
+            if user_id not in db.info.get(PointsService.SESSION_INFO_KEY_NEW_USERS, ()):
+                PointsService._user_ids.set(normalized_address, user_id)
 
         # 2. 尝试从缓存获取余额
-        cached_balance = await CacheService.get_user_balance_cache(user.id)
+        cached_balance = await CacheService.get_user_balance_cache(user_id)
         if cached_balance is not None:
-            logger.debug(f"🎯 余额缓存命中: user_id={user.id}, balance={cached_balance}")
+            logger.debug(f"🎯 余额缓存命中: user_id={user_id}, balance={cached_balance}")
             return cached_balance
 
         # 3. 缓存未命中，从数据库查询
         result = await db.execute(
-            select(UserPoints).where(UserPoints.user_id == user.id)
+            select(UserPoints).where(UserPoints.user_id == user_id)
         )
         user_points = result.scalar_one_or_none()
         balance = user_points.available_points if user_points else 0
 
         # 4. 写入缓存
-        await CacheService.set_user_balance_cache(user.id, balance)
-        logger.debug(f"💾 余额已缓存: user_id={user.id}, balance={balance}")
+        await CacheService.set_user_balance_cache(user_id, balance)
+        logger.debug(f"💾 余额已缓存: user_id={user_id}, balance={balance}")
 
         return balance
 
+    @staticmethod
+    async def _apply_points_change(
+        db: AsyncSession,
+        user_id: int,
+        points: int,
+        transaction_type: PointTransactionType,
+        **transaction_fields
+    ) -> PointTransaction:
+        """
+        原子地变动用户积分（不提交事务）
+
+        一条语句（数据修改CTE）完成：
+        - 积分账户：获得积分时 INSERT ... ON CONFLICT DO UPDATE 累加（账户不存在时创建），
+          消费积分时带余额条件的 UPDATE，RETURNING 变动后的账户
+        - 用户总积分：UPDATE users SET total_points = 变动后的可用积分
+        - 交易流水：INSERT ... SELECT，balance_after 取变动后的可用积分
+
+        累加在数据库中完成，同一用户的并发变动只在行锁上短暂排队，不需要先读后写。
+        返回的账户、用户对象覆盖会话中已加载的旧值。
+
+        users.total_points 始终等于 user_points.available_points（排行榜按当前余额排名），
+        因此总积分的变动量就是 points，实时排行榜按该增量暂存。
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            points: 积分数量(正数=获得,负数=消费)
+            transaction_type: 交易类型
+            transaction_fields: 交易流水的其它字段（description、related_*、extra_metadata）
+
+        Returns:
+            PointTransaction: 交易记录
+
+        Raises:
+            ValueError: 积分余额不足
+        """
+        points_table = UserPoints.__table__
+        users_table = User.__table__
+        transactions_table = PointTransaction.__table__
+
+        # 1. 积分账户各字段的增量
+        increments = {"available_points": points}
+        if points > 0:
+            increments["total_earned"] = points
+        else:
+            increments["total_spent"] = -points
+        source_column = PointsService.SOURCE_COLUMNS.get(transaction_type)
+        if source_column:
+            increments[source_column] = points
+
+        if points > 0:
+            account = pg_insert(points_table).values(user_id=user_id, **increments)
+            account = account.on_conflict_do_update(
+                index_elements=[points_table.c.user_id],
+                set_={
+                    **{
+                        name: func.coalesce(points_table.c[name], 0) + account.excluded[name]
+                        for name in increments
+                    },
+                    "updated_at": func.now()
+                }
+            )
+        else:
+            # 余额条件与扣减在同一行锁内判断，不满足时不返回行
+            account = (
+                update(points_table)
+                .where(
+                    points_table.c.user_id == user_id,
+                    points_table.c.available_points >= -points
+                )
+                .values({
+                    name: func.coalesce(points_table.c[name], 0) + value
+                    for name, value in increments.items()
+                })
+            )
+        account = account.returning(*points_table.c).cte("points_account")
+
+        # 2. 用户总积分与可用积分保持一致
+        user_total = (
+            update(users_table)
+            .where(users_table.c.id == account.c.user_id)
+            .values(total_points=account.c.available_points)
+            .returning(*users_table.c)
+            .cte("user_total")
+        )
+
+        # 3. 交易流水
+        columns = {
+            **transaction_fields,
+            "user_id": user_id,
+            "transaction_type": transaction_type,
+            "amount": points,
+            "status": "completed"
+        }
+        transaction = (
+            insert(transactions_table)
+            .from_select(
+                [*columns, "balance_after"],
+                select(
+                    *(literal(value, transactions_table.c[name].type) for name, value in columns.items()),
+                    account.c.available_points
+                )
+            )
+            .returning(*transactions_table.c)
+            .cte("point_transaction")
+        )
+
+        transaction_entity = aliased(PointTransaction, transaction, adapt_on_names=True)
+        points_entity = aliased(UserPoints, account, adapt_on_names=True)
+        user_entity = aliased(User, user_total, adapt_on_names=True)
+        result = await db.execute(
+            select(transaction_entity, points_entity, user_entity)
+            .join(points_entity, points_entity.user_id == transaction_entity.user_id)
+            .join(user_entity, user_entity.id == transaction_entity.user_id)
+            .execution_options(populate_existing=True)
+        )
+        row = result.one_or_none()
+        if row is None:
+            raise ValueError(f"积分余额不足: user_id={user_id}, 需要: {-points}")
+
+        transaction_row, _, user = row
+        RealtimeLeaderboardService.stage(db, user, points)
+        return transaction_row
+
     @staticmethod
     async def add_user_points(
         db: AsyncSession,
@@ -314,58 +955,32 @@ class PointsService:
 
         Returns:
             PointTransaction: 交易记录
+
+        Raises:
+            ValueError: 积分余额不足
         """
         try:
-            # 1. 获取或创建用户积分账户
-            user_points = await PointsService.get_or_create_user_points(db, user_id)
-
-            # 2. 更新可用积分
-            user_points.available_points += points
-
-            # 3. 更新统计信息
-            if points > 0:
-                user_points.total_earned += points
-            else:
-                user_points.total_spent += abs(points)
-
-            # 4. 根据交易类型更新来源统计
-            if transaction_type in [PointTransactionType.REFERRAL_L1, PointTransactionType.REFERRAL_L2]:
-                user_points.points_from_referral += points
-            elif transaction_type in [PointTransactionType.TASK_DAILY, PointTransactionType.TASK_WEEKLY, PointTransactionType.TASK_ONCE]:
-                user_points.points_from_tasks += points
-            elif transaction_type == PointTransactionType.QUIZ_CORRECT:
-                user_points.points_from_quiz += points
-            elif transaction_type == PointTransactionType.TEAM_REWARD:
-                user_points.points_from_team += points
-            elif transaction_type == PointTransactionType.PURCHASE:
-                user_points.points_from_purchase += points
-
-            # 5. 创建交易流水
-            transaction = PointTransaction(
+            # 1. 一条语句完成：积分账户累加 + 用户总积分 + 交易流水
+            transaction = await PointsService._apply_points_change(
+                db,
                 user_id=user_id,
+                points=points,
                 transaction_type=transaction_type,
-                amount=points,
-                balance_after=user_points.available_points,
                 description=description,
                 related_user_id=related_user_id,
                 related_task_id=related_task_id,
                 related_team_id=related_team_id,
                 related_question_id=related_question_id,
-                extra_metadata=extra_metadata or {},
-                status="completed"
-            )
-            db.add(transaction)
-
-            # 6. 更新用户总积分
-            result = await db.execute(
-                select(User).where(User.id == user_id)
+                extra_metadata=extra_metadata or {}
             )
-            user = result.scalar_one_or_none()
-            if user:
-                user.total_points = user_points.available_points
 
             await db.commit()
-            await db.refresh(transaction)
+            await RealtimeLeaderboardService.apply_staged(db)
+
+            dirty_views = [MaterializedViewService.MV_POINTS_LEADERBOARD]
+            if transaction_type == PointTransactionType.QUIZ_CORRECT:
+                dirty_views.append(MaterializedViewService.MV_QUIZ_LEADERBOARD)
+            await MaterializedViewService.mark_dirty(*dirty_views)
 
             # 使缓存失效（写后失效策略）
             await CacheService.invalidate_user_all_cache(user_id)
@@ -373,12 +988,13 @@ class PointsService:
             logger.info(
                 f"✅ 积分变动成功: user_id={user_id} "
                 f"变动={points:+d} 类型={transaction_type.value} "
-                f"余额={user_points.available_points}"
+                f"余额={transaction.balance_after}"
             )
 
             return transaction
 
         except Exception as e:
+            RealtimeLeaderboardService.discard_staged(db)
             await db.rollback()
             logger.error(f"❌ 积分变动失败: {e}")
             raise
@@ -450,20 +1066,29 @@ class PointsService:
         user_id: int,
         transaction_type: Optional[PointTransactionType] = None,
         page: int = 1,
-        page_size: int = 50
-    ) -> Tuple[List[PointTransaction], int]:
+        page_size: int = 50,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> Tuple[List[PointTransaction], Optional[int]]:
         """
         分页查询用户积分流水
 
+        按 (created_at, id) 降序；传入游标时从游标位置向后读取（键集分页），忽略页码
+
         Args:
             db: 数据库会话
             user_id: 用户ID
             transaction_type: 交易类型筛选(可选)
             page: 页码(从1开始)
             page_size: 每页大小
+            cursor: 上一页返回的游标(可选)
+            include_total: 是否统计总数
 
         Returns:
-            (交易记录列表, 总记录数)
+            (交易记录列表, 总记录数)，不统计总数时总数为None
+
+        Raises:
+            ValueError: 游标无效
         """
         # 构建基础查询
         query = select(PointTransaction).where(
@@ -477,16 +1102,25 @@ class PointsService:
             )
 
         # 获取总数
-        from sqlalchemy import func
-        count_query = select(func.count()).select_from(
-            query.subquery()
-        )
-        total_result = await db.execute(count_query)
-        total = total_result.scalar_one()
+        total = None
+        if include_total:
+            count_query = select(func.count()).select_from(
+                query.subquery()
+            )
+            total_result = await db.execute(count_query)
+            total = total_result.scalar_one()
 
         # 分页查询
-        query = query.order_by(desc(PointTransaction.created_at))
-        query = query.offset((page - 1) * page_size).limit(page_size)
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, datetime, int)
+            query = query.where(
+                tuple_(PointTransaction.created_at, PointTransaction.id) < tuple_(created_at, last_id)
+            )
+        else:
+            query = query.offset((page - 1) * page_size)
+
+        query = query.order_by(desc(PointTransaction.created_at), desc(PointTransaction.id))
+        query = query.limit(page_size)
 
         result = await db.execute(query)
         transactions = result.scalars().all()
@@ -591,65 +1225,53 @@ class PointsService:
 
     @staticmethod
     async def get_points_statistics(
-        db: AsyncSession
+        db: AsyncSession,
+        use_cache: bool = True
     ) -> dict:
         """
         获取积分系统全局统计数据
 
+        单次扫描 user_points 聚合所有指标，结果作为快照缓存
+        TTL_POINTS_STATISTICS 秒；快照过期时同一进程内只有一个请求重新计算
+
+        Args:
+            db: 数据库会话
+            use_cache: 是否使用快照缓存
+
         Returns:
             统计数据字典
         """
-        from sqlalchemy import func
+        if use_cache:
+            cached = await CacheService.get_points_statistics_cache()
+            if cached:
+                return cached
 
         try:
-            # 1. 统计总用户数
-            total_users_result = await db.execute(
-                select(func.count(UserPoints.id))
-            )
-            total_users = total_users_result.scalar_one()
-
-            # 2. 统计总发放积分 (sum of total_earned)
-            total_earned_result = await db.execute(
-                select(func.sum(UserPoints.total_earned))
-            )
-            total_distributed = total_earned_result.scalar_one() or 0
-
-            # 3. 统计总消费积分 (sum of total_spent)
-            total_spent_result = await db.execute(
-                select(func.sum(UserPoints.total_spent))
-            )
-            total_spent = total_spent_result.scalar_one() or 0
-
-            # 4. 统计各来源积分
-            referral_result = await db.execute(
-                select(func.sum(UserPoints.points_from_referral))
-            )
-            referral_points = referral_result.scalar_one() or 0
-
-            task_result = await db.execute(
-                select(func.sum(UserPoints.points_from_tasks))
-            )
-            task_points = task_result.scalar_one() or 0
+            async with PointsService._statistics_lock:
+                # 等锁期间其他请求可能已经刷新了快照
+                if use_cache:
+                    cached = await CacheService.get_points_statistics_cache()
+                    if cached:
+                        return cached
+
+                result = await db.execute(
+                    select(
+                        func.count(UserPoints.id).label("total_users"),
+                        func.coalesce(func.sum(UserPoints.total_earned), 0).label("total_points_distributed"),
+                        func.coalesce(func.sum(UserPoints.total_spent), 0).label("total_points_spent"),
+                        func.coalesce(func.sum(UserPoints.points_from_referral), 0).label("referral_points"),
+                        func.coalesce(func.sum(UserPoints.points_from_tasks), 0).label("task_points"),
+                        func.coalesce(func.sum(UserPoints.points_from_quiz), 0).label("quiz_points"),
+                        func.coalesce(func.sum(UserPoints.points_from_team), 0).label("team_points")
+                    )
+                )
+                row = result.one()
 
-            quiz_result = await db.execute(
-                select(func.sum(UserPoints.points_from_quiz))
-            )
-            quiz_points = quiz_result.scalar_one() or 0
+                statistics = {key: int(value) for key, value in row._mapping.items()}
+                statistics["generated_at"] = datetime.utcnow().isoformat()
 
-            team_result = await db.execute(
-                select(func.sum(UserPoints.points_from_team))
-            )
-            team_points = team_result.scalar_one() or 0
-
-            statistics = {
-                'total_users': total_users,
-                'total_points_distributed': total_distributed,
-                'total_points_spent': total_spent,
-                'referral_points': referral_points,
-                'task_points': task_points,
-                'quiz_points': quiz_points,
-                'team_points': team_points
-            }
+                if use_cache:
+                    await CacheService.set_points_statistics_cache(statistics)
 
             logger.debug(f"📊 积分统计查询成功: {statistics}")
 
@@ -3,7 +3,7 @@
 """
 from typing import List, Optional, Tuple
 from datetime import datetime, date, timedelta
-from sqlalchemy import select, func, and_, or_, desc, case
+from sqlalchemy import select, func, and_, or_, desc, case, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
@@ -11,6 +11,8 @@ from app.models import Question, UserAnswer, DailyQuizSession, User
 from app.models.quiz import QuestionDifficulty, QuestionSource, QuestionStatus
 from app.models.point_transaction import PointTransactionType
 from app.services.points_service import PointsService
+from app.services.materialized_view_service import MaterializedViewService
+from app.utils.pagination import decode_cursor
 
 
 class QuizService:
@@ -440,6 +442,7 @@ class QuizService:
                     user.correct_answers += 1
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_QUIZ_LEADERBOARD)
             await db.refresh(user_answer_record)
 
             logger.info(
@@ -472,9 +475,16 @@ class QuizService:
         is_correct: Optional[bool] = None,
         answer_date: Optional[date] = None,
         page: int = 1,
-        page_size: int = 20
-    ) -> Tuple[List[UserAnswer], int]:
-        """获取用户答题记录"""
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> Tuple[List[UserAnswer], Optional[int]]:
+        """
+        获取用户答题记录
+
+        按 (answered_at, id) 降序；传入游标时使用键集分页，忽略页码，
+        不统计总数时总数为None
+        """
         try:
             conditions = [UserAnswer.user_id == user_id]
 
@@ -484,23 +494,31 @@ class QuizService:
                 conditions.append(UserAnswer.answer_date == answer_date)
 
             # 查询总数
-            count_query = select(func.count(UserAnswer.id)).where(and_(*conditions))
-            total_result = await db.execute(count_query)
-            total = total_result.scalar()
+            total = None
+            if include_total:
+                count_query = select(func.count(UserAnswer.id)).where(and_(*conditions))
+                total_result = await db.execute(count_query)
+                total = total_result.scalar()
 
             # 查询数据（按答题时间降序）
             query = (
                 select(UserAnswer)
                 .where(and_(*conditions))
-                .order_by(desc(UserAnswer.answered_at))
-                .offset((page - 1) * page_size)
+                .order_by(desc(UserAnswer.answered_at), desc(UserAnswer.id))
                 .limit(page_size)
             )
+            if cursor:
+                answered_at, last_id = decode_cursor(cursor, datetime, int)
+                query = query.where(
+                    tuple_(UserAnswer.answered_at, UserAnswer.id) < tuple_(answered_at, last_id)
+                )
+            else:
+                query = query.offset((page - 1) * page_size)
 
             result = await db.execute(query)
             answers = list(result.scalars().all())
 
-            logger.info(f"✅ 获取答题记录: 用户={user_id}, 共{total}条")
+            logger.info(f"✅ 获取答题记录: 用户={user_id}, 本页{len(answers)}条")
             return answers, total
 
         except Exception as e:
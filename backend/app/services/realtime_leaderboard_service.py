@@ -0,0 +1,213 @@
+"""
+实时积分排行榜服务
+基于Redis有序集合（ZSET），积分写入时增量更新，排名/分页查询为 O(log N)
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.models import User
+from app.utils.redis_client import redis_client
+
+
+class RealtimeLeaderboardService:
+    """
+    实时积分排行榜服务类
+
+    排序规则与 mv_points_leaderboard 一致：total_points 降序、用户ID升序。
+    ZSET 中分数存为 -total_points、成员为定宽补零的用户ID，
+    这样 ZRANGE/ZRANK 的升序（分数相同按成员字典序）即为排行榜顺序
+    """
+
+    KEY_POINTS = "leaderboard:realtime:points"
+    KEY_POINTS_READY = "leaderboard:realtime:points:ready"
+
+    # 成员定宽（字典序 == 数值序）
+    MEMBER_WIDTH = 12
+
+    # 会话中暂存的待写入增量、新建用户（提交后再写Redis，回滚则丢弃）
+    SESSION_INFO_KEY = "realtime_leaderboard_deltas"
+    SESSION_INFO_KEY_JOINED = "realtime_leaderboard_joined"
+
+    REBUILD_BATCH_SIZE = 5000
+
+    @staticmethod
+    def _member(user_id: int) -> str:
+        return f"{user_id:0{RealtimeLeaderboardService.MEMBER_WIDTH}d}"
+
+    @staticmethod
+    def stage(db: AsyncSession, user: User, delta: int):
+        """
+        暂存用户总积分变动，在事务提交后由 apply_staged 写入ZSET
+
+        被封禁或停用的用户不在榜单上，直接忽略
+
+        Args:
+            db: 数据库会话
+            user: 用户
+            delta: total_points 变动量
+        """
+        if not delta or user.is_active is False or user.is_banned:
+            return
+
+        deltas: Dict[int, int] = db.info.setdefault(RealtimeLeaderboardService.SESSION_INFO_KEY, {})
+        deltas[user.id] = deltas.get(user.id, 0) + delta
+
+    @staticmethod
+    def stage_joined(db: AsyncSession, user_ids: Iterable[int]):
+        """
+        暂存新建用户，在事务提交后由 apply_staged 以0分加入ZSET
+
+        0分用户不会产生增量，不单独加入的话重建之后新建的用户永远不在榜单上
+
+        Args:
+            db: 数据库会话
+            user_ids: 新建用户ID列表
+        """
+        user_ids = set(user_ids)
+        if user_ids:
+            db.info.setdefault(RealtimeLeaderboardService.SESSION_INFO_KEY_JOINED, set()).update(user_ids)
+
+    @staticmethod
+    def discard_staged(db: AsyncSession):
+        """丢弃暂存的增量和新建用户（事务回滚时调用）"""
+        db.info.pop(RealtimeLeaderboardService.SESSION_INFO_KEY, None)
+        db.info.pop(RealtimeLeaderboardService.SESSION_INFO_KEY_JOINED, None)
+
+    @staticmethod
+    async def apply_staged(db: AsyncSession):
+        """
+        将已提交事务中暂存的新建用户（ZADD NX 0分）和增量（ZINCRBY）写入ZSET
+
+        Redis不可用时只记录警告，排行榜可通过 rebuild 重新对齐
+
+        Args:
+            db: 数据库会话（事务已提交）
+        """
+        deltas = db.info.pop(RealtimeLeaderboardService.SESSION_INFO_KEY, None) or {}
+        joined = db.info.pop(RealtimeLeaderboardService.SESSION_INFO_KEY_JOINED, None)
+        if not deltas and not joined:
+            return
+
+        try:
+            async with redis_client.client.pipeline(transaction=False) as pipe:
+                if joined:
+                    # NX：不覆盖同一批次中已有增量或并发写入的分数
+                    pipe.zadd(
+                        RealtimeLeaderboardService.KEY_POINTS,
+                        {RealtimeLeaderboardService._member(user_id): 0 for user_id in joined},
+                        nx=True
+                    )
+                for user_id, delta in deltas.items():
+                    pipe.zincrby(
+                        RealtimeLeaderboardService.KEY_POINTS,
+                        -delta,
+                        RealtimeLeaderboardService._member(user_id)
+                    )
+                await pipe.execute()
+
+            logger.debug(f"🏆 实时排行榜更新: {len(deltas)}个用户, 新加入{len(joined or ())}个")
+
+        except Exception as e:
+            logger.warning(f"⚠️  实时排行榜更新失败（需重建）: {e}")
+
+    @staticmethod
+    async def is_ready() -> bool:
+        """排行榜是否已完成初始化（未初始化时查询回退到物化视图）"""
+        try:
+            return bool(await redis_client.exists(RealtimeLeaderboardService.KEY_POINTS_READY))
+        except Exception:
+            return False
+
+    @staticmethod
+    async def count() -> int:
+        """上榜用户数"""
+        return await redis_client.client.zcard(RealtimeLeaderboardService.KEY_POINTS)
+
+    @staticmethod
+    async def get_rank(user_id: int) -> Optional[Tuple[int, int]]:
+        """
+        查询用户排名
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            (排名, 总积分)，未上榜返回None
+        """
+        member = RealtimeLeaderboardService._member(user_id)
+        async with redis_client.client.pipeline(transaction=False) as pipe:
+            pipe.zrank(RealtimeLeaderboardService.KEY_POINTS, member)
+            pipe.zscore(RealtimeLeaderboardService.KEY_POINTS, member)
+            rank, score = await pipe.execute()
+
+        if rank is None:
+            return None
+        return rank + 1, int(-score)
+
+    @staticmethod
+    async def get_page(offset: int, limit: int) -> List[Tuple[int, int, int]]:
+        """
+        按排名区间查询
+
+        Args:
+            offset: 起始偏移（从0开始）
+            limit: 数量
+
+        Returns:
+            [(排名, 用户ID, 总积分), ...]
+        """
+        entries = await redis_client.client.zrange(
+            RealtimeLeaderboardService.KEY_POINTS,
+            offset,
+            offset + limit - 1,
+            withscores=True
+        )
+        return [
+            (offset + i + 1, int(member), int(-score))
+            for i, (member, score) in enumerate(entries)
+        ]
+
+    @staticmethod
+    async def rebuild(db: AsyncSession) -> int:
+        """
+        从 users / user_points 全量重建排行榜
+
+        写入临时键后 RENAME 原子替换；重建期间发生的增量可能丢失，
+        应在低峰期执行或重建后再次执行
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            上榜用户数
+        """
+        tmp_key = f"{RealtimeLeaderboardService.KEY_POINTS}:rebuild"
+        client = redis_client.client
+        await client.delete(tmp_key)
+
+        result = await db.stream(text("""
+            SELECT u.id, COALESCE(u.total_points, up.available_points, 0) AS total_points
+            FROM users u
+            LEFT JOIN user_points up ON u.id = up.user_id
+            WHERE u.is_active = true AND (u.is_banned = false OR u.is_banned IS NULL);
+        """))
+
+        total = 0
+        async for rows in result.partitions(RealtimeLeaderboardService.REBUILD_BATCH_SIZE):
+            await client.zadd(tmp_key, {
+                RealtimeLeaderboardService._member(row.id): -row.total_points
+                for row in rows
+            })
+            total += len(rows)
+
+        if total:
+            await client.rename(tmp_key, RealtimeLeaderboardService.KEY_POINTS)
+        else:
+            await client.delete(RealtimeLeaderboardService.KEY_POINTS)
+        await client.set(RealtimeLeaderboardService.KEY_POINTS_READY, "1")
+
+        logger.info(f"🏆 实时排行榜重建完成: {total}个用户")
+        return total
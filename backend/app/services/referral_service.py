@@ -0,0 +1,329 @@
+"""
+推荐关系服务
+推荐链（上级链）查询、循环推荐检测、多级奖励归属与推荐闭包表维护
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, delete, literal, or_, true, tuple_, union_all, func, BigInteger, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models import User, ReferralRelation, ReferralClosure
+from app.utils.pagination import decode_cursor, next_cursor
+
+
+class ReferralService:
+    """推荐关系服务类"""
+
+    # 上级链最大递归深度（防御脏数据中的环）
+    UPLINE_MAX_DEPTH = 64
+
+    @staticmethod
+    async def get_uplines(
+        db: AsyncSession,
+        user_ids: Iterable[int],
+        max_depth: Optional[int] = None
+    ) -> Dict[int, List[ReferralRelation]]:
+        """
+        批量查询多个用户的上级链（WITH RECURSIVE 一次往返）
+
+        每个用户最多一个推荐人，上级链是一条链：
+        返回列表第 i 项是第 i+1 级推荐关系（[0] 为直接推荐关系）
+
+        Args:
+            db: 数据库会话
+            user_ids: 用户ID列表
+            max_depth: 最大层级（默认 UPLINE_MAX_DEPTH）
+
+        Returns:
+            {用户ID: 按层级排列的推荐关系列表}，无推荐人的用户为空列表
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return {}
+        max_depth = min(max_depth or ReferralService.UPLINE_MAX_DEPTH, ReferralService.UPLINE_MAX_DEPTH)
+
+        upline = (
+            select(
+                ReferralRelation.referee_id.label("origin_id"),
+                ReferralRelation.id.label("relation_id"),
+                ReferralRelation.referrer_id.label("referrer_id"),
+                literal(1).label("depth")
+            )
+            .where(
+                ReferralRelation.referee_id.in_(user_ids),
+                ReferralRelation.is_active == True
+            )
+            .cte("upline", recursive=True)
+        )
+        parent = aliased(ReferralRelation)
+        upline = upline.union_all(
+            select(
+                upline.c.origin_id,
+                parent.id,
+                parent.referrer_id,
+                upline.c.depth + 1
+            )
+            .where(
+                parent.referee_id == upline.c.referrer_id,
+                parent.is_active == True,
+                upline.c.depth < max_depth
+            )
+        )
+
+        result = await db.execute(
+            select(upline.c.origin_id, ReferralRelation)
+            .join(upline, ReferralRelation.id == upline.c.relation_id)
+            .order_by(upline.c.origin_id, upline.c.depth)
+        )
+
+        uplines: Dict[int, List[ReferralRelation]] = {user_id: [] for user_id in user_ids}
+        for origin_id, relation in result.all():
+            uplines[origin_id].append(relation)
+        return uplines
+
+    @staticmethod
+    async def get_upline(
+        db: AsyncSession,
+        user_id: int,
+        max_depth: Optional[int] = None
+    ) -> List[ReferralRelation]:
+        """
+        查询单个用户的上级链
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            max_depth: 最大层级
+
+        Returns:
+            按层级排列的推荐关系列表
+        """
+        uplines = await ReferralService.get_uplines(db, [user_id], max_depth)
+        return uplines[user_id]
+
+    @staticmethod
+    async def would_create_cycle(
+        db: AsyncSession,
+        referrer_id: int,
+        referee_id: int
+    ) -> bool:
+        """
+        检查绑定 referee → referrer 是否会形成循环推荐（被推荐人已在推荐人的上级链中）
+
+        Args:
+            db: 数据库会话
+            referrer_id: 推荐人ID
+            referee_id: 被推荐人ID
+
+        Returns:
+            是否形成循环
+        """
+        if referrer_id == referee_id:
+            return True
+        upline = await ReferralService.get_upline(db, referrer_id)
+        return any(relation.referrer_id == referee_id for relation in upline)
+
+    @staticmethod
+    def attributed_relation(
+        upline: List[ReferralRelation],
+        referrer_id: int,
+        level: int
+    ) -> Optional[ReferralRelation]:
+        """
+        找出第 level 级推荐奖励应归属的推荐关系
+
+        购买者上级链的第 level 级关系的推荐人必须是获奖的推荐人
+
+        Args:
+            upline: 购买者的上级链
+            referrer_id: 获得奖励的推荐人ID
+            level: 奖励层级（1或2）
+
+        Returns:
+            推荐关系，链上数据与数据库不一致时返回None
+        """
+        if level < 1 or len(upline) < level:
+            return None
+        relation = upline[level - 1]
+        return relation if relation.referrer_id == referrer_id else None
+
+    # ========== 推荐闭包表 ==========
+
+    @staticmethod
+    async def link_closure(
+        db: AsyncSession,
+        referrer_id: int,
+        referee_id: int
+    ) -> None:
+        """
+        新建推荐关系后维护闭包表（不提交，与推荐关系在同一事务中写入）
+
+        推荐人及其所有上级 × 被推荐人及其所有下级，一条 INSERT ... SELECT 写入
+
+        Args:
+            db: 数据库会话
+            referrer_id: 推荐人ID
+            referee_id: 被推荐人ID
+        """
+        ancestors = union_all(
+            select(
+                literal(referrer_id, BigInteger).label("ancestor_id"),
+                literal(0, Integer).label("depth")
+            ),
+            select(ReferralClosure.ancestor_id, ReferralClosure.depth)
+            .where(ReferralClosure.descendant_id == referrer_id)
+        ).subquery("ancestors")
+        descendants = union_all(
+            select(
+                literal(referee_id, BigInteger).label("descendant_id"),
+                literal(0, Integer).label("depth")
+            ),
+            select(ReferralClosure.descendant_id, ReferralClosure.depth)
+            .where(ReferralClosure.ancestor_id == referee_id)
+        ).subquery("descendants")
+
+        await db.execute(
+            pg_insert(ReferralClosure)
+            .from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(
+                    ancestors.c.ancestor_id,
+                    descendants.c.descendant_id,
+                    ancestors.c.depth + descendants.c.depth + 1
+                )
+                .select_from(ancestors)
+                .join(descendants, true())
+            )
+            .on_conflict_do_nothing()
+        )
+
+    @staticmethod
+    async def unlink_closure(
+        db: AsyncSession,
+        referrer_id: int,
+        referee_id: int
+    ) -> None:
+        """
+        删除推荐关系前维护闭包表（不提交）
+
+        删除所有经过该推荐关系的 祖先-后代 对
+
+        Args:
+            db: 数据库会话
+            referrer_id: 推荐人ID
+            referee_id: 被推荐人ID
+        """
+        upper = aliased(ReferralClosure)
+        lower = aliased(ReferralClosure)
+        await db.execute(
+            delete(ReferralClosure).where(
+                or_(
+                    ReferralClosure.ancestor_id == referrer_id,
+                    ReferralClosure.ancestor_id.in_(
+                        select(upper.ancestor_id).where(upper.descendant_id == referrer_id)
+                    )
+                ),
+                or_(
+                    ReferralClosure.descendant_id == referee_id,
+                    ReferralClosure.descendant_id.in_(
+                        select(lower.descendant_id).where(lower.ancestor_id == referee_id)
+                    )
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def get_downline_level_counts(
+        db: AsyncSession,
+        user_id: int,
+        max_depth: Optional[int] = None
+    ) -> Dict[int, int]:
+        """
+        按层级统计下级人数（闭包表索引扫描）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            max_depth: 最大层级（可选）
+
+        Returns:
+            {层级: 人数}，按层级升序
+        """
+        query = (
+            select(ReferralClosure.depth, func.count())
+            .where(ReferralClosure.ancestor_id == user_id)
+            .group_by(ReferralClosure.depth)
+            .order_by(ReferralClosure.depth)
+        )
+        if max_depth:
+            query = query.where(ReferralClosure.depth <= max_depth)
+
+        result = await db.execute(query)
+        return {depth: count for depth, count in result.all()}
+
+    @staticmethod
+    async def get_downline(
+        db: AsyncSession,
+        user_id: int,
+        max_depth: Optional[int] = None,
+        page_size: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        分页查询下级用户（按层级、用户ID排序的游标分页）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+            max_depth: 最大层级（可选）
+            page_size: 每页大小
+            cursor: 上一页返回的游标(可选)
+
+        Returns:
+            (下级用户列表, 下一页游标)
+
+        Raises:
+            ValueError: 游标格式无效
+        """
+        query = (
+            select(
+                ReferralClosure.depth,
+                User.id,
+                User.wallet_address,
+                User.username,
+                User.total_points,
+                User.total_invited,
+                User.created_at
+            )
+            .join(User, User.id == ReferralClosure.descendant_id)
+            .where(ReferralClosure.ancestor_id == user_id)
+        )
+        if max_depth:
+            query = query.where(ReferralClosure.depth <= max_depth)
+        if cursor:
+            last_depth, last_id = decode_cursor(cursor, int, int)
+            query = query.where(
+                tuple_(ReferralClosure.depth, ReferralClosure.descendant_id) > tuple_(last_depth, last_id)
+            )
+
+        result = await db.execute(
+            query
+            .order_by(ReferralClosure.depth, ReferralClosure.descendant_id)
+            .limit(page_size)
+        )
+        items = [
+            {
+                "depth": row.depth,
+                "user_id": row.id,
+                "wallet_address": row.wallet_address,
+                "username": row.username,
+                "total_points": row.total_points or 0,
+                "total_invited": row.total_invited or 0,
+                "joined_at": row.created_at
+            }
+            for row in result.all()
+        ]
+        return items, next_cursor(items, page_size, "depth", "user_id")
@@ -0,0 +1,219 @@
+"""
+用户注册服务
+在单个事务中完成用户注册及其连带写入（积分账户、注册/推荐奖励、推荐关系、任务进度）
+"""
+from typing import Optional, List
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.models import User, UserPoints, PointTransaction, PointTransactionType, ReferralRelation
+from app.services.cache_service import CacheService
+from app.services.invite_code_service import InviteCodeService
+from app.services.realtime_leaderboard_service import RealtimeLeaderboardService
+from app.services.referral_service import ReferralService
+from app.services.materialized_view_service import MaterializedViewService
+from app.services.points_service import PointsService
+from app.services.task_service import TaskService
+
+
+class RegistrationService:
+    """
+    用户注册服务类
+
+    - 读取集中在写入之前：已注册检查、推荐人一次查询
+    - 写入在同一事务内完成：新用户的行在内存中构建、一次flush写入；
+      推荐人是热点行（同一邀请码的并发注册），积分和邀请数都在数据库中原子累加
+    - 实时排行榜、物化视图脏标记、用户缓存失效推迟到提交之后
+    """
+
+    REGISTER_REWARD_POINTS = 100
+    REFERRAL_REWARD_POINTS = 100
+
+    @staticmethod
+    def _credit(
+        user: User,
+        user_points: UserPoints,
+        points: int,
+        transaction_type: PointTransactionType,
+        description: str,
+        related_user_id: Optional[int] = None
+    ) -> PointTransaction:
+        """在内存中给新用户加分并构建交易流水（与 PointsService.add_user_points 记账规则一致）"""
+        user_points.available_points = (user_points.available_points or 0) + points
+        user_points.total_earned = (user_points.total_earned or 0) + points
+        return PointTransaction(
+            user_id=user.id,
+            transaction_type=transaction_type,
+            amount=points,
+            balance_after=user_points.available_points,
+            description=description,
+            related_user_id=related_user_id,
+            extra_metadata={},
+            status="completed"
+        )
+
+    @staticmethod
+    async def register_user(
+        db: AsyncSession,
+        wallet_address: str,
+        username: Optional[str] = None,
+        avatar_url: Optional[str] = None,
+        email: Optional[str] = None,
+        invite_code: Optional[str] = None
+    ) -> User:
+        """
+        注册新用户
+
+        Args:
+            db: 数据库会话
+            wallet_address: 钱包地址
+            username: 用户名（为空时使用默认用户名）
+            avatar_url: 头像URL
+            email: 邮箱
+            invite_code: 邀请码（USER000001 或 6位随机码）
+
+        Returns:
+            新创建的User对象
+
+        Raises:
+            ValueError: 钱包地址已注册
+        """
+        normalized_address = wallet_address.lower()
+
+        # 邀请码解析为推荐人钱包地址（两种格式，进程内LRU → Redis → 数据库）
+        resolved = await InviteCodeService.resolve(db, invite_code) if invite_code else None
+        referrer_address = resolved["wallet_address"] if resolved else None
+
+        try:
+            # 1. 一次查询：钱包地址是否已注册 + 推荐人是否存在
+            #    （按钱包地址查推荐人：随机码对应的钱包可能在生成邀请码之后才注册）
+            addresses = [normalized_address]
+            if referrer_address and referrer_address != normalized_address:
+                addresses.append(referrer_address)
+            result = await db.execute(
+                select(User.id, User.wallet_address).where(User.wallet_address.in_(addresses))
+            )
+            referrer_id = None
+            for user_id, address in result.all():
+                if address == normalized_address:
+                    raise ValueError(f"钱包地址 {normalized_address} 已注册")
+                referrer_id = user_id
+
+            if invite_code and referrer_id is None:
+                logger.warning(f"⚠️ 邀请码无效: {invite_code}")
+
+            # 2. 创建用户（flush获取ID）
+            register_points = RegistrationService.REGISTER_REWARD_POINTS
+            new_user = User(
+                wallet_address=normalized_address,
+                username=username or f"User_{normalized_address[:8]}",
+                avatar_url=avatar_url,
+                email=email,
+                level=1,
+                experience=0,
+                total_points=register_points,
+                total_invited=0,
+                is_active=True
+            )
+            db.add(new_user)
+            await db.flush()
+
+            # 3. 积分账户 + 注册奖励
+            new_user_points = UserPoints(
+                user_id=new_user.id,
+                available_points=0,
+                frozen_points=0,
+                total_earned=0,
+                total_spent=0,
+                points_from_referral=0,
+                points_from_tasks=0,
+                points_from_quiz=0,
+                points_from_team=0,
+                points_from_purchase=0
+            )
+            db.add(new_user_points)
+            db.add(RegistrationService._credit(
+                new_user,
+                new_user_points,
+                register_points,
+                PointTransactionType.REGISTER_REWARD,
+                "新用户注册奖励"
+            ))
+            RealtimeLeaderboardService.stage(db, new_user, register_points)
+
+            # 待批量更新的任务进度 (user_id, task_key, delta)
+            progress_updates = [(new_user.id, "user_register", 1)]
+            invalidated_user_ids: List[int] = [new_user.id]
+
+            # 4. 推荐关系（与新用户的行一次flush写入）
+            if referrer_id is not None:
+                db.add(ReferralRelation(
+                    referrer_id=referrer_id,
+                    referee_id=new_user.id,
+                    is_active=True
+                ))
+            await db.flush()
+
+            # 5. 推荐人奖励与邀请数在数据库中原子累加（同一推荐人的并发注册互不覆盖）
+            if referrer_id is not None:
+                await PointsService._apply_points_change(
+                    db,
+                    user_id=referrer_id,
+                    points=RegistrationService.REFERRAL_REWARD_POINTS,
+                    transaction_type=PointTransactionType.REFERRAL_REWARD,
+                    description=f"推荐新用户注册奖励 (被推荐人: {normalized_address[:10]}...)",
+                    related_user_id=new_user.id,
+                    extra_metadata={}
+                )
+                await db.execute(
+                    update(User)
+                    .where(User.id == referrer_id)
+                    .values(total_invited=User.total_invited + 1)
+                )
+                await ReferralService.link_closure(db, referrer_id, new_user.id)
+
+                progress_updates.append((referrer_id, "invite_friends", 1))
+                invalidated_user_ids.append(referrer_id)
+
+            # 6. 注册任务 + 推荐人邀请任务一次批量更新（失败不影响注册）
+            try:
+                async with db.begin_nested():
+                    await TaskService.apply_progress_batch(
+                        db=db,
+                        updates=progress_updates,
+                        assign_missing=True,
+                        commit=False
+                    )
+            except Exception as e:
+                logger.warning(f"⚠️ 注册任务更新失败（不影响注册）: {e}")
+
+            await db.commit()
+
+        except IntegrityError:
+            RealtimeLeaderboardService.discard_staged(db)
+            await db.rollback()
+            # 并发注册同一地址：唯一约束冲突
+            raise ValueError(f"钱包地址 {normalized_address} 已注册")
+        except Exception:
+            RealtimeLeaderboardService.discard_staged(db)
+            await db.rollback()
+            raise
+
+        # 7. 提交后再更新实时排行榜、标记物化视图、失效缓存
+        await RealtimeLeaderboardService.apply_staged(db)
+        await MaterializedViewService.mark_dirty(MaterializedViewService.MV_POINTS_LEADERBOARD)
+        for user_id in invalidated_user_ids:
+            await CacheService.invalidate_user_all_cache(user_id)
+        # 新用户的USER码可能已被扫描请求负缓存，注册前生成的随机码缓存的是未注册结果
+        await InviteCodeService.forget_user(db, new_user.id, new_user.wallet_address)
+
+        logger.info(
+            f"✅ 新用户注册成功: "
+            f"user_id={new_user.id}, "
+            f"wallet={new_user.wallet_address}, "
+            f"referrer_id={referrer_id}"
+        )
+        return new_user
@@ -0,0 +1,231 @@
+"""
+任务配置进程内缓存
+tasks 表很小且几乎不变，每个进程持有一份不可变快照，按ID、task_key、触发类型索引；
+任务配置写入时递增Redis中的版本号，各worker发现版本变化后重新加载
+"""
+import asyncio
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from loguru import logger
+
+from app.models import Task
+from app.models.task import TaskTrigger
+from app.utils.lru_cache import LRUCache
+from app.utils.redis_client import redis_client
+
+
+# 任务配置的不可变快照（字段与 tasks 表列一致）
+TaskDefinition = namedtuple("TaskDefinition", [column.key for column in Task.__table__.columns])
+
+
+class TaskCatalogSnapshot:
+    """某一版本的任务配置快照，创建后不再修改，整体替换"""
+
+    __slots__ = ("version", "by_id", "by_key", "active_by_trigger")
+
+    def __init__(self, version: Optional[int], definitions: Tuple[TaskDefinition, ...]):
+        """
+        构建快照及索引
+
+        Args:
+            version: 加载时的Redis版本号（Redis不可用时为None）
+            definitions: 全部任务配置
+        """
+        active_by_trigger: Dict[TaskTrigger, list] = {}
+        for definition in definitions:
+            if definition.is_active:
+                active_by_trigger.setdefault(definition.trigger_type, []).append(definition)
+
+        self.version = version
+        self.by_id: Mapping[int, TaskDefinition] = MappingProxyType(
+            {definition.id: definition for definition in definitions}
+        )
+        self.by_key: Mapping[str, TaskDefinition] = MappingProxyType(
+            {definition.task_key: definition for definition in definitions}
+        )
+        # 仅包含激活任务，按优先级降序、排序值升序
+        self.active_by_trigger: Mapping[TaskTrigger, Tuple[TaskDefinition, ...]] = MappingProxyType({
+            trigger: tuple(sorted(items, key=lambda d: (-(d.priority or 0), d.sort_order or 0)))
+            for trigger, items in active_by_trigger.items()
+        })
+
+
+class TaskCatalog:
+    """
+    任务配置目录（进程内只读快照）
+
+    - 快照不可变，可在请求/会话之间安全共享
+    - 任务配置写入（create/update/delete_task）后调用 invalidate：清空本进程快照并递增Redis版本号
+    - 读取时最多每 VERSION_CHECK_INTERVAL 秒比对一次Redis版本号，其他worker的写入在该间隔内生效
+    - 按ID未命中时在锁内重新加载，每个检查间隔最多一次；仍不存在的ID负缓存到快照被替换
+    - Redis不可用时退化为本进程失效 + 按ID未命中时（限频）重新加载，不做负缓存；
+      快照最多使用 MAX_STALE_SECONDS 秒，之后从数据库重新加载（有界陈旧）
+    """
+
+    KEY_VERSION = "tasks:catalog:version"
+    VERSION_CHECK_INTERVAL = 1.0
+    MAX_STALE_SECONDS = 30.0
+    MISSING_CACHE_SIZE = 10000
+
+    _snapshot: Optional[TaskCatalogSnapshot] = None
+    _loaded_at: float = 0.0
+    _checked_at: float = 0.0
+    _miss_reloaded_at: float = 0.0
+    _reload_lock = asyncio.Lock()
+
+    # 当前快照中不存在的任务ID（快照替换时清空）
+    _missing = LRUCache(maxsize=MISSING_CACHE_SIZE, ttl=float("inf"))
+
+    @staticmethod
+    async def _remote_version() -> Optional[int]:
+        try:
+            version = await redis_client.get(TaskCatalog.KEY_VERSION)
+            return int(version) if version is not None else 0
+        except Exception:
+            return None
+
+    @staticmethod
+    async def load(db: AsyncSession) -> TaskCatalogSnapshot:
+        """
+        整表加载任务配置并替换快照
+
+        先读版本号再读数据：加载期间发生的写入会使版本号前进，下次检查时再次加载
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            新快照
+        """
+        version = await TaskCatalog._remote_version()
+        result = await db.execute(select(*Task.__table__.columns))
+        snapshot = TaskCatalogSnapshot(
+            version,
+            tuple(TaskDefinition(**row._mapping) for row in result.all())
+        )
+
+        TaskCatalog._snapshot = snapshot
+        TaskCatalog._loaded_at = TaskCatalog._checked_at = time.monotonic()
+        TaskCatalog._missing.clear()
+        logger.debug(f"📚 任务配置目录已加载: version={version}, {len(snapshot.by_id)}个任务")
+        return snapshot
+
+    @staticmethod
+    async def snapshot(db: AsyncSession) -> TaskCatalogSnapshot:
+        """
+        获取当前快照（版本变化、未加载，或Redis不可用且快照超过最大陈旧时间时重新加载）
+
+        Args:
+            db: 数据库会话
+
+        Returns:
+            任务配置快照
+        """
+        snapshot = TaskCatalog._snapshot
+        if snapshot is not None:
+            if time.monotonic() - TaskCatalog._checked_at < TaskCatalog.VERSION_CHECK_INTERVAL:
+                return snapshot
+
+            version = await TaskCatalog._remote_version()
+            TaskCatalog._checked_at = time.monotonic()
+            if version is None:
+                # Redis不可用：无法得知其他worker的写入，只在最大陈旧时间内沿用快照
+                if TaskCatalog._checked_at - TaskCatalog._loaded_at < TaskCatalog.MAX_STALE_SECONDS:
+                    return snapshot
+            elif version == snapshot.version:
+                return snapshot
+
+        async with TaskCatalog._reload_lock:
+            # 等锁期间其他协程可能已经完成加载
+            if TaskCatalog._snapshot is not None and TaskCatalog._snapshot is not snapshot:
+                return TaskCatalog._snapshot
+            return await TaskCatalog.load(db)
+
+    @staticmethod
+    async def get(db: AsyncSession, task_id: int) -> Optional[TaskDefinition]:
+        """
+        按ID获取任务配置
+
+        Args:
+            db: 数据库会话
+            task_id: 任务ID
+
+        Returns:
+            任务快照，不存在返回None
+        """
+        snapshot = await TaskCatalog.snapshot(db)
+        definition = snapshot.by_id.get(task_id)
+        if definition is not None or TaskCatalog._missing.get(task_id, False):
+            return definition
+
+        # 可能是其他进程刚创建、版本号尚未检查到的任务：
+        # 锁内重新加载，每个检查间隔最多一次（挡住不存在ID的循环请求）
+        async with TaskCatalog._reload_lock:
+            current = TaskCatalog._snapshot
+            if current is snapshot and \
+                    time.monotonic() - TaskCatalog._miss_reloaded_at >= TaskCatalog.VERSION_CHECK_INTERVAL:
+                TaskCatalog._miss_reloaded_at = time.monotonic()
+                current = await TaskCatalog.load(db)
+            snapshot = current or snapshot
+
+        definition = snapshot.by_id.get(task_id)
+        if definition is None and snapshot.version is not None:
+            # 版本号可用时，新建任务会使版本号前进并替换快照，届时负缓存随之清空
+            TaskCatalog._missing.set(task_id, True)
+        return definition
+
+    @staticmethod
+    async def get_by_key(db: AsyncSession, task_key: str) -> Optional[TaskDefinition]:
+        """
+        按 task_key 获取任务配置
+
+        Args:
+            db: 数据库会话
+            task_key: 任务唯一标识
+
+        Returns:
+            任务快照，不存在返回None
+        """
+        snapshot = await TaskCatalog.snapshot(db)
+        return snapshot.by_key.get(task_key)
+
+    @staticmethod
+    async def get_active_by_trigger(
+        db: AsyncSession,
+        trigger_type: TaskTrigger
+    ) -> Tuple[TaskDefinition, ...]:
+        """
+        获取某种触发类型的全部激活任务
+
+        Args:
+            db: 数据库会话
+            trigger_type: 触发类型
+
+        Returns:
+            任务快照元组
+        """
+        snapshot = await TaskCatalog.snapshot(db)
+        return snapshot.active_by_trigger.get(trigger_type, ())
+
+    @staticmethod
+    async def invalidate():
+        """任务配置写入后调用：清空本进程快照并通知其他worker"""
+        TaskCatalog.clear()
+        try:
+            await redis_client.incr(TaskCatalog.KEY_VERSION)
+        except Exception as e:
+            logger.warning(f"⚠️  任务配置版本号更新失败（其他进程将在按ID未命中或快照超过最大陈旧时间时重新加载）: {e}")
+
+    @staticmethod
+    def clear():
+        """清空本进程快照"""
+        TaskCatalog._snapshot = None
+        TaskCatalog._loaded_at = 0.0
+        TaskCatalog._checked_at = 0.0
+        TaskCatalog._miss_reloaded_at = 0.0
+        TaskCatalog._missing.clear()
@@ -3,16 +3,23 @@
 处理所有任务相关的业务逻辑
 """
 from typing import Optional, List, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, func, and_, or_
+from sqlalchemy import (
+    select, update, desc, func, and_, or_, tuple_, case, literal, exists, values, column,
+    BigInteger, Integer, Boolean, TIMESTAMP
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased, contains_eager, selectinload
 from loguru import logger
 
 from app.models import Task, UserTask, User, UserPoints
 from app.models.task import TaskType, TaskTrigger, UserTaskStatus
 from app.models.team_member import TeamMember, TeamMemberStatus  # ✅ 修复导入路径
 from app.services.points_service import PointsService
+from app.services.task_catalog import TaskCatalog, TaskDefinition
 from app.models.point_transaction import PointTransactionType
+from app.utils.pagination import decode_cursor
 
 
 class TaskService:
@@ -65,6 +72,7 @@ class TaskService:
             db.add(task)
             await db.commit()
             await db.refresh(task)
+            await TaskCatalog.invalidate()
 
             logger.info(f"✅ 任务创建成功: id={task.id}, key={task_key}, type={task_type.value}")
             return task
@@ -85,12 +93,9 @@ class TaskService:
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def get_task_by_key(db: AsyncSession, task_key: str) -> Optional[Task]:
-        """根据task_key获取任务配置"""
-        result = await db.execute(
-            select(Task).where(Task.task_key == task_key)
-        )
-        return result.scalar_one_or_none()
+    async def get_task_by_key(db: AsyncSession, task_key: str) -> Optional[TaskDefinition]:
+        """根据task_key获取任务配置（只读快照，来自进程内任务配置目录）"""
+        return await TaskCatalog.get_by_key(db, task_key)
 
     @staticmethod
     async def get_tasks(
@@ -177,6 +182,7 @@ class TaskService:
 
             await db.commit()
             await db.refresh(task)
+            await TaskCatalog.invalidate()
 
             logger.info(f"✅ 任务更新成功: task_id={task_id}")
             return task
@@ -212,6 +218,7 @@ class TaskService:
             task.is_visible = False
 
             await db.commit()
+            await TaskCatalog.invalidate()
 
             logger.info(f"✅ 任务删除成功: task_id={task_id}")
             return True
@@ -249,7 +256,7 @@ class TaskService:
         """
         try:
             # 1. 获取任务配置
-            task = await TaskService.get_task(db, task_id)
+            task = await TaskCatalog.get(db, task_id)
             if not task:
                 raise ValueError(f"Task {task_id} not found")
 
@@ -329,19 +336,32 @@ class TaskService:
             elif task.end_time:
                 expires_at = task.end_time
 
-            # 8. 创建用户任务
-            user_task = UserTask(
-                user_id=user_id,
-                task_id=task_id,
-                target_value=task.target_value,
-                reward_points=task.reward_points,
-                status=UserTaskStatus.IN_PROGRESS,
-                expires_at=expires_at,
-                metadata=metadata
+            # 8. 创建用户任务（并发领取由进行中唯一索引去重）
+            result = await db.execute(
+                pg_insert(UserTask)
+                .values(
+                    user_id=user_id,
+                    task_id=task_id,
+                    target_value=task.target_value,
+                    reward_points=task.reward_points,
+                    status=UserTaskStatus.IN_PROGRESS,
+                    expires_at=expires_at,
+                    task_metadata=metadata
+                )
+                .on_conflict_do_nothing(
+                    index_elements=[UserTask.user_id, UserTask.task_id],
+                    index_where=UserTask.status.in_([
+                        UserTaskStatus.IN_PROGRESS,
+                        UserTaskStatus.COMPLETED
+                    ])
+                )
+                .returning(UserTask)
             )
-            db.add(user_task)
+            user_task = result.scalar_one_or_none()
+            if user_task is None:
+                await db.rollback()
+                raise ValueError(f"User {user_id} already has this task")
             await db.commit()
-            await db.refresh(user_task)
 
             logger.info(
                 f"✅ 用户任务创建成功: user_id={user_id}, task_id={task_id}, "
@@ -426,6 +446,213 @@ class TaskService:
             logger.error(f"❌ 任务进度更新失败: {e}")
             raise
 
+    @staticmethod
+    async def apply_progress_batch(
+        db: AsyncSession,
+        updates: List[Tuple[int, str, int]],
+        assign_missing: bool = False,
+        commit: bool = True
+    ) -> List[UserTask]:
+        """
+        批量更新任务进度（事件驱动场景，多个用户一次往返）
+
+        同一 (user_id, task_key) 的增量先在内存中合并，再以一条
+        UPDATE ... FROM (VALUES ...) 更新所有进行中的任务，达到目标值的
+        任务在同一条语句中转为已完成；已过期或非进行中的任务不受影响。
+        负增量用于撤销进度（如区块重组回滚），结果不低于0，已完成的任务不回退
+
+        Args:
+            db: 数据库会话
+            updates: (user_id, task_key, delta) 列表
+            assign_missing: 用户尚未领取时是否先按领取条件批量分配（只针对正增量）
+            commit: 是否立即提交（为False时由调用方统一提交）
+
+        Returns:
+            本次新完成的用户任务列表
+        """
+        deltas = {}
+        for user_id, task_key, delta in updates:
+            deltas[(user_id, task_key)] = deltas.get((user_id, task_key), 0) + delta
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return []
+
+        try:
+            # 1. 按 task_key 解析任务配置，跳过不存在、未激活或不在有效期内的任务
+            snapshot = await TaskCatalog.snapshot(db)
+            now = datetime.now(timezone.utc)
+            tasks = {}
+            for task_key in {task_key for _, task_key in deltas}:
+                task = snapshot.by_key.get(task_key)
+                if not task or not task.is_active:
+                    continue
+                if task.start_time and now < task.start_time:
+                    continue
+                if task.end_time and now > task.end_time:
+                    continue
+                tasks[task_key] = task
+
+            rows = [
+                (user_id, tasks[task_key], delta)
+                for (user_id, task_key), delta in deltas.items()
+                if task_key in tasks
+            ]
+            if not rows:
+                return []
+
+            # 2. 批量分配缺失的任务（条件同 assign_task_to_user，冲突由进行中唯一索引去重）
+            gains = [row for row in rows if row[2] > 0]
+            if assign_missing and gains:
+                await TaskService._assign_missing_batch(db, gains, now)
+
+            # 3. 一条语句累加进度并完成达标任务
+            progress = values(
+                column("user_id", BigInteger),
+                column("task_id", BigInteger),
+                column("delta", Integer),
+                name="progress"
+            ).data([(user_id, task.id, delta) for user_id, task, delta in rows])
+
+            new_value = func.greatest(
+                func.least(UserTask.current_value + progress.c.delta, UserTask.target_value), 0
+            )
+            reached = new_value >= UserTask.target_value
+
+            result = await db.execute(
+                update(UserTask)
+                .where(
+                    UserTask.user_id == progress.c.user_id,
+                    UserTask.task_id == progress.c.task_id,
+                    UserTask.status == UserTaskStatus.IN_PROGRESS,
+                    or_(UserTask.expires_at.is_(None), UserTask.expires_at > func.now())
+                )
+                .values(
+                    current_value=new_value,
+                    status=case(
+                        (reached, literal(UserTaskStatus.COMPLETED, UserTask.status.type)),
+                        else_=UserTask.status
+                    ),
+                    completed_at=case((reached, func.now()), else_=UserTask.completed_at)
+                )
+                .returning(UserTask)
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+            updated_tasks = list(result.scalars().all())
+            completed_tasks = [
+                user_task for user_task in updated_tasks
+                if user_task.status == UserTaskStatus.COMPLETED
+            ]
+
+            if commit:
+                await db.commit()
+
+            logger.info(
+                f"✅ 批量任务进度更新: 请求={len(rows)}, 更新={len(updated_tasks)}, "
+                f"新完成={len(completed_tasks)}"
+            )
+            return completed_tasks
+
+        except Exception as e:
+            if commit:
+                await db.rollback()
+            logger.error(f"❌ 批量任务进度更新失败: {e}")
+            raise
+
+    @staticmethod
+    async def _assign_missing_batch(
+        db: AsyncSession,
+        rows: List[Tuple[int, TaskDefinition, int]],
+        now: datetime
+    ) -> None:
+        """
+        为尚未持有进行中/已完成实例的用户批量分配任务（不提交）
+
+        用户等级、完成次数上限和战队任务限制在一条 INSERT ... SELECT 中判断
+
+        Args:
+            db: 数据库会话
+            rows: (user_id, 任务配置, delta) 列表
+            now: 当前时间（用于计算过期时间）
+        """
+        assignments = []
+        for user_id, task, _ in rows:
+            expires_at = None
+            if task.task_type == TaskType.DAILY:
+                expires_at = now + timedelta(days=1)
+            elif task.task_type == TaskType.WEEKLY:
+                expires_at = now + timedelta(weeks=1)
+            elif task.end_time:
+                expires_at = task.end_time
+
+            assignments.append((
+                user_id,
+                task.id,
+                task.target_value,
+                task.reward_points,
+                task.min_level_required,
+                task.max_completions_per_user,
+                task.task_key in ['join_team', 'create_team'],
+                expires_at
+            ))
+
+        candidates = values(
+            column("user_id", BigInteger),
+            column("task_id", BigInteger),
+            column("target_value", Integer),
+            column("reward_points", Integer),
+            column("min_level", Integer),
+            column("max_completions", Integer),
+            column("team_task", Boolean),
+            column("expires_at", TIMESTAMP(timezone=True)),
+            name="candidates"
+        ).data(assignments)
+
+        previous = aliased(UserTask)
+        eligible = (
+            select(
+                candidates.c.user_id,
+                candidates.c.task_id,
+                candidates.c.target_value,
+                candidates.c.reward_points,
+                literal(UserTaskStatus.IN_PROGRESS, UserTask.status.type),
+                candidates.c.expires_at
+            )
+            .join(User, User.id == candidates.c.user_id)
+            .where(
+                User.level >= candidates.c.min_level,
+                or_(
+                    candidates.c.max_completions.is_(None),
+                    ~exists().where(
+                        previous.user_id == candidates.c.user_id,
+                        previous.task_id == candidates.c.task_id,
+                        previous.completion_count >= candidates.c.max_completions
+                    )
+                ),
+                or_(
+                    ~candidates.c.team_task,
+                    ~exists().where(
+                        TeamMember.user_id == candidates.c.user_id,
+                        TeamMember.status == TeamMemberStatus.ACTIVE
+                    )
+                )
+            )
+        )
+
+        await db.execute(
+            pg_insert(UserTask)
+            .from_select(
+                ["user_id", "task_id", "target_value", "reward_points", "status", "expires_at"],
+                eligible
+            )
+            .on_conflict_do_nothing(
+                index_elements=[UserTask.user_id, UserTask.task_id],
+                index_where=UserTask.status.in_([
+                    UserTaskStatus.IN_PROGRESS,
+                    UserTaskStatus.COMPLETED
+                ])
+            )
+        )
+
     @staticmethod
     async def claim_task_reward(
         db: AsyncSession,
@@ -464,7 +691,7 @@ class TaskService:
                 raise ValueError(f"UserTask {user_task_id} reward already claimed")
 
             # 2. 获取任务配置
-            task = await TaskService.get_task(db, user_task.task_id)
+            task = await TaskCatalog.get(db, user_task.task_id)
             if not task:
                 raise ValueError(f"Task {user_task.task_id} not found")
 
@@ -546,31 +773,53 @@ class TaskService:
         status: Optional[UserTaskStatus] = None,
         task_type: Optional[TaskType] = None,
         page: int = 1,
-        page_size: int = 20
-    ) -> Tuple[List[UserTask], int]:
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ) -> Tuple[List[UserTask], Optional[int]]:
         """
         获取用户任务列表（分页）
 
+        按 (created_at, id) 降序；传入游标时使用键集分页，忽略页码。
+        任务配置随结果一并加载（user_task.task），不需要逐条查询
+
         Returns:
-            (用户任务列表, 总数)
+            (用户任务列表, 总数)，不统计总数时总数为None
+
+        Raises:
+            ValueError: 游标无效
         """
         query = select(UserTask).where(UserTask.user_id == user_id)
 
         if status:
             query = query.where(UserTask.status == status)
 
-        # 如果需要按任务类型筛选，需要join
+        # 如果需要按任务类型筛选，需要join（顺带填充任务配置）
         if task_type:
             query = query.join(Task).where(Task.task_type == task_type)
 
         # 总数查询
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar_one()
+        total = None
+        if include_total:
+            count_query = select(func.count()).select_from(query.subquery())
+            total_result = await db.execute(count_query)
+            total = total_result.scalar_one()
 
         # 分页查询（按创建时间降序）
-        query = query.order_by(desc(UserTask.created_at))
-        query = query.offset((page - 1) * page_size).limit(page_size)
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, datetime, int)
+            query = query.where(tuple_(UserTask.created_at, UserTask.id) < tuple_(created_at, last_id))
+        else:
+            query = query.offset((page - 1) * page_size)
+
+        query = query.order_by(desc(UserTask.created_at), desc(UserTask.id))
+        query = query.limit(page_size)
+
+        # 任务配置：已JOIN时直接填充，否则一次 IN 查询批量加载
+        if task_type:
+            query = query.options(contains_eager(UserTask.task))
+        else:
+            query = query.options(selectinload(UserTask.task))
 
         result = await db.execute(query)
         user_tasks = result.scalars().all()
@@ -605,7 +854,7 @@ class TaskService:
     ) -> dict:
         """获取任务统计信息"""
         try:
-            task = await TaskService.get_task(db, task_id)
+            task = await TaskCatalog.get(db, task_id)
             if not task:
                 raise ValueError(f"Task {task_id} not found")
 
@@ -727,6 +976,10 @@ class TaskService:
         """
         为用户自动分配所有AUTO触发类型的任务
 
+        与 assign_task_to_user 的资格规则一致，但用户、已有任务、战队成员关系各只查询一次，
+        在内存中筛选出可分配的任务后以单条 INSERT ... ON CONFLICT DO NOTHING 批量写入
+        （并发分配时由 uq_user_tasks_user_task_active 去重）
+
         Args:
             db: 数据库会话
             user_id: 用户ID
@@ -735,29 +988,96 @@ class TaskService:
             自动分配的用户任务列表
         """
         try:
-            # 获取所有AUTO触发的激活任务
-            result = await db.execute(
-                select(Task).where(
-                    Task.trigger_type == TaskTrigger.AUTO,
-                    Task.is_active == True
+            # 获取所有AUTO触发的激活任务（进程内快照）
+            auto_tasks = await TaskCatalog.get_active_by_trigger(db, TaskTrigger.AUTO)
+            if not auto_tasks:
+                return []
+
+            user_result = await db.execute(select(User).where(User.id == user_id))
+            user = user_result.scalar_one_or_none()
+            if not user:
+                logger.debug(f"跳过自动分配任务: User {user_id} not found")
+                return []
+
+            # 已有任务：进行中/已完成的不重复分配，最近一条的完成次数用于可重复任务限制
+            existing_result = await db.execute(
+                select(UserTask.task_id, UserTask.status, UserTask.completion_count)
+                .where(
+                    UserTask.user_id == user_id,
+                    UserTask.task_id.in_([task.id for task in auto_tasks])
                 )
+                .order_by(desc(UserTask.created_at))
             )
-            auto_tasks = result.scalars().all()
+            held_task_ids = set()
+            latest_completion_counts = {}
+            for task_id, status, completion_count in existing_result.all():
+                if status in (UserTaskStatus.IN_PROGRESS, UserTaskStatus.COMPLETED):
+                    held_task_ids.add(task_id)
+                latest_completion_counts.setdefault(task_id, completion_count)
+
+            in_team = False
+            if any(task.task_key in ['join_team', 'create_team'] for task in auto_tasks):
+                team_member_result = await db.execute(
+                    select(TeamMember.id).where(
+                        TeamMember.user_id == user_id,
+                        TeamMember.status == TeamMemberStatus.ACTIVE
+                    ).limit(1)
+                )
+                in_team = team_member_result.scalar_one_or_none() is not None
 
-            assigned_tasks = []
+            now = datetime.now(timezone.utc)
+            rows = []
             for task in auto_tasks:
-                try:
-                    # 尝试为用户分配任务
-                    user_task = await TaskService.assign_task_to_user(
-                        db=db,
-                        user_id=user_id,
-                        task_id=task.id
-                    )
-                    assigned_tasks.append(user_task)
-                except ValueError as e:
-                    # 如果任务已存在或不满足条件，跳过
-                    logger.debug(f"跳过任务 {task.task_key}: {e}")
+                if task.id in held_task_ids:
+                    continue
+                if task.start_time and now < task.start_time:
                     continue
+                if task.end_time and now > task.end_time:
+                    continue
+                if user.level < task.min_level_required:
+                    continue
+                if (
+                    task.max_completions_per_user
+                    and latest_completion_counts.get(task.id, 0) >= task.max_completions_per_user
+                ):
+                    continue
+                if in_team and task.task_key in ['join_team', 'create_team']:
+                    continue
+
+                expires_at = None
+                if task.task_type == TaskType.DAILY:
+                    expires_at = now + timedelta(days=1)
+                elif task.task_type == TaskType.WEEKLY:
+                    expires_at = now + timedelta(weeks=1)
+                elif task.end_time:
+                    expires_at = task.end_time
+
+                rows.append({
+                    "user_id": user_id,
+                    "task_id": task.id,
+                    "target_value": task.target_value,
+                    "reward_points": task.reward_points,
+                    "status": UserTaskStatus.IN_PROGRESS,
+                    "expires_at": expires_at
+                })
+
+            if not rows:
+                return []
+
+            result = await db.execute(
+                pg_insert(UserTask)
+                .values(rows)
+                .on_conflict_do_nothing(
+                    index_elements=[UserTask.user_id, UserTask.task_id],
+                    index_where=UserTask.status.in_([
+                        UserTaskStatus.IN_PROGRESS,
+                        UserTaskStatus.COMPLETED
+                    ])
+                )
+                .returning(UserTask)
+            )
+            assigned_tasks = list(result.scalars().all())
+            await db.commit()
 
             if assigned_tasks:
                 logger.info(
@@ -767,5 +1087,6 @@ class TaskService:
             return assigned_tasks
 
         except Exception as e:
+            await db.rollback()
             logger.error(f"❌ 自动分配任务失败: {e}")
             raise
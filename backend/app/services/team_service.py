@@ -5,7 +5,8 @@
 from typing import Optional, List, Tuple
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, func, and_, or_
+from sqlalchemy import select, desc, func, and_, or_, text
+from sqlalchemy.orm import joinedload
 from loguru import logger
 
 from app.models import Team, TeamMember, TeamTask, User
@@ -13,8 +14,10 @@ from app.models.team_member import TeamMemberRole, TeamMemberStatus
 from app.models.team_task import TeamTaskStatus
 from app.services.points_service import PointsService
 from app.services.cache_service import CacheService
+from app.services.materialized_view_service import MaterializedViewService
 from app.services.task_service import TaskService
 from app.models.point_transaction import PointTransactionType
+from app.utils.pagination import estimate_row_count
 
 
 class TeamService:
@@ -93,6 +96,7 @@ class TeamService:
             db.add(captain_member)
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
             await db.refresh(team)
 
             logger.info(f"✅ 战队创建成功: id={team.id}, name={name}, captain_id={captain_id}")
@@ -124,7 +128,7 @@ class TeamService:
         page_size: int = 20
     ) -> Tuple[List[Team], int]:
         """
-        分页获取战队列表
+        分页获取战队列表（队长信息随战队一次JOIN加载）
 
         Returns:
             (战队列表, 总数)
@@ -140,7 +144,8 @@ class TeamService:
         total = total_result.scalar_one()
 
         # 分页查询
-        query = query.order_by(desc(Team.total_points))
+        query = query.options(joinedload(Team.captain))
+        query = query.order_by(desc(Team.total_points), Team.id)
         query = query.offset((page - 1) * page_size).limit(page_size)
 
         result = await db.execute(query)
@@ -148,6 +153,30 @@ class TeamService:
 
         return list(teams), total
 
+    @staticmethod
+    async def get_user_team(db: AsyncSession, user_id: int) -> Optional[Team]:
+        """
+        获取用户当前所在的战队（成员关系、战队、队长单次查询）
+
+        Args:
+            db: 数据库会话
+            user_id: 用户ID
+
+        Returns:
+            战队（已加载队长），未加入战队返回None
+        """
+        result = await db.execute(
+            select(Team)
+            .join(TeamMember, TeamMember.team_id == Team.id)
+            .where(
+                TeamMember.user_id == user_id,
+                TeamMember.status == TeamMemberStatus.ACTIVE,
+                Team.disbanded_at.is_(None)
+            )
+            .options(joinedload(Team.captain))
+        )
+        return result.scalars().first()
+
     @staticmethod
     async def update_team(
         db: AsyncSession,
@@ -181,6 +210,7 @@ class TeamService:
                     setattr(team, key, value)
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
             await db.refresh(team)
 
             logger.info(f"✅ 战队更新成功: team_id={team_id}")
@@ -218,6 +248,7 @@ class TeamService:
             team.disbanded_at = datetime.utcnow()
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
 
             logger.info(f"✅ 战队解散成功: team_id={team_id}")
             return True
@@ -286,6 +317,7 @@ class TeamService:
                 team.member_count += 1
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
             await db.refresh(member)
 
             # 6. 如果是直接加入（不需要审批），完成"加入战队"任务并发放积分
@@ -381,6 +413,7 @@ class TeamService:
                 member.status = TeamMemberStatus.REJECTED
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
             await db.refresh(member)
 
             # 4. 如果审批通过，完成"加入战队"任务并发放积分
@@ -504,6 +537,7 @@ class TeamService:
                 )
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
             await db.refresh(target_member)
 
             return target_member
@@ -555,6 +589,7 @@ class TeamService:
                 team.member_count -= 1
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
 
             logger.info(f"✅ 用户离开战队: user_id={user_id}, team_id={team_id}")
             return True
@@ -673,6 +708,7 @@ class TeamService:
             team.reward_pool += amount
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
 
             logger.info(
                 f"💰 战队奖励池注入: team_id={team_id}, "
@@ -830,6 +866,7 @@ class TeamService:
             team.last_distribution_at = datetime.utcnow()
 
             await db.commit()
+            await MaterializedViewService.mark_dirty(MaterializedViewService.MV_TEAMS_LEADERBOARD)
 
             # 7. 使战队相关缓存失效
             await CacheService.invalidate_leaderboard_cache("teams")
@@ -864,52 +901,94 @@ class TeamService:
     async def get_team_leaderboard(
         db: AsyncSession,
         page: int = 1,
-        page_size: int = 50
+        page_size: int = 50,
+        use_cache: bool = True
     ) -> Tuple[List[dict], int]:
         """
         获取战队排行榜
 
+        优先读取 mv_teams_leaderboard（队长信息已在视图中JOIN好，按 rank 索引范围分页），
+        结果按页缓存并在视图刷新时失效；视图不存在时回退到 teams JOIN users 的实时查询
+
         Returns:
             (排行榜数据, 总数)
         """
         try:
-            # 基础查询：未解散的战队
+            cache_type = f"teams:{page_size}"
+
+            if use_cache:
+                cached_data = await CacheService.get_leaderboard_cache(cache_type, page)
+                if cached_data:
+                    return cached_data["data"], cached_data["total"]
+
+            if await MaterializedViewService.view_exists(db, MaterializedViewService.MV_TEAMS_LEADERBOARD):
+                total = await estimate_row_count(db, MaterializedViewService.MV_TEAMS_LEADERBOARD)
+                if total is None:
+                    total_result = await db.execute(text("SELECT COUNT(*) FROM mv_teams_leaderboard;"))
+                    total = total_result.scalar_one()
+
+                result = await db.execute(
+                    text("""
+                        SELECT rank, team_id, team_name, logo_url, total_points,
+                               member_count, level, captain_username
+                        FROM mv_teams_leaderboard
+                        WHERE rank > :after_rank
+                        ORDER BY rank ASC
+                        LIMIT :limit;
+                    """),
+                    {"after_rank": (page - 1) * page_size, "limit": page_size}
+                )
+                leaderboard = [
+                    {
+                        "rank": row.rank,
+                        "team_id": row.team_id,
+                        "team_name": row.team_name,
+                        "team_logo_url": row.logo_url,
+                        "total_points": row.total_points,
+                        "member_count": row.member_count,
+                        "level": row.level,
+                        "captain_name": row.captain_username
+                    }
+                    for row in result.fetchall()
+                ]
+
+                # 只缓存视图数据：视图刷新时缓存随之失效，两者保持一致
+                if use_cache:
+                    await CacheService.set_leaderboard_cache(
+                        cache_type, page, {"data": leaderboard, "total": total}
+                    )
+
+                return leaderboard, total
+
+            # 回退：实时查询，队长信息一次JOIN
             query = select(Team).where(Team.disbanded_at.is_(None))
 
-            # 总数
             count_query = select(func.count()).select_from(query.subquery())
             total_result = await db.execute(count_query)
             total = total_result.scalar_one()
 
-            # 排序：总积分降序
-            query = query.order_by(desc(Team.total_points))
-            query = query.offset((page - 1) * page_size).limit(page_size)
-
-            result = await db.execute(query)
-            teams = result.scalars().all()
-
-            # 构建排行榜数据
-            leaderboard = []
-            rank = (page - 1) * page_size + 1
-
-            for team in teams:
-                # 查询队长信息
-                captain_result = await db.execute(
-                    select(User).where(User.id == team.captain_id)
-                )
-                captain = captain_result.scalar_one_or_none()
+            result = await db.execute(
+                select(Team, User.username)
+                .outerjoin(User, User.id == Team.captain_id)
+                .where(Team.disbanded_at.is_(None))
+                .order_by(desc(Team.total_points), Team.id)
+                .offset((page - 1) * page_size)
+                .limit(page_size)
+            )
 
-                leaderboard.append({
-                    "rank": rank,
+            leaderboard = [
+                {
+                    "rank": (page - 1) * page_size + index + 1,
                     "team_id": team.id,
                     "team_name": team.name,
                     "team_logo_url": team.logo_url,
                     "total_points": team.total_points,
                     "member_count": team.member_count,
                     "level": team.level,
-                    "captain_name": captain.username if captain else None
-                })
-                rank += 1
+                    "captain_name": captain_name
+                }
+                for index, (team, captain_name) in enumerate(result.all())
+            ]
 
             return leaderboard, total
 
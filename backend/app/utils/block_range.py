@@ -0,0 +1,100 @@
+"""
+自适应区块范围工具
+根据RPC节点的响应动态调整 eth_getLogs 的区块跨度
+"""
+
+from loguru import logger
+
+
+class AdaptiveBlockRange:
+    """
+    自适应区块跨度
+
+    RPC节点拒绝请求（结果过多/跨度过大/超时）时跨度减半，
+    请求成功后按增长因子逐步放大，直到上限
+    """
+
+    # RPC节点在范围过大时返回的典型错误信息片段
+    RANGE_ERROR_MARKERS = (
+        "too many results",
+        "query returned more than",
+        "limit exceeded",
+        "block range",
+        "range too large",
+        "exceed maximum",
+        "response size",
+        "-32005",
+    )
+
+    def __init__(
+        self,
+        initial_size: int = 2000,
+        min_size: int = 1,
+        max_size: int = 5000,
+        growth_factor: float = 1.5
+    ):
+        """
+        初始化自适应区块跨度
+
+        Args:
+            initial_size: 初始区块跨度
+            min_size: 最小区块跨度（到达后不再缩小，直接抛出异常）
+            max_size: 最大区块跨度
+            growth_factor: 成功后的增长因子
+        """
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.growth_factor = growth_factor
+        self.size = min(max(initial_size, self.min_size), self.max_size)
+
+    def chunk_end(self, from_block: int, to_block: int) -> int:
+        """
+        计算本次请求的结束区块
+
+        Args:
+            from_block: 起始区块
+            to_block: 目标结束区块
+
+        Returns:
+            本次请求的结束区块（不超过to_block）
+        """
+        return min(from_block + self.size - 1, to_block)
+
+    def shrink(self) -> bool:
+        """
+        跨度减半
+
+        Returns:
+            是否成功缩小（已到最小跨度返回False）
+        """
+        if self.size <= self.min_size:
+            return False
+
+        self.size = max(self.min_size, self.size // 2)
+        logger.debug(f"🔽 区块跨度缩小: {self.size}")
+        return True
+
+    def grow(self):
+        """请求成功后放大跨度"""
+        if self.size >= self.max_size:
+            return
+
+        self.size = min(self.max_size, max(self.size + 1, int(self.size * self.growth_factor)))
+        logger.debug(f"🔼 区块跨度放大: {self.size}")
+
+    @classmethod
+    def is_range_error(cls, exc: Exception) -> bool:
+        """
+        判断异常是否由区块范围过大导致
+
+        Args:
+            exc: RPC调用抛出的异常
+
+        Returns:
+            是否应缩小区块跨度后重试
+        """
+        if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+            return True
+
+        message = str(exc).lower()
+        return any(marker in message for marker in cls.RANGE_ERROR_MARKERS)
@@ -0,0 +1,101 @@
+"""
+进程内LRU缓存
+容量有限、条目带过期时间的字典，用于在Redis之前挡住热点查询
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    带TTL的LRU缓存（非线程安全，供单个事件循环使用）
+
+    - 超过容量时淘汰最久未使用的条目
+    - 每个条目可单独指定TTL（例如负缓存使用更短的TTL）
+    """
+
+    # 未命中哨兵（缓存值本身可以是None，用于负缓存）
+    MISSING = object()
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        """
+        初始化LRU缓存
+
+        Args:
+            maxsize: 最大条目数
+            ttl: 默认过期时间（秒）
+        """
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        读取条目（命中时移到最近使用端）
+
+        Args:
+            key: 键
+            default: 未命中或已过期时的返回值
+
+        Returns:
+            缓存值
+        """
+        entry = self._entries.get(key, self.MISSING)
+        if entry is self.MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        写入条目
+
+        Args:
+            key: 键
+            value: 值（None 表示负缓存）
+            ttl: 过期时间（秒），默认使用初始化时的TTL
+        """
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        """删除条目"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+
+        Returns:
+            条目数、容量、命中/未命中次数
+        """
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,96 @@
+"""
+游标分页工具
+将排序键编码为不透明游标，配合 (排序列, id) 上的索引实现键集（seek）分页
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    将最后一条记录的排序键编码为游标
+
+    Args:
+        values: 排序键的值（datetime 按 ISO 格式编码）
+
+    Returns:
+        URL安全的游标字符串
+    """
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """
+    解码游标
+
+    Args:
+        cursor: encode_cursor 生成的游标
+        types: 每个排序键的类型（datetime/int/str）
+
+    Returns:
+        排序键元组
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError(cursor)
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        )
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise ValueError("无效的分页游标") from e
+
+
+def next_cursor(items: Sequence[Any], page_size: int, *keys: str) -> Optional[str]:
+    """
+    根据本页最后一条记录生成下一页游标
+
+    Args:
+        items: 本页记录（ORM对象或字典）
+        page_size: 每页大小
+        keys: 排序键的属性名
+
+    Returns:
+        下一页游标，本页不满时返回None（已到末页）
+    """
+    if not items or len(items) < page_size:
+        return None
+
+    last = items[-1]
+    if isinstance(last, dict):
+        return encode_cursor(*(last[key] for key in keys))
+    return encode_cursor(*(getattr(last, key) for key in keys))
+
+
+async def estimate_row_count(db: AsyncSession, relation: str) -> Optional[int]:
+    """
+    从 pg_class.reltuples 读取表/物化视图的估算行数（由 ANALYZE/autovacuum 维护）
+
+    Args:
+        db: 数据库会话
+        relation: 表或物化视图名称
+
+    Returns:
+        估算行数，从未统计过时返回None
+    """
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:relation);"),
+        {"relation": relation}
+    )
+    estimate = result.scalar_one_or_none()
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
@@ -0,0 +1,259 @@
+"""
+多RPC节点池
+按滚动延迟和错误率为每个节点打分，请求路由到最健康的节点；
+幂等只读请求可在超过延迟阈值后向备用节点发送对冲请求
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import ClientSession, ClientTimeout
+from loguru import logger
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+
+
+class RpcEndpoint:
+    """单个RPC节点的滚动健康统计"""
+
+    # 错误率折算的延迟惩罚（秒）：100%错误率相当于多5秒延迟，错误节点即使很快也会排在后面
+    ERROR_PENALTY = 5.0
+
+    def __init__(self, url: str, window_size: int = 100):
+        """
+        初始化节点统计
+
+        Args:
+            url: 节点URL
+            window_size: 滚动窗口大小（最近N次请求）
+        """
+        self.url = url
+        self.latencies: deque = deque(maxlen=window_size)
+        self.outcomes: deque = deque(maxlen=window_size)
+
+    def record_success(self, latency: float):
+        """记录一次成功请求及其耗时（秒）"""
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+
+    def record_failure(self):
+        """记录一次失败请求"""
+        self.outcomes.append(False)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        计算滚动窗口内的延迟分位数
+
+        Args:
+            q: 分位（0-1）
+
+        Returns:
+            延迟秒数，无样本时返回None
+        """
+        if not self.latencies:
+            return None
+        samples = sorted(self.latencies)
+        return samples[round(q * (len(samples) - 1))]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(0.5)
+
+    @property
+    def p99(self) -> Optional[float]:
+        return self.percentile(0.99)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def score(self) -> float:
+        """健康分（越小越健康），没有样本的节点得0分以便尽快被探测"""
+        return (self.p50 or 0.0) + self.error_rate * self.ERROR_PENALTY
+
+    def stats(self) -> Dict[str, Any]:
+        """节点统计快照"""
+        return {
+            "url": self.url,
+            "requests": len(self.outcomes),
+            "p50_ms": round(self.p50 * 1000, 1) if self.p50 is not None else None,
+            "p99_ms": round(self.p99 * 1000, 1) if self.p99 is not None else None,
+            "error_rate": round(self.error_rate, 4)
+        }
+
+
+class PooledAsyncHTTPProvider(AsyncJSONBaseProvider):
+    """
+    多节点异步HTTP Provider
+
+    - 每次请求按健康分选择节点，传输层失败时依次切换到下一个节点
+    - HEDGEABLE_METHODS 中的请求在 hedge_after 秒内未返回时，
+      向次优节点发送相同请求，取先成功的结果
+    """
+
+    # 可以安全重复发送的幂等只读方法
+    HEDGEABLE_METHODS = frozenset({
+        "eth_blockNumber",
+        "eth_getLogs",
+        "eth_getBlockByNumber",
+        "eth_getTransactionReceipt",
+        "eth_call",
+        "eth_chainId",
+    })
+
+    def __init__(
+        self,
+        endpoint_uris: List[str],
+        session: ClientSession,
+        request_timeout: float = 10.0,
+        hedge_after: Optional[float] = None,
+        window_size: int = 100
+    ):
+        """
+        初始化多节点Provider
+
+        Args:
+            endpoint_uris: RPC节点URL列表（顺序即健康分相同时的优先级）
+            session: 共享的aiohttp会话（连接池）
+            request_timeout: 单次HTTP请求超时（秒）
+            hedge_after: 对冲请求延迟阈值（秒），None表示不对冲
+            window_size: 每个节点的滚动统计窗口
+        """
+        super().__init__()
+        if not endpoint_uris:
+            raise ValueError("至少需要一个RPC节点")
+
+        self.endpoints = [RpcEndpoint(uri, window_size) for uri in endpoint_uris]
+        self.session = session
+        self.timeout = ClientTimeout(total=request_timeout)
+        self.hedge_after = hedge_after
+        self.hedged_requests = 0
+
+    def __str__(self) -> str:
+        return f"PooledAsyncHTTPProvider({[e.url for e in self.endpoints]})"
+
+    def ranked_endpoints(self) -> List[RpcEndpoint]:
+        """按健康分排序的节点列表（排序稳定，分数相同时保持配置顺序）"""
+        return sorted(self.endpoints, key=lambda endpoint: endpoint.score)
+
+    def endpoint_stats(self) -> List[Dict[str, Any]]:
+        """所有节点的统计快照"""
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = await self._send(request_data, hedgeable=method in self.HEDGEABLE_METHODS)
+        return self.decode_rpc_response(raw_response)
+
+    async def make_batch_request(self, requests: List[Tuple[str, Any]]) -> List[RPCResponse]:
+        """
+        单次HTTP请求发送JSON-RPC批量调用
+
+        Args:
+            requests: (method, params) 列表
+
+        Returns:
+            与请求顺序一致的响应列表
+        """
+        encoded = [self.encode_rpc_request(method, params) for method, params in requests]
+        request_ids = [json.loads(item)["id"] for item in encoded]
+
+        raw_response = await self._send(
+            b"[" + b",".join(encoded) + b"]",
+            hedgeable=all(method in self.HEDGEABLE_METHODS for method, _ in requests)
+        )
+
+        responses = json.loads(raw_response)
+        if not isinstance(responses, list):
+            # 节点不支持批量请求时返回单个错误对象
+            raise ValueError(f"RPC节点拒绝批量请求: {responses.get('error', responses)}")
+
+        responses_by_id = {response.get("id"): response for response in responses}
+        missing = [request_id for request_id in request_ids if request_id not in responses_by_id]
+        if missing:
+            raise ValueError(f"批量请求缺少响应: ids={missing}")
+
+        return [responses_by_id[request_id] for request_id in request_ids]
+
+    async def _send(self, request_data: bytes, hedgeable: bool) -> bytes:
+        """按健康分路由请求，幂等请求在启用时走对冲"""
+        ranked = self.ranked_endpoints()
+
+        if self.hedge_after is not None and hedgeable and len(ranked) > 1:
+            return await self._hedged_post(ranked, request_data)
+        return await self._failover_post(ranked, request_data)
+
+    async def _post(self, endpoint: RpcEndpoint, request_data: bytes) -> bytes:
+        """向单个节点发送请求并记录延迟/错误"""
+        start = time.perf_counter()
+        try:
+            async with self.session.post(
+                endpoint.url,
+                data=request_data,
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout
+            ) as response:
+                response.raise_for_status()
+                raw_response = await response.read()
+        except Exception:
+            endpoint.record_failure()
+            raise
+
+        endpoint.record_success(time.perf_counter() - start)
+        return raw_response
+
+    async def _failover_post(self, endpoints: List[RpcEndpoint], request_data: bytes) -> bytes:
+        """按顺序尝试节点，直到有一个成功"""
+        last_error: Optional[Exception] = None
+        for endpoint in endpoints:
+            try:
+                return await self._post(endpoint, request_data)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"⚠️  RPC节点请求失败，切换节点: {endpoint.url}: {e}")
+
+        raise last_error
+
+    async def _hedged_post(self, ranked: List[RpcEndpoint], request_data: bytes) -> bytes:
+        """
+        对冲请求：主节点超过阈值未返回时并发请求次优节点
+
+        先成功的结果胜出，另一个请求被取消；两者都失败时继续切换剩余节点
+        """
+        primary, backup = ranked[0], ranked[1]
+        tasks = {asyncio.create_task(self._post(primary, request_data))}
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                self.hedged_requests += 1
+                logger.debug(f"🔀 RPC对冲请求: {primary.url} 超过 {self.hedge_after}秒，追加 {backup.url}")
+                tasks.add(asyncio.create_task(self._post(backup, request_data)))
+
+            pending = tasks
+            last_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        # 主节点在阈值内失败时还没有请求过次优节点
+        tried = 2 if len(tasks) > 1 else 1
+        remaining = ranked[tried:]
+        if not remaining:
+            raise last_error
+
+        logger.warning(f"⚠️  RPC对冲请求均失败，切换剩余节点: {last_error}")
+        return await self._failover_post(remaining, request_data)
@@ -3,60 +3,128 @@ Web3客户端工具类
 提供区块链连接、合约交互等功能
 """
 
+import asyncio
 import json
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Any, Awaitable, Dict, Optional, List, Tuple, TypeVar, Union
 
-from web3 import Web3
-from web3.contract import Contract
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from web3 import AsyncWeb3, Web3
+from web3.contract import AsyncContract
+from eth_utils import event_abi_to_log_topic
 from loguru import logger
 
-# Web3.py v6兼容性：POA中间件导入
+from app.utils.rpc_pool import PooledAsyncHTTPProvider
+
+# Web3.py v6兼容性：异步POA中间件导入
 try:
-    from web3.middleware import geth_poa_middleware
+    from web3.middleware import async_geth_poa_middleware
 except ImportError:
-    # 兼容旧版本
-    from web3.middleware import ExtraDataToPOAMiddleware as geth_poa_middleware
+    # 兼容新版本
+    from web3.middleware import ExtraDataToPOAMiddleware as async_geth_poa_middleware
+
+T = TypeVar("T")
+
+
+def parse_rpc_urls(rpc_urls: Union[str, List[str]]) -> List[str]:
+    """
+    规范化RPC节点列表
+
+    Args:
+        rpc_urls: 单个URL、逗号分隔的URL字符串或URL列表
+
+    Returns:
+        去重后的URL列表（保持顺序）
+    """
+    if isinstance(rpc_urls, str):
+        rpc_urls = rpc_urls.split(",")
+    return list(dict.fromkeys(url.strip() for url in rpc_urls if url and url.strip()))
+
+
+async def create_async_web3(
+    rpc_urls: Union[str, List[str]],
+    pool_size: int = 20,
+    request_timeout: float = 10.0,
+    keepalive_timeout: float = 30.0,
+    hedge_after: Optional[float] = None
+) -> Tuple[AsyncWeb3, ClientSession]:
+    """
+    创建带连接池的AsyncWeb3实例
+
+    aiohttp会话复用TCP/TLS连接（keep-alive），所有节点共享同一个连接池；
+    多个节点时按健康度路由，见 PooledAsyncHTTPProvider
+
+    Args:
+        rpc_urls: 区块链RPC节点URL（单个、逗号分隔或列表）
+        pool_size: 连接池最大连接数
+        request_timeout: 单次HTTP请求超时（秒）
+        keepalive_timeout: 空闲连接保活时间（秒）
+        hedge_after: 幂等读请求的对冲延迟阈值（秒），None表示不对冲
+
+    Returns:
+        (AsyncWeb3实例, aiohttp会话)，会话需由调用方在关闭时释放
+    """
+    session = ClientSession(
+        connector=TCPConnector(limit=pool_size, keepalive_timeout=keepalive_timeout),
+        timeout=ClientTimeout(total=request_timeout)
+    )
+
+    provider = PooledAsyncHTTPProvider(
+        parse_rpc_urls(rpc_urls),
+        session=session,
+        request_timeout=request_timeout,
+        hedge_after=hedge_after
+    )
+
+    w3 = AsyncWeb3(provider)
+    # 添加PoA中间件（BSC需要）
+    w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+
+    return w3, session
 
 
 class Web3Client:
-    """Web3客户端单例类"""
+    """Web3客户端单例类（AsyncWeb3，使用前需 await connect()）"""
 
     _instance: Optional['Web3Client'] = None
 
     def __init__(
         self,
-        rpc_url: str,
+        rpc_url: Union[str, List[str]],
         chain_id: int,
         contract_address: str,
-        contract_abi_path: Optional[str] = None
+        contract_abi_path: Optional[str] = None,
+        pool_size: int = 20,
+        request_timeout: float = 10.0,
+        logs_timeout: float = 30.0,
+        hedge_after: Optional[float] = None
     ):
         """
         初始化Web3客户端
 
         Args:
-            rpc_url: 区块链RPC节点URL
+            rpc_url: 区块链RPC节点URL（多个节点时传列表或逗号分隔）
             chain_id: 链ID (97=BSC测试网, 56=BSC主网)
             contract_address: RWAReferral合约地址
             contract_abi_path: 合约ABI文件路径（可选）
+            pool_size: HTTP连接池最大连接数
+            request_timeout: 普通RPC调用超时（秒）
+            logs_timeout: eth_getLogs调用超时（秒）
+            hedge_after: 幂等读请求的对冲延迟阈值（秒），None表示不对冲
         """
-        self.rpc_url = rpc_url
+        self.rpc_urls = parse_rpc_urls(rpc_url)
+        self.rpc_url = ", ".join(self.rpc_urls)
         self.chain_id = chain_id
         self.contract_address = Web3.to_checksum_address(contract_address)
+        self.pool_size = pool_size
+        self.request_timeout = request_timeout
+        self.logs_timeout = logs_timeout
+        self.hedge_after = hedge_after
 
-        # 初始化Web3实例
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
-
-        # 添加PoA中间件（BSC需要）
-        self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
-        # 验证连接
-        if not self.w3.is_connected():
-            raise ConnectionError(f"无法连接到区块链节点: {rpc_url}")
-
-        logger.info(f"✅ 成功连接到区块链节点: {rpc_url}")
-        logger.info(f"📊 链ID: {chain_id}, 当前区块: {self.w3.eth.block_number}")
+        self.w3: Optional[AsyncWeb3] = None
+        self.contract: Optional[AsyncContract] = None
+        self._session: Optional[ClientSession] = None
 
         # 加载合约ABI
         if contract_abi_path is None:
@@ -65,14 +133,62 @@ class Web3Client:
         with open(contract_abi_path, 'r') as f:
             self.contract_abi = json.load(f)
 
+    async def connect(self):
+        """建立连接池并验证节点连接"""
+        if self.w3 is not None:
+            return
+
+        # getLogs可能比普通调用慢得多，HTTP层超时取两者较大值
+        self.w3, self._session = await create_async_web3(
+            self.rpc_urls,
+            pool_size=self.pool_size,
+            request_timeout=max(self.request_timeout, self.logs_timeout),
+            hedge_after=self.hedge_after
+        )
+
+        # 验证连接
+        if not await self.is_connected():
+            await self.close()
+            raise ConnectionError(f"无法连接到区块链节点: {self.rpc_url}")
+
+        logger.info(f"✅ 成功连接到区块链节点: {self.rpc_url}")
+        logger.info(f"📊 链ID: {self.chain_id}, 当前区块: {await self.get_latest_block()}")
+
         # 创建合约实例
-        self.contract: Contract = self.w3.eth.contract(
+        self.contract = self.w3.eth.contract(
             address=self.contract_address,
             abi=self.contract_abi
         )
 
         logger.info(f"📝 RWAReferral合约地址: {self.contract_address}")
 
+    async def close(self):
+        """关闭连接池"""
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self.w3 = None
+        self.contract = None
+
+    def get_rpc_stats(self) -> List[Dict[str, Any]]:
+        """各RPC节点的滚动延迟(p50/p99)和错误率"""
+        if self.w3 is None:
+            return []
+        return self.w3.provider.endpoint_stats()
+
+    async def _call(self, awaitable: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """
+        带超时执行RPC调用
+
+        Args:
+            awaitable: RPC调用协程
+            timeout: 超时秒数（默认request_timeout）
+
+        Returns:
+            RPC调用结果
+        """
+        return await asyncio.wait_for(awaitable, timeout or self.request_timeout)
+
     @classmethod
     def get_instance(
         cls,
@@ -106,15 +222,20 @@ class Web3Client:
 
         return cls._instance
 
-    def get_latest_block(self) -> int:
+    async def get_latest_block(self) -> int:
         """获取最新区块号"""
-        return self.w3.eth.block_number
+        return await self._call(self.w3.eth.block_number)
+
+    async def get_block_hash(self, block_number: int) -> str:
+        """获取指定区块的哈希"""
+        block = await self._call(self.w3.eth.get_block(block_number))
+        return block['hash'].hex()
 
-    def get_transaction_receipt(self, tx_hash: str):
+    async def get_transaction_receipt(self, tx_hash: str):
         """获取交易回执"""
-        return self.w3.eth.get_transaction_receipt(tx_hash)
+        return await self._call(self.w3.eth.get_transaction_receipt(tx_hash))
 
-    def get_logs(
+    async def get_logs(
         self,
         event_name: str,
         from_block: int,
@@ -133,13 +254,61 @@ class Web3Client:
         """
         event = getattr(self.contract.events, event_name)
 
-        logs = event.get_logs(
-            fromBlock=from_block,
-            toBlock=to_block
+        logs = await self._call(
+            event.get_logs(fromBlock=from_block, toBlock=to_block),
+            timeout=self.logs_timeout
         )
 
         return logs
 
+    async def get_logs_batch(
+        self,
+        event_names: List[str],
+        from_block: int,
+        to_block: int | str = 'latest'
+    ) -> list:
+        """
+        单次 eth_getLogs 获取多个事件的日志
+
+        通过 topic0 的 OR 过滤一次性拉取所有指定事件，
+        解码后按 (blockNumber, logIndex) 排序返回
+
+        Args:
+            event_names: 事件名称列表 (如 ["RewardCalculated", "UserPurchased"])
+            from_block: 起始区块
+            to_block: 结束区块 (默认'latest')
+
+        Returns:
+            已解码并按链上顺序排列的事件日志列表
+        """
+        events_by_topic = {}
+        for abi in self.contract_abi:
+            if abi.get('type') == 'event' and abi.get('name') in event_names:
+                topic = Web3.to_hex(event_abi_to_log_topic(abi))
+                events_by_topic[topic] = getattr(self.contract.events, abi['name'])()
+
+        raw_logs = await self._call(
+            self.w3.eth.get_logs({
+                'address': self.contract_address,
+                'fromBlock': from_block,
+                'toBlock': to_block,
+                'topics': [list(events_by_topic.keys())]
+            }),
+            timeout=self.logs_timeout
+        )
+
+        logs = []
+        for raw_log in raw_logs:
+            if not raw_log['topics']:
+                continue
+            event = events_by_topic.get(Web3.to_hex(raw_log['topics'][0]))
+            if event is None:
+                continue
+            logs.append(event.process_log(raw_log))
+
+        logs.sort(key=lambda log: (log.blockNumber, log.logIndex))
+        return logs
+
     def decode_event(self, log):
         """
         解码事件日志
@@ -159,9 +328,14 @@ class Web3Client:
             'args': dict(log.args)
         }
 
-    def is_connected(self) -> bool:
+    async def is_connected(self) -> bool:
         """检查连接状态"""
-        return self.w3.is_connected()
+        if self.w3 is None:
+            return False
+        try:
+            return await self._call(self.w3.is_connected())
+        except asyncio.TimeoutError:
+            return False
 
     def get_contract_function(self, function_name: str):
         """
@@ -2,8 +2,14 @@
 """
 链上事件监听服务启动脚本
 监听RWAReferral合约事件并同步到数据库
+
+用法:
+    python run_event_listener.py                     # 持续监听
+    python run_event_listener.py --backfill \
+        --from-block 1000000 --to-block 1200000 --workers 8   # 并行回填历史区块
 """
 
+import argparse
 import asyncio
 import os
 import sys
@@ -16,10 +22,21 @@ from dotenv import load_dotenv
 from loguru import logger
 
 from app.utils.web3_client import Web3Client
+from app.utils.redis_client import redis_client
 from app.services.event_listener import initialize_event_listener
 
 
-async def main():
+def parse_args() -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="RWA推荐系统 - 链上事件监听服务")
+    parser.add_argument("--backfill", action="store_true", help="回填历史区块后退出")
+    parser.add_argument("--from-block", type=int, help="回填起始区块")
+    parser.add_argument("--to-block", type=int, help="回填结束区块（默认最新区块）")
+    parser.add_argument("--workers", type=int, default=4, help="回填并发worker数量")
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace):
     """主函数"""
     # 加载环境变量
     env_path = Path(__file__).parent.parent / ".env"
@@ -57,11 +74,26 @@ async def main():
     try:
         # 初始化Web3客户端
         logger.info("🔧 初始化Web3客户端...")
+
+        # RPC URL可逗号分隔配置多个节点；对冲阈值（毫秒）为0时不对冲
+        hedge_after_ms = int(os.getenv("WEB3_HEDGE_AFTER_MS", "0"))
+        hedge_after = hedge_after_ms / 1000 if hedge_after_ms > 0 else None
         web3_client = Web3Client(
             rpc_url=rpc_url,
             chain_id=chain_id,
-            contract_address=contract_address
+            contract_address=contract_address,
+            pool_size=int(os.getenv("WEB3_POOL_SIZE", "20")),
+            request_timeout=float(os.getenv("WEB3_REQUEST_TIMEOUT", "10")),
+            logs_timeout=float(os.getenv("WEB3_LOGS_TIMEOUT", "30")),
+            hedge_after=hedge_after
         )
+        await web3_client.connect()
+
+        # Redis用于在链上事件到达时使API侧的链上读取缓存失效
+        try:
+            await redis_client.connect()
+        except Exception as e:
+            logger.warning(f"⚠️  Redis连接失败（链上读取缓存将只依赖TTL过期）: {e}")
 
         # 获取起始区块（可选：从环境变量读取）
         start_block_env = os.getenv("EVENT_LISTENER_START_BLOCK")
@@ -70,14 +102,44 @@ async def main():
         # 轮询间隔（秒）
         poll_interval = int(os.getenv("EVENT_LISTENER_POLL_INTERVAL", "5"))
 
+        # 批量摄取模式（单次getLogs + 单事务批量写入）
+        batch_mode = os.getenv("EVENT_LISTENER_BATCH_MODE", "false").lower() == "true"
+        commit_batch_size = int(os.getenv("EVENT_LISTENER_COMMIT_BATCH_SIZE", "500"))
+
+        # 单次getLogs的最大区块跨度（节点拒绝时自动减半）
+        max_block_range = int(os.getenv("EVENT_LISTENER_MAX_BLOCK_RANGE", "5000"))
+
+        # 确认深度（BSC浅层重组保护，0表示处理到最新区块）
+        confirmations = int(os.getenv("EVENT_LISTENER_CONFIRMATIONS", "3"))
+
         # 初始化事件监听服务
         logger.info("🎧 初始化事件监听服务...")
         event_listener = initialize_event_listener(
             web3_client=web3_client,
             start_block=start_block,
-            poll_interval=poll_interval
+            poll_interval=poll_interval,
+            batch_mode=batch_mode,
+            commit_batch_size=commit_batch_size,
+            max_block_range=max_block_range,
+            confirmations=confirmations
         )
 
+        if args.backfill:
+            if args.from_block is None:
+                logger.error("❌ 错误: 回填模式需要指定 --from-block")
+                sys.exit(1)
+
+            to_block = args.to_block if args.to_block is not None else \
+                await web3_client.get_latest_block() - confirmations
+            logger.info(f"⏪ 回填模式: 区块 {args.from_block} 到 {to_block}, {args.workers} 个worker")
+
+            await event_listener.backfill(
+                from_block=args.from_block,
+                to_block=to_block,
+                workers=args.workers
+            )
+            return
+
         logger.info("✅ 初始化完成，开始监听事件...")
         logger.info("=" * 60)
         logger.info("💡 按 Ctrl+C 停止监听")
@@ -98,7 +160,13 @@ async def main():
         logger.error(traceback.format_exc())
         sys.exit(1)
 
+    finally:
+        # 释放RPC连接池
+        if 'web3_client' in locals():
+            await web3_client.close()
+        await redis_client.disconnect()
+
 
 if __name__ == "__main__":
     # 运行主函数
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,39 @@
+"""
+重建实时积分排行榜
+
+用途：从 users / user_points 全量重建 Redis ZSET 排行榜。
+首次启用实时排行榜、Redis数据丢失或怀疑增量漂移时执行
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.session import AsyncSessionLocal
+from app.services.realtime_leaderboard_service import RealtimeLeaderboardService
+from app.utils.redis_client import redis_client
+from loguru import logger
+
+
+async def rebuild_points_leaderboard():
+    """重建实时积分排行榜"""
+    await redis_client.connect()
+
+    try:
+        async with AsyncSessionLocal() as db:
+            total = await RealtimeLeaderboardService.rebuild(db)
+
+        logger.info(f"🎉 实时积分排行榜重建完成: {total}个用户")
+
+    except Exception as e:
+        logger.error(f"❌ 实时积分排行榜重建失败: {e}")
+        raise
+
+    finally:
+        await redis_client.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_points_leaderboard())
@@ -12,6 +12,9 @@ from app.db.session import get_db
 from app.main import app
 from app.core.config import settings
 from app.utils.redis_client import redis_client
+from app.services.task_catalog import TaskCatalog
+from app.services.invite_code_service import InviteCodeService
+from app.services.points_service import PointsService
 
 
 # 测试数据库URL（使用独立的测试数据库）
@@ -64,18 +67,34 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
             idempotency_keys = await client.keys("idempotency:*")
             if idempotency_keys:
                 await client.delete(*idempotency_keys)
+            # 清理实时排行榜
+            leaderboard_keys = await client.keys("leaderboard:realtime:*")
+            if leaderboard_keys:
+                await client.delete(*leaderboard_keys)
+            # 清理积分统计快照
+            await client.delete("points:statistics")
+            # 清理邀请码解析缓存
+            invite_code_keys = await client.keys("invite_code:*")
+            if invite_code_keys:
+                await client.delete(*invite_code_keys)
     except Exception as e:
         print(f"清理Redis失败: {e}")
 
     # 清理所有表数据（解决统计测试的数据隔离问题）
     async with test_engine.begin() as conn:
         # 按依赖顺序删除数据
+        await conn.execute(Base.metadata.tables['processed_events'].delete())
         await conn.execute(Base.metadata.tables['point_transactions'].delete())
         await conn.execute(Base.metadata.tables['user_points'].delete())
         await conn.execute(Base.metadata.tables['team_members'].delete())
         await conn.execute(Base.metadata.tables['teams'].delete())
         await conn.execute(Base.metadata.tables['users'].delete())
 
+    # 任务配置目录、邀请码解析、地址→用户ID是进程内缓存，不随测试事务回滚
+    TaskCatalog.clear()
+    InviteCodeService.clear()
+    PointsService.clear_user_id_cache()
+
     async with test_engine.begin() as connection:
         async with TestSessionLocal(bind=connection) as session:
             # 开启嵌套事务
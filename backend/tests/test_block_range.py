@@ -0,0 +1,45 @@
+"""
+自适应区块跨度测试
+"""
+from app.utils.block_range import AdaptiveBlockRange
+
+
+class TestAdaptiveBlockRange:
+    """AdaptiveBlockRange测试类"""
+
+    def test_chunk_end_capped_by_target(self):
+        """测试结束区块不超过目标区块"""
+        block_range = AdaptiveBlockRange(initial_size=100, max_size=100)
+
+        assert block_range.chunk_end(1, 1000) == 100
+        assert block_range.chunk_end(950, 1000) == 1000
+
+    def test_shrink_halves_until_min(self):
+        """测试跨度减半直到最小值"""
+        block_range = AdaptiveBlockRange(initial_size=8, min_size=2, max_size=8)
+
+        assert block_range.shrink() is True
+        assert block_range.size == 4
+        assert block_range.shrink() is True
+        assert block_range.size == 2
+        assert block_range.shrink() is False
+        assert block_range.size == 2
+
+    def test_grow_capped_by_max(self):
+        """测试成功后放大跨度且不超过最大值"""
+        block_range = AdaptiveBlockRange(initial_size=1, max_size=10, growth_factor=2.0)
+
+        block_range.grow()
+        assert block_range.size == 2
+        for _ in range(10):
+            block_range.grow()
+        assert block_range.size == 10
+
+    def test_is_range_error(self):
+        """测试识别区块范围过大的RPC错误"""
+        assert AdaptiveBlockRange.is_range_error(
+            ValueError({'code': -32005, 'message': 'query returned more than 10000 results'})
+        )
+        assert AdaptiveBlockRange.is_range_error(ValueError("exceed maximum block range: 5000"))
+        assert AdaptiveBlockRange.is_range_error(TimeoutError())
+        assert not AdaptiveBlockRange.is_range_error(ValueError("execution reverted"))
@@ -0,0 +1,68 @@
+"""
+链上读取缓存测试
+"""
+import asyncio
+
+import pytest
+
+from app.core.web3_client import Web3Client
+from app.services.cache_service import CacheService
+from app.utils.redis_client import redis_client
+
+ADDRESS = "0x1234567890AbcdEF1234567890aBcdef12345678"
+
+
+class CountingWeb3Client(Web3Client):
+    """不访问链的客户端：记录合约调用次数"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def _call(self, function_name: str, *args, block_identifier="latest"):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return True
+
+
+async def clear_chain_reads():
+    keys = await redis_client.client.keys(f"{CacheService.KEY_PREFIX_CHAIN_READ}*")
+    if keys:
+        await redis_client.delete(*keys)
+
+
+class TestChainReadCache:
+    """链上读取缓存测试类"""
+
+    def test_cache_key_includes_function_args_and_block(self):
+        """测试缓存键由函数、参数（小写）和区块标签组成"""
+        key = CacheService.chain_read_key("hasReferrer", (ADDRESS,), 123)
+
+        assert key == f"chain:read:hasReferrer:{ADDRESS.lower()}:123"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_single_flight(self):
+        """测试并发的相同调用只访问一次链"""
+        await clear_chain_reads()
+        client = CountingWeb3Client()
+
+        results = await asyncio.gather(*(client.has_referrer(ADDRESS) for _ in range(10)))
+
+        assert all(results)
+        assert client.calls == 1
+        assert client.cache_stats["coalesced"] == 9
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_and_event_invalidation(self):
+        """测试缓存命中以及事件失效后重新读取"""
+        await clear_chain_reads()
+        client = CountingWeb3Client()
+
+        await client.is_user_active(ADDRESS)
+        await client.is_user_active(ADDRESS)
+        assert client.calls == 1
+        assert client.get_cache_stats()["hits"] == 1
+
+        await CacheService.invalidate_chain_reads(ADDRESS)
+        await client.is_user_active(ADDRESS)
+        assert client.calls == 2
@@ -0,0 +1,67 @@
+"""
+InviteCodeService单元测试
+"""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.invite_code_service import InviteCodeService
+from app.services.points_service import PointsService
+from app.services.registration_service import RegistrationService
+
+
+class TestInviteCodeService:
+    """InviteCodeService测试类"""
+
+    @pytest.mark.asyncio
+    async def test_resolve_user_code(self, db_session: AsyncSession):
+        """测试解析USER格式邀请码"""
+        user = await PointsService.get_or_create_user(db_session, "0xinvite_user_code")
+        await db_session.commit()
+
+        resolved = await InviteCodeService.resolve(db_session, InviteCodeService.user_code(user.id))
+
+        assert resolved["user_id"] == user.id
+        assert resolved["wallet_address"] == "0xinvite_user_code"
+
+        # 格式无效的邀请码不查库
+        assert not InviteCodeService.is_valid_format("NOT-A-CODE")
+        assert await InviteCodeService.resolve(db_session, "NOT-A-CODE") is None
+        assert InviteCodeService.is_valid_format(" user000001 ")
+        assert InviteCodeService.is_valid_format("ab12cd")
+
+    @pytest.mark.asyncio
+    async def test_random_code_created_after_negative_lookup(self, db_session: AsyncSession):
+        """测试随机邀请码生成后可解析，并清除此前的负缓存"""
+        code = await InviteCodeService.get_or_create_code(db_session, "0xINVITE_RANDOM")
+        assert InviteCodeService.RANDOM_CODE_PATTERN.match(code)
+
+        # 同一钱包固定一个邀请码
+        assert await InviteCodeService.get_or_create_code(db_session, "0xinvite_random") == code
+
+        resolved = await InviteCodeService.resolve(db_session, code.lower())
+        assert resolved["wallet_address"] == "0xinvite_random"
+        assert resolved["user_id"] is None
+
+    @pytest.mark.asyncio
+    async def test_negative_lookup_cached(self, db_session: AsyncSession):
+        """测试无效邀请码被负缓存，用户注册后清除"""
+        assert await InviteCodeService.resolve(db_session, "USER999999") is None
+        misses = InviteCodeService.cache_stats()["misses"]
+
+        assert await InviteCodeService.resolve(db_session, "USER999999") is None
+        assert InviteCodeService.cache_stats()["misses"] == misses
+
+        await InviteCodeService.forget("USER999999")
+        assert await InviteCodeService.resolve(db_session, "USER999999") is None
+        assert InviteCodeService.cache_stats()["misses"] == misses + 1
+
+    @pytest.mark.asyncio
+    async def test_random_code_resolves_user_after_registration(self, db_session: AsyncSession):
+        """测试随机码对应的钱包注册后，解析结果不再是未注册用户"""
+        code = await InviteCodeService.get_or_create_code(db_session, "0xinvite_registers_later")
+        assert (await InviteCodeService.resolve(db_session, code))["user_id"] is None
+
+        user = await RegistrationService.register_user(db_session, "0xinvite_registers_later")
+
+        resolved = await InviteCodeService.resolve(db_session, code)
+        assert resolved["user_id"] == user.id
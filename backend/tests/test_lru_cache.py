@@ -0,0 +1,33 @@
+"""
+进程内LRU缓存测试
+"""
+from app.utils.lru_cache import LRUCache
+
+
+class TestLRUCache:
+    """LRUCache测试类"""
+
+    def test_evicts_least_recently_used(self):
+        """测试超过容量时淘汰最久未使用的条目"""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.get("a") == 1  # a 变为最近使用
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+    def test_negative_entry_and_expiry(self):
+        """测试None值作为负缓存，以及条目过期"""
+        cache = LRUCache(maxsize=10)
+        cache.set("missing", None)
+        cache.set("expired", 1, ttl=-1)
+
+        assert cache.get("missing", LRUCache.MISSING) is None
+        assert cache.get("expired", LRUCache.MISSING) is LRUCache.MISSING
+        assert cache.get("unknown", LRUCache.MISSING) is LRUCache.MISSING
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
@@ -0,0 +1,92 @@
+"""
+物化视图刷新调度器测试
+"""
+import pytest
+
+from app.services.materialized_view_service import MaterializedViewService
+from app.services.mv_refresh_scheduler import MaterializedViewRefreshScheduler
+from app.utils.redis_client import redis_client
+
+
+class RecordingScheduler(MaterializedViewRefreshScheduler):
+    """不访问数据库的调度器：只记录被刷新的视图"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.refreshed = []
+
+    async def _refresh(self, view: str):
+        self.refreshed.append(view)
+
+
+async def clear_dirty_flags():
+    MaterializedViewService._local_dirty.clear()
+    try:
+        keys = await redis_client.client.keys("mv:*")
+        if keys:
+            await redis_client.delete(*keys)
+    except Exception:
+        pass
+
+
+class TestMaterializedViewRefreshScheduler:
+    """MaterializedViewRefreshScheduler测试类"""
+
+    @pytest.mark.asyncio
+    async def test_only_dirty_views_refreshed(self):
+        """测试只刷新被标记为脏的视图"""
+        await clear_dirty_flags()
+        scheduler = RecordingScheduler(window_seconds=60)
+
+        assert await scheduler.run_once() == []
+
+        await MaterializedViewService.mark_dirty(MaterializedViewService.MV_POINTS_LEADERBOARD)
+        assert await scheduler.run_once() == [MaterializedViewService.MV_POINTS_LEADERBOARD]
+
+        # 脏标记已被清除
+        assert await scheduler.run_once() == []
+
+    @pytest.mark.asyncio
+    async def test_refresh_debounced_within_window(self):
+        """测试窗口期内重复标记只刷新一次，窗口结束后再刷新"""
+        await clear_dirty_flags()
+        scheduler = RecordingScheduler(window_seconds=60)
+        view = MaterializedViewService.MV_TEAMS_LEADERBOARD
+
+        await MaterializedViewService.mark_dirty(view)
+        await scheduler.run_once()
+        for _ in range(5):
+            await MaterializedViewService.mark_dirty(view)
+            await scheduler.run_once()
+
+        assert scheduler.refreshed == [view]
+
+        # 模拟窗口结束
+        await clear_dirty_flags()
+        scheduler._last_refresh.clear()
+        await MaterializedViewService.mark_dirty(view)
+        await scheduler.run_once()
+
+        assert scheduler.refreshed == [view, view]
+
+    @pytest.mark.asyncio
+    async def test_view_refreshed_by_other_instance_not_refreshed_again(self):
+        """测试视图被其他实例认领刷新后，本实例在节流键过期后不再重复刷新"""
+        await clear_dirty_flags()
+        this_instance = RecordingScheduler(window_seconds=60)
+        other_instance = RecordingScheduler(window_seconds=60)
+        view = MaterializedViewService.MV_QUIZ_LEADERBOARD
+
+        await MaterializedViewService.mark_dirty(view)
+        assert await other_instance.run_once() == [view]
+
+        # 模拟节流键过期
+        try:
+            keys = await redis_client.client.keys(f"{MaterializedViewRefreshScheduler.KEY_PREFIX_THROTTLE}*")
+            if keys:
+                await redis_client.delete(*keys)
+        except Exception:
+            pass
+
+        assert await this_instance.run_once() == []
+        assert view not in MaterializedViewService._local_dirty
@@ -3,11 +3,13 @@ PointsService单元测试
 """
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete
 
 from app.services.points_service import PointsService
 from app.models import User, UserPoints, PointTransaction
 from app.models.point_transaction import PointTransactionType
+from app.utils.pagination import next_cursor
+from tests.conftest import TestSessionLocal
 
 
 class TestPointsService:
@@ -33,6 +35,40 @@ class TestPointsService:
         assert user2.id == user1.id
         assert user2.wallet_address == user1.wallet_address
 
+    @pytest.mark.asyncio
+    async def test_get_or_create_users(self, db_session: AsyncSession):
+        """测试批量获取或创建用户（大小写、重复地址合并，已有用户不重复创建）"""
+        existing = await PointsService.get_or_create_user(db_session, "0xbulk_existing")
+        await db_session.commit()
+
+        users = await PointsService.get_or_create_users(
+            db_session, ["0xBULK_EXISTING", "0xbulk_new_1", "0xbulk_new_2", "0xBULK_NEW_1"]
+        )
+        await db_session.commit()
+
+        assert set(users) == {"0xbulk_existing", "0xbulk_new_1", "0xbulk_new_2"}
+        assert users["0xbulk_existing"].id == existing.id
+        assert users["0xbulk_new_1"].level == 1
+
+        result = await db_session.execute(
+            select(User).where(User.wallet_address.like("0xbulk_%"))
+        )
+        assert len(result.scalars().all()) == 3
+
+        # 本事务新建的用户提交后才进入进程内缓存；再次查询命中缓存
+        user_ids = await PointsService.get_or_create_user_ids(
+            db_session, ["0xbulk_new_1", "0xbulk_new_2"]
+        )
+        assert user_ids == {
+            "0xbulk_new_1": users["0xbulk_new_1"].id,
+            "0xbulk_new_2": users["0xbulk_new_2"].id
+        }
+        hits = PointsService.user_id_cache_stats()["hits"]
+        assert await PointsService.get_or_create_user_ids(db_session, ["0xBULK_NEW_2"]) == {
+            "0xbulk_new_2": users["0xbulk_new_2"].id
+        }
+        assert PointsService.user_id_cache_stats()["hits"] == hits + 1
+
     @pytest.mark.asyncio
     async def test_get_or_create_user_points(self, db_session: AsyncSession):
         """测试获取或创建用户积分账户"""
@@ -129,6 +165,41 @@ class TestPointsService:
         assert user_points.total_earned == 200
         assert user_points.total_spent == 50
 
+    @pytest.mark.asyncio
+    async def test_add_user_points_insufficient_balance(self, db_session: AsyncSession):
+        """测试余额不足时扣除失败，账户与流水保持不变"""
+        wallet_address = "0x2323232323232323232323232323232323232323"
+        user = await PointsService.get_or_create_user(db_session, wallet_address)
+        user_points = await PointsService.get_or_create_user_points(db_session, user.id)
+        await db_session.commit()
+
+        await PointsService.add_user_points(
+            db=db_session,
+            user_id=user.id,
+            points=30,
+            transaction_type=PointTransactionType.TASK_DAILY
+        )
+
+        # 会话中已加载的账户和用户对象同步为变动后的值
+        assert user_points.available_points == 30
+        assert user.total_points == 30
+
+        with pytest.raises(ValueError):
+            await PointsService.add_user_points(
+                db=db_session,
+                user_id=user.id,
+                points=-50,
+                transaction_type=PointTransactionType.SPEND_ITEM
+            )
+
+        user_points = await PointsService.get_user_points(db_session, user.id)
+        assert user_points.available_points == 30
+        assert user_points.total_spent == 0
+        result = await db_session.execute(
+            select(PointTransaction).where(PointTransaction.user_id == user.id)
+        )
+        assert len(result.scalars().all()) == 1
+
     @pytest.mark.asyncio
     async def test_add_user_points_multiple_sources(self, db_session: AsyncSession):
         """测试不同来源积分统计"""
@@ -192,7 +263,8 @@ class TestPointsService:
             db=db_session,
             user_id=user.id,
             page=1,
-            page_size=3
+            page_size=3,
+            include_total=True
         )
 
         assert total == 5
@@ -207,7 +279,8 @@ class TestPointsService:
             db=db_session,
             user_id=user.id,
             page=2,
-            page_size=3
+            page_size=3,
+            include_total=True
         )
 
         assert total == 5
@@ -215,6 +288,49 @@ class TestPointsService:
         assert transactions[0].amount == 20
         assert transactions[1].amount == 10
 
+    @pytest.mark.asyncio
+    async def test_get_point_transactions_with_cursor(self, db_session: AsyncSession):
+        """测试游标分页查询积分交易历史"""
+        wallet_address = "0x4545454545454545454545454545454545454545"
+        user = await PointsService.get_or_create_user(db_session, wallet_address)
+        await db_session.commit()
+
+        # 同一事务内写入，created_at 相同，依靠 id 保证顺序稳定
+        for i in range(5):
+            await PointsService.add_user_points(
+                db=db_session,
+                user_id=user.id,
+                points=10 * (i + 1),
+                transaction_type=PointTransactionType.TASK_DAILY
+            )
+        await db_session.commit()
+
+        amounts = []
+        cursor = None
+        while True:
+            transactions, total = await PointsService.get_point_transactions(
+                db=db_session,
+                user_id=user.id,
+                page_size=2,
+                cursor=cursor,
+                include_total=False
+            )
+            assert total is None
+            amounts.extend(t.amount for t in transactions)
+
+            cursor = next_cursor(transactions, 2, "created_at", "id")
+            if cursor is None:
+                break
+
+        assert amounts == [50, 40, 30, 20, 10]
+
+        with pytest.raises(ValueError):
+            await PointsService.get_point_transactions(
+                db=db_session,
+                user_id=user.id,
+                cursor="not-a-cursor"
+            )
+
     @pytest.mark.asyncio
     async def test_get_point_transactions_with_filter(self, db_session: AsyncSession):
         """测试按类型筛选交易历史"""
@@ -248,7 +364,8 @@ class TestPointsService:
         transactions, total = await PointsService.get_point_transactions(
             db=db_session,
             user_id=user.id,
-            transaction_type=PointTransactionType.TASK_DAILY
+            transaction_type=PointTransactionType.TASK_DAILY,
+            include_total=True
         )
 
         assert total == 2
@@ -277,3 +394,181 @@ class TestPointsService:
         # 查询余额
         balance = await PointsService.get_user_balance(db_session, wallet_address)
         assert balance == 250
+
+    @pytest.mark.asyncio
+    async def test_award_referral_points_batch(self, db_session: AsyncSession):
+        """测试批量发放推荐积分（余额按顺序累加，流水批量写入）"""
+        referrer_address = "0x7777777777777777777777777777777777777777"
+        purchaser_address = "0x8888888888888888888888888888888888888888"
+
+        rewards = [
+            {
+                "referrer_address": referrer_address,
+                "purchaser_address": purchaser_address,
+                "points_amount": amount,
+                "level": 1,
+                "purchase_amount": 10 ** 18,
+                "tx_hash": f"0x{i:064x}",
+                "block_number": 100 + i
+            }
+            for i, amount in enumerate([10, 20, 30])
+        ]
+
+        count = await PointsService.award_referral_points_batch(db_session, rewards)
+        await db_session.commit()
+
+        assert count == 3
+
+        referrer = await PointsService.get_or_create_user(db_session, referrer_address)
+        assert referrer.total_points == 60
+
+        result = await db_session.execute(
+            select(PointTransaction)
+            .where(PointTransaction.user_id == referrer.id)
+            .order_by(PointTransaction.id)
+        )
+        transactions = result.scalars().all()
+        assert [t.balance_after for t in transactions] == [10, 30, 60]
+        assert all(t.transaction_type == PointTransactionType.REFERRAL_L1 for t in transactions)
+
+        user_points = await PointsService.get_user_points(db_session, referrer.id)
+        assert user_points.available_points == 60
+        assert user_points.points_from_referral == 60
+
+    @pytest.mark.asyncio
+    async def test_award_referral_points_exactly_once(self, db_session: AsyncSession):
+        """测试同一 (tx_hash, log_index) 的奖励只发放一次"""
+        referrer_address = "0x9999999999999999999999999999999999999999"
+        purchaser_address = "0xaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"
+        reward = {
+            "referrer_address": referrer_address,
+            "purchaser_address": purchaser_address,
+            "points_amount": 50,
+            "level": 1,
+            "purchase_amount": 10 ** 18,
+            "tx_hash": "0x" + "ab" * 32,
+            "block_number": 200,
+            "log_index": 3
+        }
+
+        first = await PointsService.award_referral_points(db=db_session, **reward)
+        second = await PointsService.award_referral_points(db=db_session, **reward)
+
+        assert first is True
+        assert second is False
+
+        referrer = await PointsService.get_or_create_user(db_session, referrer_address)
+        result = await db_session.execute(
+            select(PointTransaction).where(PointTransaction.user_id == referrer.id)
+        )
+        assert len(result.scalars().all()) == 1
+        assert referrer.total_points == 50
+
+    @pytest.mark.asyncio
+    async def test_reverse_chain_events(self, db_session: AsyncSession):
+        """测试区块重组后冲正分叉点之后的推荐奖励"""
+        referrer_address = "0xbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb"
+        purchaser_address = "0xcccccccccccccccccccccccccccccccccccccccc"
+
+        rewards = [
+            {
+                "referrer_address": referrer_address,
+                "purchaser_address": purchaser_address,
+                "points_amount": amount,
+                "level": 1,
+                "purchase_amount": 10 ** 18,
+                "tx_hash": f"0x{i + 16:064x}",
+                "block_number": block_number,
+                "log_index": 0
+            }
+            for i, (amount, block_number) in enumerate([(10, 300), (20, 301), (30, 302)])
+        ]
+        await PointsService.award_referral_points_batch(db_session, rewards)
+        await db_session.commit()
+
+        reversed_counts = await PointsService.reverse_chain_events(db_session, after_block=300)
+        await db_session.commit()
+
+        assert reversed_counts["transactions"] == 2
+
+        referrer = await PointsService.get_or_create_user(db_session, referrer_address)
+        await db_session.refresh(referrer)
+        assert referrer.total_points == 10
+
+        user_points = await PointsService.get_user_points(db_session, referrer.id)
+        assert user_points.available_points == 10
+        assert user_points.points_from_referral == 10
+
+        # 再次冲正不应重复扣减
+        again = await PointsService.reverse_chain_events(db_session, after_block=300)
+        assert again["transactions"] == 0
+
+    @pytest.mark.asyncio
+    async def test_chain_events_keep_concurrent_points_changes(self, db_session: AsyncSession):
+        """测试长会话中的批量发放与重组冲正不覆盖其他会话在期间的积分变动"""
+        referrer_address = "0xdddddddddddddddddddddddddddddddddddddddd"
+        purchaser_address = "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee"
+
+        def rewards(amounts):
+            return [
+                {
+                    "referrer_address": referrer_address,
+                    "purchaser_address": purchaser_address,
+                    "points_amount": amount,
+                    "level": 1,
+                    "purchase_amount": 10 ** 18,
+                    "tx_hash": f"0x{block_number:064x}",
+                    "block_number": block_number,
+                    "log_index": 0
+                }
+                for amount, block_number in amounts
+            ]
+
+        # 事件监听使用的长会话（提交后不过期已加载的对象）
+        listener_session = TestSessionLocal()
+        try:
+            await PointsService.award_referral_points_batch(listener_session, rewards([(10, 400)]))
+            await listener_session.commit()
+
+            async def add_points_elsewhere(points: int):
+                async with TestSessionLocal() as session:
+                    referrer = await PointsService.get_or_create_user(session, referrer_address)
+                    await PointsService.add_user_points(
+                        session, referrer.id, points, PointTransactionType.TASK_DAILY
+                    )
+
+            await add_points_elsewhere(40)
+            await PointsService.award_referral_points_batch(
+                listener_session, rewards([(20, 401), (30, 402)])
+            )
+            await listener_session.commit()
+
+            await add_points_elsewhere(5)
+            await PointsService.reverse_chain_events(listener_session, after_block=400)
+            await listener_session.commit()
+
+            async with TestSessionLocal() as session:
+                result = await session.execute(
+                    select(User, UserPoints)
+                    .join(UserPoints, UserPoints.user_id == User.id)
+                    .where(User.wallet_address == referrer_address)
+                )
+                user, user_points = result.one()
+                assert user_points.available_points == 10 + 40 + 5
+                assert user_points.points_from_referral == 10
+                assert user.total_points == user_points.available_points
+
+                result = await session.execute(
+                    select(PointTransaction.balance_after)
+                    .where(PointTransaction.user_id == user.id)
+                    .order_by(PointTransaction.id)
+                )
+                assert result.scalars().all() == [10, 50, 70, 100, 105, 85, 55]
+        finally:
+            await listener_session.close()
+            # 独立会话已提交，清理测试数据
+            async with TestSessionLocal() as session:
+                await session.execute(
+                    delete(User).where(User.wallet_address.in_([referrer_address, purchaser_address]))
+                )
+                await session.commit()
@@ -411,7 +411,8 @@ class TestQuizQueries:
             db=db_session,
             user_id=user.id,
             page=1,
-            page_size=10
+            page_size=10,
+            include_total=True
         )
         assert total == 3
         assert len(all_answers) == 3
@@ -422,7 +423,8 @@ class TestQuizQueries:
             user_id=user.id,
             is_correct=True,
             page=1,
-            page_size=10
+            page_size=10,
+            include_total=True
         )
         assert correct_total == 2
 
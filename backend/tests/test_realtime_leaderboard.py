@@ -0,0 +1,142 @@
+"""
+实时积分排行榜测试
+"""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.points_service import PointsService
+from app.services.realtime_leaderboard_service import RealtimeLeaderboardService
+from app.services.leaderboard_service import LeaderboardService
+from app.models.point_transaction import PointTransactionType
+
+
+class TestRealtimeLeaderboardService:
+    """RealtimeLeaderboardService测试类"""
+
+    @pytest.mark.asyncio
+    async def test_rebuild_then_incremental_updates(self, db_session: AsyncSession):
+        """测试重建后积分写入实时更新排名（同分按用户ID升序）"""
+        users = []
+        for i in range(3):
+            user = await PointsService.get_or_create_user(db_session, f"0x{i + 1:040x}")
+            users.append(user)
+        await db_session.commit()
+
+        await PointsService.add_user_points(
+            db=db_session,
+            user_id=users[0].id,
+            points=100,
+            transaction_type=PointTransactionType.TASK_DAILY
+        )
+        await PointsService.add_user_points(
+            db=db_session,
+            user_id=users[1].id,
+            points=100,
+            transaction_type=PointTransactionType.TASK_DAILY
+        )
+
+        total = await RealtimeLeaderboardService.rebuild(db_session)
+        assert total == 3
+
+        assert await RealtimeLeaderboardService.get_rank(users[0].id) == (1, 100)
+        assert await RealtimeLeaderboardService.get_rank(users[1].id) == (2, 100)
+        assert await RealtimeLeaderboardService.get_rank(users[2].id) == (3, 0)
+
+        # 写入即更新排名，无需刷新物化视图
+        await PointsService.add_user_points(
+            db=db_session,
+            user_id=users[2].id,
+            points=150,
+            transaction_type=PointTransactionType.QUIZ_CORRECT
+        )
+
+        assert await RealtimeLeaderboardService.get_rank(users[2].id) == (1, 150)
+        page = await RealtimeLeaderboardService.get_page(0, 2)
+        assert [(rank, user_id) for rank, user_id, _ in page] == [
+            (1, users[2].id),
+            (2, users[0].id)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_user_neighborhood(self, db_session: AsyncSession):
+        """测试查询用户前后k名（榜首附近截断）"""
+        users = []
+        for i in range(6):
+            user = await PointsService.get_or_create_user(db_session, f"0x{i + 11:040x}")
+            users.append(user)
+        await db_session.commit()
+
+        # users[i] 积分递减，排名为 i + 1
+        for i, user in enumerate(users):
+            await PointsService.add_user_points(
+                db=db_session,
+                user_id=user.id,
+                points=100 - i * 10,
+                transaction_type=PointTransactionType.TASK_DAILY
+            )
+        await RealtimeLeaderboardService.rebuild(db_session)
+
+        neighborhood = await LeaderboardService.get_user_neighborhood(db_session, users[3].id, k=2)
+        assert neighborhood["rank"] == 4
+        assert [entry["rank"] for entry in neighborhood["entries"]] == [2, 3, 4, 5, 6]
+        assert neighborhood["entries"][2]["user_id"] == users[3].id
+
+        neighborhood = await LeaderboardService.get_user_neighborhood(db_session, users[0].id, k=2)
+        assert [entry["user_id"] for entry in neighborhood["entries"]] == [
+            users[0].id, users[1].id, users[2].id
+        ]
+
+    @pytest.mark.asyncio
+    async def test_zero_point_users_join_after_rebuild(self, db_session: AsyncSession):
+        """测试重建之后新建的0分用户也进入榜单"""
+        scorer = await PointsService.get_or_create_user(db_session, f"0x{21:040x}")
+        await db_session.commit()
+        await PointsService.add_user_points(
+            db=db_session,
+            user_id=scorer.id,
+            points=10,
+            transaction_type=PointTransactionType.TASK_DAILY
+        )
+        assert await RealtimeLeaderboardService.rebuild(db_session) == 1
+
+        users = await PointsService.get_or_create_users(
+            db_session, [f"0x{22:040x}", f"0x{23:040x}"]
+        )
+        await db_session.commit()
+        await RealtimeLeaderboardService.apply_staged(db_session)
+
+        assert await RealtimeLeaderboardService.count() == 3
+        assert await RealtimeLeaderboardService.get_rank(users[f"0x{22:040x}"].id) == (2, 0)
+        assert await RealtimeLeaderboardService.get_rank(scorer.id) == (1, 10)
+
+    @pytest.mark.asyncio
+    async def test_banned_user_excluded(self, db_session: AsyncSession):
+        """测试封禁用户不进入实时排行榜：重建时排除，积分变动不写入榜单"""
+        users = []
+        for i in range(2):
+            user = await PointsService.get_or_create_user(db_session, f"0x{i + 31:040x}")
+            users.append(user)
+        await db_session.commit()
+        for i, user in enumerate(users):
+            await PointsService.add_user_points(
+                db=db_session,
+                user_id=user.id,
+                points=100 - i * 10,
+                transaction_type=PointTransactionType.TASK_DAILY
+            )
+
+        users[0].is_banned = True
+        await db_session.commit()
+        await RealtimeLeaderboardService.rebuild(db_session)
+
+        assert await RealtimeLeaderboardService.get_rank(users[0].id) is None
+        assert await RealtimeLeaderboardService.get_rank(users[1].id) == (1, 90)
+
+        # 封禁期间的积分变动不写入榜单
+        await PointsService.add_user_points(
+            db=db_session,
+            user_id=users[0].id,
+            points=5,
+            transaction_type=PointTransactionType.TASK_DAILY
+        )
+        assert await RealtimeLeaderboardService.get_rank(users[0].id) is None
@@ -0,0 +1,108 @@
+"""
+ReferralService单元测试
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.referral_service import ReferralService
+from app.services.points_service import PointsService
+from app.models import ReferralRelation, ReferralClosure
+
+
+async def _create_chain(db: AsyncSession, prefix: str, length: int):
+    """创建推荐链 users[0] ← users[1] ← ... （users[i] 的推荐人是 users[i-1]）"""
+    users = [
+        await PointsService.get_or_create_user(db, f"0x{prefix}_{i}")
+        for i in range(length)
+    ]
+    relations = []
+    for referrer, referee in zip(users, users[1:]):
+        relation = ReferralRelation(referrer_id=referrer.id, referee_id=referee.id, is_active=True)
+        db.add(relation)
+        relations.append(relation)
+        await ReferralService.link_closure(db, referrer.id, referee.id)
+    await db.commit()
+    return users, relations
+
+
+class TestReferralService:
+    """ReferralService测试类"""
+
+    @pytest.mark.asyncio
+    async def test_get_uplines(self, db_session: AsyncSession):
+        """测试一次查询多个用户的上级链"""
+        users, relations = await _create_chain(db_session, "upline", 4)
+
+        uplines = await ReferralService.get_uplines(db_session, [users[3].id, users[1].id, users[0].id])
+
+        assert [r.referrer_id for r in uplines[users[3].id]] == [users[2].id, users[1].id, users[0].id]
+        assert [r.id for r in uplines[users[1].id]] == [relations[0].id]
+        assert uplines[users[0].id] == []
+
+        limited = await ReferralService.get_upline(db_session, users[3].id, max_depth=2)
+        assert [r.referrer_id for r in limited] == [users[2].id, users[1].id]
+
+    @pytest.mark.asyncio
+    async def test_would_create_cycle(self, db_session: AsyncSession):
+        """测试循环推荐检测"""
+        users, _ = await _create_chain(db_session, "cycle", 4)
+        outsider = await PointsService.get_or_create_user(db_session, "0xcycle_outsider")
+        await db_session.commit()
+
+        # users[0] 绑定到 users[3] 名下会形成环
+        assert await ReferralService.would_create_cycle(db_session, users[3].id, users[0].id)
+        assert await ReferralService.would_create_cycle(db_session, users[1].id, users[1].id)
+        assert not await ReferralService.would_create_cycle(db_session, users[3].id, outsider.id)
+
+    @pytest.mark.asyncio
+    async def test_l2_reward_attributed_to_upline_relation(self, db_session: AsyncSession):
+        """测试L2奖励归属到上级链中对应层级的推荐关系"""
+        users, relations = await _create_chain(db_session, "attribution", 3)
+
+        await PointsService.award_referral_points(
+            db=db_session,
+            referrer_address=users[0].wallet_address,
+            purchaser_address=users[2].wallet_address,
+            points_amount=50,
+            level=2,
+            purchase_amount=10**18,
+            tx_hash="0xattribution_l2",
+            block_number=1
+        )
+
+        await db_session.refresh(relations[0])
+        await db_session.refresh(relations[1])
+        assert relations[0].total_rewards_given == 50
+        assert relations[1].total_rewards_given == 0
+
+    @pytest.mark.asyncio
+    async def test_closure_link_and_downline(self, db_session: AsyncSession):
+        """测试闭包表维护与下级分页查询"""
+        users, _ = await _create_chain(db_session, "closure", 3)
+
+        # 把已有下级的子树 (sub_0 ← sub_1) 挂到 users[2] 名下
+        subtree, _ = await _create_chain(db_session, "closure_sub", 2)
+        await ReferralService.link_closure(db_session, users[2].id, subtree[0].id)
+        await db_session.commit()
+
+        counts = await ReferralService.get_downline_level_counts(db_session, users[0].id)
+        assert counts == {1: 1, 2: 1, 3: 1, 4: 1}
+        assert await ReferralService.get_downline_level_counts(db_session, users[0].id, max_depth=2) == {1: 1, 2: 1}
+
+        first_page, cursor = await ReferralService.get_downline(db_session, users[0].id, page_size=2)
+        assert [(m["depth"], m["user_id"]) for m in first_page] == [(1, users[1].id), (2, users[2].id)]
+        second_page, cursor = await ReferralService.get_downline(
+            db_session, users[0].id, page_size=2, cursor=cursor
+        )
+        assert [(m["depth"], m["user_id"]) for m in second_page] == [(3, subtree[0].id), (4, subtree[1].id)]
+
+        # 断开 users[1] → users[2]：经过这条关系的路径全部移除
+        await ReferralService.unlink_closure(db_session, users[1].id, users[2].id)
+        await db_session.commit()
+
+        assert await ReferralService.get_downline_level_counts(db_session, users[0].id) == {1: 1}
+        result = await db_session.execute(
+            select(ReferralClosure.ancestor_id).where(ReferralClosure.descendant_id == subtree[1].id)
+        )
+        assert set(result.scalars().all()) == {subtree[0].id, users[2].id}
@@ -0,0 +1,155 @@
+"""
+RegistrationService单元测试
+"""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+
+from app.services.registration_service import RegistrationService
+from app.services.task_service import TaskService
+from app.services.invite_code_service import InviteCodeService
+from app.models import User, UserPoints, PointTransaction, ReferralRelation
+from app.models.task import TaskType, UserTaskStatus
+from tests.conftest import TestSessionLocal
+
+
+class TestRegistrationService:
+    """RegistrationService测试类"""
+
+    @pytest.mark.asyncio
+    async def test_register_user_with_invite_code(self, db_session: AsyncSession):
+        """测试带邀请码注册：注册奖励、推荐奖励、推荐关系和任务进度一次完成"""
+        referrer = await RegistrationService.register_user(
+            db_session, "0xREGISTER_REFERRER"
+        )
+        invite_task = await TaskService.create_task(
+            db=db_session,
+            task_key="invite_friends",
+            title="邀请好友",
+            task_type=TaskType.ONCE,
+            reward_points=200,
+            target_value=3
+        )
+
+        new_user = await RegistrationService.register_user(
+            db_session,
+            "0xregister_referee",
+            invite_code=f"USER{referrer.id:06d}"
+        )
+
+        assert new_user.wallet_address == "0xregister_referee"
+        assert new_user.total_points == RegistrationService.REGISTER_REWARD_POINTS
+
+        await db_session.refresh(referrer)
+        assert referrer.total_invited == 1
+        assert referrer.total_points == (
+            RegistrationService.REGISTER_REWARD_POINTS + RegistrationService.REFERRAL_REWARD_POINTS
+        )
+
+        result = await db_session.execute(
+            select(UserPoints).where(UserPoints.user_id == referrer.id)
+        )
+        assert result.scalar_one().available_points == referrer.total_points
+
+        result = await db_session.execute(
+            select(ReferralRelation).where(ReferralRelation.referee_id == new_user.id)
+        )
+        assert result.scalar_one().referrer_id == referrer.id
+
+        result = await db_session.execute(
+            select(PointTransaction).where(PointTransaction.user_id == referrer.id)
+        )
+        assert len(result.scalars().all()) == 2
+
+        invite_user_task = await TaskService.get_user_task(db_session, referrer.id, invite_task.id)
+        assert invite_user_task.status == UserTaskStatus.IN_PROGRESS
+        assert invite_user_task.current_value == 1
+
+    @pytest.mark.asyncio
+    async def test_register_user_duplicate_wallet(self, db_session: AsyncSession):
+        """测试重复注册同一钱包地址"""
+        await RegistrationService.register_user(db_session, "0xregister_duplicate")
+
+        with pytest.raises(ValueError):
+            await RegistrationService.register_user(db_session, "0xREGISTER_DUPLICATE")
+
+        result = await db_session.execute(
+            select(User).where(User.wallet_address == "0xregister_duplicate")
+        )
+        assert len(result.scalars().all()) == 1
+
+    @pytest.mark.asyncio
+    async def test_register_user_with_random_invite_code(self, db_session: AsyncSession):
+        """测试随机邀请码：钱包生成邀请码后才注册，被邀请人注册时仍能绑定推荐人"""
+        code = await InviteCodeService.get_or_create_code(db_session, "0xregister_random_referrer")
+        referrer = await RegistrationService.register_user(db_session, "0xregister_random_referrer")
+
+        new_user = await RegistrationService.register_user(
+            db_session, "0xregister_random_referee", invite_code=code.lower()
+        )
+
+        result = await db_session.execute(
+            select(ReferralRelation).where(ReferralRelation.referee_id == new_user.id)
+        )
+        assert result.scalar_one().referrer_id == referrer.id
+
+        # 前缀不是USER的邀请码不能按用户ID解析
+        outsider = await RegistrationService.register_user(
+            db_session, "0xregister_bogus_code", invite_code=f"ABCD{referrer.id:06d}"
+        )
+        result = await db_session.execute(
+            select(ReferralRelation).where(ReferralRelation.referee_id == outsider.id)
+        )
+        assert result.scalar_one_or_none() is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_registrations_same_referrer(self, db_session: AsyncSession):
+        """测试同一邀请码的并发注册（各自独立会话）：推荐奖励与邀请数不丢失"""
+        async with TestSessionLocal() as session:
+            referrer = await RegistrationService.register_user(session, "0xregister_hot_referrer")
+        invite_code = f"USER{referrer.id:06d}"
+
+        async def register(wallet_address: str):
+            async with TestSessionLocal() as session:
+                return await RegistrationService.register_user(
+                    session, wallet_address, invite_code=invite_code
+                )
+
+        referees = ["0xregister_hot_referee_a", "0xregister_hot_referee_b"]
+        try:
+            await asyncio.gather(*(register(address) for address in referees))
+
+            async with TestSessionLocal() as session:
+                result = await session.execute(
+                    select(User, UserPoints)
+                    .join(UserPoints, UserPoints.user_id == User.id)
+                    .where(User.id == referrer.id)
+                )
+                user, user_points = result.one()
+                expected = (
+                    RegistrationService.REGISTER_REWARD_POINTS
+                    + 2 * RegistrationService.REFERRAL_REWARD_POINTS
+                )
+                assert user.total_invited == 2
+                assert user_points.available_points == expected
+                assert user_points.total_earned == expected
+                assert user.total_points == expected
+
+                result = await session.execute(
+                    select(PointTransaction.balance_after)
+                    .where(PointTransaction.user_id == referrer.id)
+                    .order_by(PointTransaction.id)
+                )
+                assert result.scalars().all() == [
+                    RegistrationService.REGISTER_REWARD_POINTS,
+                    RegistrationService.REGISTER_REWARD_POINTS + RegistrationService.REFERRAL_REWARD_POINTS,
+                    expected
+                ]
+        finally:
+            # 独立会话已提交，按外键顺序清理（被推荐人 → 推荐人）
+            async with TestSessionLocal() as session:
+                await session.execute(delete(User).where(User.wallet_address.in_(referees)))
+                await session.execute(delete(User).where(User.id == referrer.id))
+                await session.commit()
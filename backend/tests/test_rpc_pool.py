@@ -0,0 +1,189 @@
+"""
+多RPC节点池测试（使用本地桩HTTP服务器）
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from aiohttp import ClientSession, web
+
+from app.utils.rpc_pool import PooledAsyncHTTPProvider, RpcEndpoint
+
+
+class StubRpcServer:
+    """本地JSON-RPC桩服务器，可配置延迟和失败"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.requests = 0
+        self.runner = None
+        self.url = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        body = json.loads(await request.read())
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return web.Response(status=502)
+        if isinstance(body, list):
+            # 批量请求：倒序返回以验证按id重新排序
+            return web.json_response([
+                {"jsonrpc": "2.0", "id": item["id"], "result": hex(item["id"])}
+                for item in reversed(body)
+            ])
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": "0x10"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}/"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+async def start_servers(*servers: StubRpcServer):
+    for server in servers:
+        await server.start()
+
+
+async def stop_servers(*servers: StubRpcServer):
+    for server in servers:
+        await server.stop()
+
+
+class TestRpcEndpoint:
+    """RpcEndpoint统计测试类"""
+
+    def test_percentiles_and_error_rate(self):
+        """测试滚动分位数和错误率"""
+        endpoint = RpcEndpoint("http://node", window_size=100)
+        for i in range(1, 101):
+            endpoint.record_success(i / 1000)
+        endpoint.record_failure()
+
+        assert endpoint.p50 == pytest.approx(0.051, abs=0.002)
+        assert endpoint.p99 == pytest.approx(0.1, abs=0.002)
+        assert endpoint.error_rate == pytest.approx(0.01)
+
+    def test_failures_outrank_latency(self):
+        """测试高错误率节点排在慢节点之后"""
+        slow = RpcEndpoint("http://slow")
+        flaky = RpcEndpoint("http://flaky")
+        for _ in range(10):
+            slow.record_success(0.5)
+            flaky.record_success(0.01)
+            flaky.record_failure()
+
+        assert slow.score < flaky.score
+
+
+class TestPooledAsyncHTTPProvider:
+    """PooledAsyncHTTPProvider测试类"""
+
+    @pytest.mark.asyncio
+    async def test_routes_to_fastest_endpoint(self):
+        """测试请求路由到延迟最低的节点"""
+        slow, fast = StubRpcServer(delay=0.1), StubRpcServer()
+        await start_servers(slow, fast)
+        try:
+            async with ClientSession() as session:
+                provider = PooledAsyncHTTPProvider([slow.url, fast.url], session=session)
+                for _ in range(10):
+                    response = await provider.make_request("eth_blockNumber", [])
+                    assert response["result"] == "0x10"
+        finally:
+            await stop_servers(slow, fast)
+
+        assert slow.requests == 1
+        assert fast.requests == 9
+
+    @pytest.mark.asyncio
+    async def test_failover_on_endpoint_error(self):
+        """测试节点失败时切换到下一个节点并记录错误率"""
+        broken, healthy = StubRpcServer(fail=True), StubRpcServer()
+        await start_servers(broken, healthy)
+        try:
+            async with ClientSession() as session:
+                provider = PooledAsyncHTTPProvider([broken.url, healthy.url], session=session)
+                response = await provider.make_request("eth_blockNumber", [])
+                await provider.make_request("eth_blockNumber", [])
+        finally:
+            await stop_servers(broken, healthy)
+
+        assert response["result"] == "0x10"
+        assert broken.requests == 1
+        assert healthy.requests == 2
+
+        stats = {s["url"]: s for s in provider.endpoint_stats()}
+        assert stats[broken.url]["error_rate"] == 1.0
+        assert stats[healthy.url]["error_rate"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_for_idempotent_read(self):
+        """测试幂等读请求超过阈值后对冲到次优节点"""
+        stalled, backup = StubRpcServer(delay=1.0), StubRpcServer()
+        await start_servers(stalled, backup)
+        try:
+            async with ClientSession() as session:
+                provider = PooledAsyncHTTPProvider(
+                    [stalled.url, backup.url],
+                    session=session,
+                    hedge_after=0.05
+                )
+                start = time.perf_counter()
+                response = await provider.make_request("eth_getLogs", [{}])
+                elapsed = time.perf_counter() - start
+        finally:
+            await stop_servers(stalled, backup)
+
+        assert response["result"] == "0x10"
+        assert elapsed < 0.5
+        assert provider.hedged_requests == 1
+        assert backup.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_non_idempotent_method_not_hedged(self):
+        """测试非幂等方法不发送对冲请求"""
+        slow, backup = StubRpcServer(delay=0.1), StubRpcServer()
+        await start_servers(slow, backup)
+        try:
+            async with ClientSession() as session:
+                provider = PooledAsyncHTTPProvider(
+                    [slow.url, backup.url],
+                    session=session,
+                    hedge_after=0.01
+                )
+                await provider.make_request("eth_sendRawTransaction", ["0x00"])
+        finally:
+            await stop_servers(slow, backup)
+
+        assert provider.hedged_requests == 0
+        assert backup.requests == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_request_single_round_trip(self):
+        """测试JSON-RPC批量请求一次往返并按请求顺序返回"""
+        server = StubRpcServer()
+        await start_servers(server)
+        try:
+            async with ClientSession() as session:
+                provider = PooledAsyncHTTPProvider([server.url], session=session)
+                responses = await provider.make_batch_request([
+                    ("eth_call", [{"to": "0x0", "data": "0x"}, "latest"])
+                    for _ in range(5)
+                ])
+        finally:
+            await stop_servers(server)
+
+        assert server.requests == 1
+        ids = [response["id"] for response in responses]
+        assert ids == sorted(ids)
+        assert [response["result"] for response in responses] == [hex(i) for i in ids]
@@ -1,14 +1,18 @@
 """
 TaskService单元测试
 """
+import asyncio
 import pytest
 from datetime import datetime, timedelta
+from sqlalchemy import select, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.task_service import TaskService
 from app.services.points_service import PointsService
+from app.services.task_catalog import TaskCatalog
 from app.models import Task, UserTask, User
 from app.models.task import TaskType, TaskTrigger, UserTaskStatus
+from tests.conftest import TestSessionLocal
 
 
 class TestTaskService:
@@ -117,6 +121,65 @@ class TestTaskService:
         assert updated_task.reward_points == 200
         assert updated_task.description == "更新后的描述"
 
+    @pytest.mark.asyncio
+    async def test_task_catalog_invalidated_on_update(self, db_session: AsyncSession):
+        """测试任务配置目录在任务更新后失效并重新加载"""
+        task = await TaskService.create_task(
+            db=db_session,
+            task_key="catalog_test",
+            title="目录测试",
+            task_type=TaskType.ONCE,
+            reward_points=100
+        )
+
+        definition = await TaskCatalog.get(db_session, task.id)
+        assert definition.task_key == "catalog_test"
+        assert definition.reward_points == 100
+
+        await TaskService.update_task(db=db_session, task_id=task.id, reward_points=300)
+
+        definition = await TaskCatalog.get(db_session, task.id)
+        assert definition.reward_points == 300
+
+        assert await TaskCatalog.get(db_session, 999999) is None
+
+        # 不存在的ID在检查间隔内不会再触发整表重新加载
+        snapshot = await TaskCatalog.snapshot(db_session)
+        assert await TaskCatalog.get(db_session, 999999) is None
+        assert await TaskCatalog.get(db_session, 999998) is None
+        assert TaskCatalog._snapshot is snapshot
+
+    @pytest.mark.asyncio
+    async def test_task_catalog_indexes(self, db_session: AsyncSession):
+        """测试任务配置目录按 task_key 和触发类型索引（触发索引只含激活任务）"""
+        auto_task = await TaskService.create_task(
+            db=db_session,
+            task_key="catalog_auto",
+            title="自动任务",
+            task_type=TaskType.ONCE,
+            reward_points=10,
+            trigger_type=TaskTrigger.AUTO
+        )
+        inactive_task = await TaskService.create_task(
+            db=db_session,
+            task_key="catalog_auto_inactive",
+            title="已下线自动任务",
+            task_type=TaskType.ONCE,
+            reward_points=10,
+            trigger_type=TaskTrigger.AUTO
+        )
+        await TaskService.delete_task(db_session, inactive_task.id)
+
+        by_key = await TaskService.get_task_by_key(db_session, "catalog_auto")
+        assert by_key.id == auto_task.id
+
+        active_auto = await TaskCatalog.get_active_by_trigger(db_session, TaskTrigger.AUTO)
+        assert [definition.id for definition in active_auto] == [auto_task.id]
+
+        # 快照不可变
+        with pytest.raises(AttributeError):
+            by_key.reward_points = 999
+
     @pytest.mark.asyncio
     async def test_delete_task(self, db_session: AsyncSession):
         """测试删除任务（软删除）"""
@@ -214,6 +277,47 @@ class TestTaskService:
                 task_id=task.id
             )
 
+    @pytest.mark.asyncio
+    async def test_assign_task_concurrent(self, db_session: AsyncSession):
+        """测试并发领取同一任务（各自独立会话）：只创建一条，另一个请求得到ValueError"""
+        async with TestSessionLocal() as session:
+            user = await PointsService.get_or_create_user(session, "0xuser_assign_race")
+            await session.commit()
+            task = await TaskService.create_task(
+                db=session,
+                task_key="assign_race_task",
+                title="并发领取任务",
+                task_type=TaskType.ONCE,
+                reward_points=100
+            )
+
+        async def assign():
+            async with TestSessionLocal() as session:
+                return await TaskService.assign_task_to_user(
+                    db=session, user_id=user.id, task_id=task.id
+                )
+
+        try:
+            results = await asyncio.gather(assign(), assign(), return_exceptions=True)
+            assigned = [r for r in results if isinstance(r, UserTask)]
+            errors = [r for r in results if isinstance(r, Exception)]
+            assert len(assigned) == 1
+            assert len(errors) == 1
+            assert isinstance(errors[0], ValueError)
+
+            async with TestSessionLocal() as session:
+                result = await session.execute(
+                    select(func.count()).select_from(UserTask).where(UserTask.task_id == task.id)
+                )
+                assert result.scalar_one() == 1
+        finally:
+            # 独立会话已提交，清理测试数据（用户任务随用户/任务级联删除）
+            async with TestSessionLocal() as session:
+                await session.execute(delete(User).where(User.id == user.id))
+                await session.execute(delete(Task).where(Task.id == task.id))
+                await session.commit()
+            TaskCatalog.clear()
+
     @pytest.mark.asyncio
     async def test_update_task_progress(self, db_session: AsyncSession):
         """测试更新任务进度"""
@@ -464,7 +568,8 @@ class TestTaskService:
         # 获取用户任务列表
         user_tasks, total = await TaskService.get_user_tasks(
             db=db_session,
-            user_id=user.id
+            user_id=user.id,
+            include_total=True
         )
 
         # 验证
@@ -523,7 +628,8 @@ class TestTaskService:
         completed_tasks, total = await TaskService.get_user_tasks(
             db=db_session,
             user_id=user.id,
-            status=UserTaskStatus.COMPLETED
+            status=UserTaskStatus.COMPLETED,
+            include_total=True
         )
 
         assert total >= 1
@@ -667,6 +773,95 @@ class TestTaskService:
         assert all(ut.user_id == user.id for ut in assigned_tasks)
         assert all(ut.status == UserTaskStatus.IN_PROGRESS for ut in assigned_tasks)
 
+    @pytest.mark.asyncio
+    async def test_auto_assign_tasks_idempotent(self, db_session: AsyncSession):
+        """测试重复自动分配不会产生重复的进行中任务"""
+        user = await PointsService.get_or_create_user(db_session, "0xuser_auto_twice")
+        await db_session.commit()
+
+        task = await TaskService.create_task(
+            db=db_session,
+            task_key="auto_task_twice",
+            title="自动任务",
+            task_type=TaskType.DAILY,
+            reward_points=50,
+            trigger_type=TaskTrigger.AUTO
+        )
+        await db_session.commit()
+
+        first = await TaskService.auto_assign_tasks(db=db_session, user_id=user.id)
+        second = await TaskService.auto_assign_tasks(db=db_session, user_id=user.id)
+
+        assert [ut.task_id for ut in first] == [task.id]
+        assert second == []
+
+        result = await db_session.execute(
+            select(func.count(UserTask.id)).where(
+                UserTask.user_id == user.id,
+                UserTask.task_id == task.id
+            )
+        )
+        assert result.scalar() == 1
+
+    @pytest.mark.asyncio
+    async def test_apply_progress_batch(self, db_session: AsyncSession):
+        """测试批量更新任务进度"""
+        user1 = await PointsService.get_or_create_user(db_session, "0xuser_batch_1")
+        user2 = await PointsService.get_or_create_user(db_session, "0xuser_batch_2")
+        await db_session.commit()
+
+        task = await TaskService.create_task(
+            db=db_session,
+            task_key="batch_invite",
+            title="批量邀请任务",
+            task_type=TaskType.ONCE,
+            reward_points=100,
+            target_value=3
+        )
+        await db_session.commit()
+
+        await TaskService.assign_task_to_user(db=db_session, user_id=user1.id, task_id=task.id)
+
+        # user1 增量合并后达到目标；user2 未领取，由 assign_missing 分配
+        completed = await TaskService.apply_progress_batch(
+            db=db_session,
+            updates=[
+                (user1.id, "batch_invite", 2),
+                (user1.id, "batch_invite", 2),
+                (user2.id, "batch_invite", 1),
+                (user2.id, "unknown_task", 1)
+            ],
+            assign_missing=True
+        )
+
+        assert [ut.user_id for ut in completed] == [user1.id]
+        assert completed[0].current_value == 3
+        assert completed[0].completed_at is not None
+
+        user2_task = await TaskService.get_user_task(db_session, user2.id, task.id)
+        assert user2_task.status == UserTaskStatus.IN_PROGRESS
+        assert user2_task.current_value == 1
+
+        # 已完成的任务不再累加
+        completed = await TaskService.apply_progress_batch(
+            db=db_session,
+            updates=[(user1.id, "batch_invite", 1)]
+        )
+        assert completed == []
+
+        # 负增量撤销进度（不低于0），已完成的任务不回退
+        await TaskService.apply_progress_batch(
+            db=db_session,
+            updates=[(user1.id, "batch_invite", -1), (user2.id, "batch_invite", -5)]
+        )
+        user1_task = await TaskService.get_user_task(db_session, user1.id, task.id)
+        user2_task = await TaskService.get_user_task(db_session, user2.id, task.id)
+        await db_session.refresh(user1_task)
+        await db_session.refresh(user2_task)
+        assert user1_task.status == UserTaskStatus.COMPLETED
+        assert user1_task.current_value == 3
+        assert user2_task.current_value == 0
+
     @pytest.mark.asyncio
     async def test_task_expiration(self, db_session: AsyncSession):
         """测试任务过期"""
@@ -575,3 +575,26 @@ class TestTeamService:
         # 验证
         assert len(tasks) == 3
         assert tasks[0].title in ["任务0", "任务1", "任务2"]
+
+    @pytest.mark.asyncio
+    async def test_get_user_team_with_captain(self, db_session: AsyncSession):
+        """测试查询用户所在战队（队长信息随战队加载）"""
+        captain = await PointsService.get_or_create_user(db_session, "0xcaptain_user_team")
+        member = await PointsService.get_or_create_user(db_session, "0xmember_user_team")
+        await db_session.commit()
+
+        team = await TeamService.create_team(
+            db=db_session,
+            name="用户战队查询",
+            captain_id=captain.id
+        )
+        await db_session.commit()
+
+        assert await TeamService.get_user_team(db_session, member.id) is None
+
+        await TeamService.join_team(db=db_session, team_id=team.id, user_id=member.id)
+        await db_session.commit()
+
+        user_team = await TeamService.get_user_team(db_session, member.id)
+        assert user_team.id == team.id
+        assert user_team.captain.id == captain.id
@@ -845,7 +845,8 @@ class ApiClient {
       params: {
         transaction_type: transactionType,
         page,
-        page_size: pageSize
+        page_size: pageSize,
+        include_total: true
       }
     })
   }
@@ -1045,7 +1046,8 @@ class ApiClient {
         page,
         page_size: pageSize,
         status,
-        task_type: taskType
+        task_type: taskType,
+        include_total: true
       }
     })
   }
@@ -1169,7 +1171,8 @@ class ApiClient {
         page,
         page_size: pageSize,
         is_correct: isCorrect,
-        difficulty
+        difficulty,
+        include_total: true
       }
     })
   }